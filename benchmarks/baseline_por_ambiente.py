@@ -0,0 +1,32 @@
+"""
+Baselines dos benchmarks guardadas por ambiente.
+
+Tempo de parede só compara com tempo de parede da mesma máquina: a baseline versionada
+guarda uma medição por ambiente (Python, bibliotecas, CPUs, arquitetura, sistema) e cada
+rodada compara só com a do seu ambiente. Sem medição para o ambiente atual, o benchmark
+avisa e pula a comparação de tempo; --salvar acrescenta (ou substitui) a deste ambiente sem
+apagar as outras.
+"""
+import os
+import json
+
+def chave_ambiente(ambiente):
+    return ' | '.join(f"{nome}={valor}" for nome, valor in sorted(ambiente.items()))
+
+def ler_baselines(caminho):
+    """{chave do ambiente: baseline} do arquivo; o formato antigo (uma baseline só) vira uma entrada."""
+    with open(caminho, encoding='utf-8') as f:
+        dados = json.load(f)
+    if 'ambientes' in dados: return dados['ambientes']
+    return {chave_ambiente(dados.get('ambiente', {})): dados}
+
+def baseline_do_ambiente(baselines, ambiente):
+    return baselines.get(chave_ambiente(ambiente))
+
+def gravar_baseline(caminho, ambiente, baseline):
+    """Grava `baseline` como a medição deste ambiente, mantendo as dos outros."""
+    baselines = ler_baselines(caminho) if os.path.exists(caminho) else {}
+    baselines[chave_ambiente(ambiente)] = {'ambiente': ambiente, **baseline}
+    os.makedirs(os.path.dirname(os.path.abspath(caminho)), exist_ok=True)
+    with open(caminho, 'w', encoding='utf-8') as f:
+        json.dump({'ambientes': baselines}, f, indent=2, ensure_ascii=False)
@@ -0,0 +1,206 @@
+"""
+Benchmark do motor CNAB 240 em volumes de produção.
+
+Uso (da raiz do projeto):
+    python -m benchmarks.bench_cnab                                  # 1k, 10k, 100k e 1M linhas, contra a baseline
+    python -m benchmarks.bench_cnab --tamanhos 1000 10000 --sem-comparar
+    python -m benchmarks.bench_cnab --salvar                         # grava a medição deste ambiente em benchmarks/baselines/cnab.json
+    python -m benchmarks.bench_cnab --comparar outra_baseline.json --tolerancia 0.25
+
+Mede linhas/s e pico de memória da geração completa (colunar, em streaming para /dev/null;
+acima de PAGAMENTOS_POR_LOTE_MAX linhas, pelo escrever_remessas_divididas), o tempo de regerar
+a mesma seleção com o cache de segmentos quente, a mesma geração forçada no pool de processos,
+tempo por função do caminho colunar (cProfile) e µs por chamada das funções por linha
+(get_val, gerar_segmento_j_combo, gerar_segmentos_pix_a_b e o motor modo='linha').
+Compara com a medição do mesmo ambiente em benchmarks/baselines/cnab.json (ou na de --comparar)
+e sai com código 1 se alguma métrica piorar além da tolerância; sem medição para o ambiente
+atual, só avisa (ver benchmarks/baseline_por_ambiente.py).
+"""
+import os
+import sys
+import time
+import argparse
+import cProfile
+import platform
+import pstats
+import tempfile
+import tracemalloc
+
+# NSA e índice de emitidos do benchmark vão para um diretório temporário, nunca para os da operação
+_TMP = tempfile.mkdtemp(prefix='bench_cnab_')
+os.environ['CNAB_NSA_DB'] = os.path.join(_TMP, 'nsa.sqlite3')
+os.environ['CNAB_EMITIDOS_DB'] = os.path.join(_TMP, 'emitidos.sqlite3')
+
+import numpy as np
+import pandas as pd
+
+import modules.cnab_engine as motor
+from benchmarks.gerador_pagamentos import gerar_pagamentos
+from benchmarks.baseline_por_ambiente import ler_baselines, baseline_do_ambiente, gravar_baseline
+
+TAMANHOS_PADRAO = [1_000, 10_000, 100_000, 1_000_000]
+# Baseline versionada: toda rodada compara com ela, a não ser com --sem-comparar
+BASELINE_PADRAO = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines', 'cnab.json')
+AMOSTRA_POR_LINHA = 2_000       # linhas usadas para medir as funções por linha
+LIMITE_MODO_LINHA = 10_000      # o motor linha a linha só roda inteiro até esse volume
+LIMITE_PERFIL = 100_000         # cProfile só até esse volume (o overhead distorce acima disso)
+NSA_BENCH = 1
+
+# Métricas onde maior é melhor; o resto (tempos, memória) menor é melhor
+MAIOR_MELHOR = {'linhas_por_s', 'linhas_por_s_modo_linha', 'linhas_por_s_pool'}
+
+def _gerar(df, paralelo, cache_frio=True):
+    # Mede a renderização de verdade: sem aproveitar o cache de segmentos da rodada anterior
+    if cache_frio: motor.limpar_cache_segmentos()
+    # Acima do teto de pagamentos por lote do layout, a remessa só sai dividida em vários arquivos
+    if len(df) > motor.PAGAMENTOS_POR_LOTE_MAX:
+        return motor.escrever_remessas_divididas(df, lambda nsa, indice: open(os.devnull, 'wb'), paralelo=paralelo)
+    with open(os.devnull, 'wb') as destino:
+        return motor.escrever_cnab_remessa(df, destino, nsa=NSA_BENCH, paralelo=paralelo)
+
+def _cronometrar(funcao, *args):
+    inicio = time.perf_counter()
+    funcao(*args)
+    return time.perf_counter() - inicio
+
+def medir_geracao(df, paralelo=None):
+    tempo = _cronometrar(_gerar, df, paralelo)
+    tracemalloc.start()
+    _gerar(df, paralelo)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    resultado = {
+        'segundos': round(tempo, 4),
+        'linhas_por_s': round(len(df) / tempo, 1),
+        'pico_memoria_mb': round(pico / 2 ** 20, 2),
+    }
+    if len(df) <= motor.LIMITE_CACHE_SEGMENTOS and not paralelo:
+        # Regeração no cockpit: a mesma seleção de novo, com os segmentos já no cache
+        resultado['segundos_regeracao'] = round(_cronometrar(_gerar, df, paralelo, False), 4)
+    return resultado
+
+def medir_pool(df):
+    # O pool de processos só entra sozinho acima do LIMIAR_PARALELO e com mais de uma CPU: forçado
+    # aqui para o caminho paralelo ter medição em todo ambiente (a memória dos processos filhos
+    # não aparece no tracemalloc, então fica só o tempo)
+    tempo = _cronometrar(_gerar, df, True)
+    return {'segundos_pool': round(tempo, 4), 'linhas_por_s_pool': round(len(df) / tempo, 1)}
+
+def perfil_por_funcao(df, top=15):
+    """Tempo acumulado (s) das funções do projeto no caminho colunar, pelo cProfile."""
+    perfil = cProfile.Profile()
+    perfil.runcall(_gerar, df, False)
+    estatisticas = pstats.Stats(perfil).stats
+    raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    tempos = {}
+    for (arquivo, _, nome), (_, _, _, acumulado, _) in estatisticas.items():
+        if not arquivo.startswith(os.path.join(raiz, 'modules')): continue
+        tempos[f"{os.path.basename(arquivo)}:{nome}"] = round(acumulado, 4)
+    return dict(sorted(tempos.items(), key=lambda kv: -kv[1])[:top])
+
+def medir_por_linha(df):
+    """µs por chamada das funções linha a linha, numa amostra do DataFrame."""
+    amostra = df.head(AMOSTRA_POR_LINHA)
+    linhas = [row for _, row in amostra.iterrows()]
+    boletos = motor.classificar_lote_colunar(amostra)
+    rows_boleto = [r for r, b in zip(linhas, boletos) if b]
+    rows_pix = [r for r, b in zip(linhas, boletos) if not b]
+    data_arq = time.strftime('%d%m%Y')
+
+    def por_chamada(funcao, rows):
+        if not rows: return None
+        inicio = time.perf_counter()
+        for row in rows: funcao(row)
+        return round((time.perf_counter() - inicio) / len(rows) * 1e6, 2)
+
+    return {
+        'get_val_us': por_chamada(lambda r: motor.get_val(r, ['CHAVE_PIX_OU_COD_BARRAS', 'COD_BARRAS', 'CHAVE_PIX']), linhas),
+        'gerar_segmento_j_combo_us': por_chamada(lambda r: motor.gerar_segmento_j_combo(r, 1, 1), rows_boleto),
+        'gerar_segmentos_pix_a_b_us': por_chamada(lambda r: motor.gerar_segmentos_pix_a_b(r, 1, data_arq, 1), rows_pix),
+    }
+
+def medir_modo_linha(df):
+    tempo = _cronometrar(motor._gerar_cnab_por_linha, df, NSA_BENCH, time.strftime('%d%m%Y'), time.strftime('%H%M%S'))
+    return {'segundos_modo_linha': round(tempo, 4), 'linhas_por_s_modo_linha': round(len(df) / tempo, 1)}
+
+def rodar(tamanhos, estilo='cockpit', seed=0, paralelo=None):
+    resultados = {}
+    for n in tamanhos:
+        df = gerar_pagamentos(n, seed=seed, estilo=estilo)
+        resultado = {'linhas': n, **medir_geracao(df, paralelo), **medir_por_linha(df)}
+        if paralelo is not True: resultado.update(medir_pool(df))
+        if n <= LIMITE_MODO_LINHA: resultado.update(medir_modo_linha(df))
+        if n <= LIMITE_PERFIL: resultado['funcoes_s'] = perfil_por_funcao(df)
+        resultados[str(n)] = resultado
+        pool = f" | pool {resultado['linhas_por_s_pool']:>12,.0f} linhas/s" if 'linhas_por_s_pool' in resultado else ""
+        print(f"{n:>9} linhas | {resultado['linhas_por_s']:>12,.0f} linhas/s | pico {resultado['pico_memoria_mb']:>8.1f} MB | {resultado['segundos']:.3f}s{pool}")
+    return resultados
+
+def ambiente():
+    return {
+        'python': platform.python_version(), 'pandas': pd.__version__, 'numpy': np.__version__,
+        'cpus': os.cpu_count(), 'maquina': platform.machine(), 'sistema': platform.system(),
+    }
+
+def comparar(atual, baseline, tolerancia):
+    """Lista de regressões (métrica que piorou mais que `tolerancia`, ex.: 0.25 = 25%)."""
+    regressoes = []
+    for tamanho, medidas in atual.items():
+        base = baseline.get(tamanho)
+        if not base: continue
+        for metrica, valor in medidas.items():
+            anterior = base.get(metrica)
+            if not isinstance(valor, (int, float)) or not isinstance(anterior, (int, float)) or metrica == 'linhas' or not anterior:
+                continue
+            variacao = (anterior - valor) / anterior if metrica in MAIOR_MELHOR else (valor - anterior) / anterior
+            if variacao > tolerancia:
+                regressoes.append(f"{tamanho} linhas | {metrica}: {anterior} -> {valor} ({variacao:+.0%})")
+    return regressoes
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark do motor CNAB 240")
+    parser.add_argument('--tamanhos', type=int, nargs='+', default=TAMANHOS_PADRAO)
+    parser.add_argument('--estilo', choices=['cockpit', 'tasy'], default='cockpit')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--paralelo', choices=['auto', 'sim', 'nao'], default='auto')
+    parser.add_argument('--salvar', nargs='?', const=BASELINE_PADRAO,
+                        help="grava os resultados como baseline JSON (sem caminho: a baseline versionada)")
+    parser.add_argument('--comparar', default=BASELINE_PADRAO, help="baseline JSON para detectar regressões (padrão: a versionada)")
+    parser.add_argument('--sem-comparar', action='store_true', help="só mede, sem comparar com baseline")
+    parser.add_argument('--tolerancia', type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    # Lida antes de medir: --salvar por cima da própria baseline ainda compara com a anterior
+    baselines = None
+    if not args.sem_comparar and os.path.exists(args.comparar):
+        baselines = ler_baselines(args.comparar)
+    elif not args.sem_comparar and args.comparar != BASELINE_PADRAO:
+        parser.error(f"baseline não encontrada: {args.comparar}")
+
+    paralelo = {'auto': None, 'sim': True, 'nao': False}[args.paralelo]
+    resultados = rodar(args.tamanhos, args.estilo, args.seed, paralelo)
+
+    if args.salvar:
+        gravar_baseline(args.salvar, ambiente(), {'estilo': args.estilo, 'resultados': resultados})
+        print(f"Baseline deste ambiente gravada em {args.salvar}")
+
+    if baselines is None and not args.sem_comparar and not args.salvar:
+        print(f"Sem baseline em {args.comparar}: grave uma com --salvar.")
+
+    if baselines is not None:
+        baseline = baseline_do_ambiente(baselines, ambiente())
+        if baseline is None:
+            # Tempo medido em outra máquina (outras CPUs, outras versões) não diz nada sobre esta
+            if not args.salvar:
+                print(f"Aviso: {args.comparar} não tem medição deste ambiente; comparação pulada (grave uma com --salvar).")
+            return 0
+        if baseline.get('estilo', args.estilo) != args.estilo:
+            print("Aviso: baseline medida com outro --estilo; compare com cautela.")
+        regressoes = comparar(resultados, baseline['resultados'], args.tolerancia)
+        for r in regressoes: print("REGRESSÃO:", r)
+        if regressoes: return 1
+        print("Sem regressões além da tolerância.")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,239 @@
+"""
+Benchmark de acurácia e vazão do leitor de certidões de protesto (PDF).
+
+Uso (da raiz do projeto):
+    python -m benchmarks.bench_protestos                                       # 300 PDFs, extrator rápido, contra a baseline
+    python -m benchmarks.bench_protestos --arquivos 100 --extratores rapido pdfplumber --sem-comparar
+    python -m benchmarks.bench_protestos --extratores rapido pdfplumber --salvar  # grava a medição deste ambiente em benchmarks/baselines/protestos.json
+    python -m benchmarks.bench_protestos --comparar outra_baseline.json --tolerancia 0.25
+
+Gera um corpus de certidões sintéticas (benchmarks/gerador_certidoes.py, um layout por
+cartório conhecido, com o gabarito de cada bloco), roda o extrair_protestos_pdfs sem cache e
+mede, por extrator de texto: páginas/s, PDFs/s (também com o pool de processos forçado), pico
+de memória (tracemalloc, só o heap do Python) e precisão/recall de cada campo contra o gabarito,
+no total e por layout.
+Compara com benchmarks/baselines/protestos.json (ou a de --comparar) e sai com código 1 se a
+vazão piorar além da tolerância ou se a precisão/recall de qualquer campo cair (ajuste com
+--tolerancia-acuracia). A vazão só é comparada com a medição do mesmo ambiente; a acurácia não
+depende da máquina e é comparada sempre (ver benchmarks/baseline_por_ambiente.py).
+"""
+import io
+import os
+import sys
+import time
+import argparse
+import platform
+import tempfile
+import tracemalloc
+
+# Cache de protestos do benchmark num diretório temporário, nunca o da operação
+_TMP = tempfile.mkdtemp(prefix='bench_protestos_')
+os.environ['CNAB_PROTESTOS_CACHE_DB'] = os.path.join(_TMP, 'protestos_cache.sqlite3')
+
+import pandas as pd
+import pdfplumber
+
+import modules.protestos as leitor
+from benchmarks.gerador_certidoes import LAYOUTS_CERTIDAO, gerar_corpus
+from benchmarks.baseline_por_ambiente import ler_baselines, baseline_do_ambiente, gravar_baseline
+
+ARQUIVOS_PADRAO = 300
+# Baseline versionada: toda rodada compara com ela, a não ser com --sem-comparar
+BASELINE_PADRAO = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines', 'protestos.json')
+CAMPOS = [
+    'Protocolo', 'Credor/Sacador', 'CNPJ/CPF Credor', 'Valor/Saldo', 'Custas/Taxas',
+    'Emissão', 'Vencimento', 'Data do Protesto', 'Título/Número', 'Espécie',
+]
+
+# Métricas onde maior é melhor; o resto (tempos, memória) menor é melhor
+MAIOR_MELHOR_VAZAO = {'paginas_por_s', 'arquivos_por_s', 'paginas_por_s_pool'}
+METRICAS_VAZAO = ('segundos', 'paginas_por_s', 'arquivos_por_s', 'pico_memoria_mb', 'segundos_pool', 'paginas_por_s_pool')
+
+def _usar_extrator(extrator):
+    # Mesmo efeito do CNAB_PROTESTOS_EXTRATOR, sem reimportar o módulo (o pool herda no fork)
+    leitor.EXTRATOR_PADRAO = extrator
+    leitor.PERFIL_PADRAO.extrator = extrator
+
+def _uploads(corpus):
+    arquivos = []
+    for nome, pdf, _, _ in corpus:
+        arquivo = io.BytesIO(pdf)
+        arquivo.name = nome
+        arquivos.append(arquivo)
+    return arquivos
+
+def _extrair(corpus, paralelo):
+    return leitor.extrair_protestos_pdfs(_uploads(corpus), paralelo=paralelo, usar_cache=False)
+
+def avaliar(df, corpus):
+    """
+    Precisão e recall de cada campo contra o gabarito. O registro extraído casa com o
+    esperado pelo (arquivo, Protocolo); campo com valor errado, registro que não existe no
+    gabarito ou repetido contam como falso positivo; campo esperado que não veio certo, como
+    falso negativo. "-" (campo ausente) não conta como valor extraído.
+    """
+    esperados = {(nome, r['Protocolo']): r for nome, _, _, gabarito in corpus for r in gabarito}
+    acertos = dict.fromkeys(CAMPOS, 0)
+    extraidos = dict.fromkeys(CAMPOS, 0)
+    usados = set()
+    for registro in df.to_dict('records') if not df.empty else []:
+        chave = (registro[leitor.COLUNA_ARQUIVO], registro.get('Protocolo'))
+        esperado = esperados.get(chave) if chave not in usados else None
+        usados.add(chave)
+        for campo in CAMPOS:
+            valor = registro.get(campo, '-')
+            if valor == '-': continue
+            extraidos[campo] += 1
+            if esperado is not None and valor == esperado[campo]: acertos[campo] += 1
+
+    campos = {}
+    for campo in CAMPOS:
+        total_esperado = sum(1 for r in esperados.values() if r[campo] != '-')
+        campos[campo] = {
+            'precisao': round(acertos[campo] / extraidos[campo], 4) if extraidos[campo] else 1.0,
+            'recall': round(acertos[campo] / total_esperado, 4) if total_esperado else 1.0,
+        }
+    return {
+        'registros_esperados': len(esperados),
+        'registros_extraidos': len(df),
+        'registros_encontrados': len(usados & esperados.keys()),
+        'campos': campos,
+    }
+
+def medir_extrator(corpus, extrator, paralelo=None):
+    _usar_extrator(extrator)
+    paginas = sum(p for _, _, p, _ in corpus)
+
+    inicio = time.perf_counter()
+    df, erros = _extrair(corpus, paralelo)
+    tempo = time.perf_counter() - inicio
+
+    tracemalloc.start()
+    _extrair(corpus, False)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # Pool de processos forçado: no automático ele depende do lote e das CPUs, e o caminho
+    # paralelo ficaria sem medição nas máquinas onde não entra sozinho
+    pool = {}
+    if paralelo is not True:
+        inicio = time.perf_counter()
+        _extrair(corpus, True)
+        tempo_pool = time.perf_counter() - inicio
+        pool = {'segundos_pool': round(tempo_pool, 4), 'paginas_por_s_pool': round(paginas / tempo_pool, 1)}
+
+    por_layout = {}
+    for layout in LAYOUTS_CERTIDAO:
+        parte = [item for item in corpus if item[0].startswith(f"{layout}_")]
+        if not parte: continue
+        nomes = {nome for nome, _, _, _ in parte}
+        por_layout[layout] = avaliar(df[df[leitor.COLUNA_ARQUIVO].isin(nomes)] if not df.empty else df, parte)['campos']
+
+    return {
+        'arquivos': len(corpus),
+        'paginas': paginas,
+        'erros': len(erros),
+        'segundos': round(tempo, 4),
+        'paginas_por_s': round(paginas / tempo, 1),
+        'arquivos_por_s': round(len(corpus) / tempo, 2),
+        'pico_memoria_mb': round(pico / 2 ** 20, 2),
+        **pool,
+        **avaliar(df, corpus),
+        'por_layout': por_layout,
+    }
+
+def rodar(qtd_arquivos, extratores, seed=0, paralelo=None):
+    corpus = gerar_corpus(qtd_arquivos, seed=seed)
+    resultados = {}
+    for extrator in extratores:
+        resultado = medir_extrator(corpus, extrator, paralelo)
+        resultados[extrator] = resultado
+        pior = min(CAMPOS, key=lambda c: min(resultado['campos'][c].values()))
+        print(
+            f"{extrator:>10} | {resultado['paginas']} págs em {resultado['segundos']:.2f}s | "
+            f"{resultado['paginas_por_s']:>9,.1f} págs/s (pool {resultado.get('paginas_por_s_pool', 0):>9,.1f}) | pico {resultado['pico_memoria_mb']:>7.1f} MB | "
+            f"registros {resultado['registros_encontrados']}/{resultado['registros_esperados']} | "
+            f"pior campo {pior}: P={resultado['campos'][pior]['precisao']:.3f} R={resultado['campos'][pior]['recall']:.3f}"
+        )
+        for campo, medidas in resultado['campos'].items():
+            if medidas['precisao'] < 1 or medidas['recall'] < 1:
+                print(f"{'':>10}   {campo:<18} P={medidas['precisao']:.4f} R={medidas['recall']:.4f}")
+    return resultados
+
+def ambiente():
+    return {
+        'python': platform.python_version(), 'pandas': pd.__version__, 'pdfplumber': pdfplumber.__version__,
+        'cpus': os.cpu_count(), 'maquina': platform.machine(), 'sistema': platform.system(),
+    }
+
+def comparar(atual, baseline, tolerancia, tolerancia_acuracia, vazao=True):
+    """
+    Lista de regressões: vazão/memória além de `tolerancia`, precisão/recall além de `tolerancia_acuracia`.
+    vazao=False compara só a acurácia (baseline de outro ambiente).
+    """
+    regressoes = []
+    for extrator, medidas in atual.items():
+        base = baseline.get(extrator)
+        if not base: continue
+        for metrica in METRICAS_VAZAO if vazao else ():
+            valor, anterior = medidas.get(metrica), base.get(metrica)
+            if not anterior or valor is None: continue
+            variacao = (anterior - valor) / anterior if metrica in MAIOR_MELHOR_VAZAO else (valor - anterior) / anterior
+            if variacao > tolerancia:
+                regressoes.append(f"{extrator} | {metrica}: {anterior} -> {valor} ({variacao:+.0%})")
+        for campo, valores in medidas['campos'].items():
+            for metrica, valor in valores.items():
+                anterior = base.get('campos', {}).get(campo, {}).get(metrica)
+                if anterior is not None and anterior - valor > tolerancia_acuracia:
+                    regressoes.append(f"{extrator} | {metrica} de {campo}: {anterior} -> {valor}")
+    return regressoes
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de acurácia e vazão do leitor de certidões de protesto")
+    parser.add_argument('--arquivos', type=int, default=ARQUIVOS_PADRAO)
+    parser.add_argument('--extratores', nargs='+', choices=list(leitor.EXTRATORES), default=['rapido'])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--paralelo', choices=['auto', 'sim', 'nao'], default='auto')
+    parser.add_argument('--salvar', nargs='?', const=BASELINE_PADRAO,
+                        help="grava os resultados como baseline JSON (sem caminho: a baseline versionada)")
+    parser.add_argument('--comparar', default=BASELINE_PADRAO, help="baseline JSON para detectar regressões (padrão: a versionada)")
+    parser.add_argument('--sem-comparar', action='store_true', help="só mede, sem comparar com baseline")
+    parser.add_argument('--tolerancia', type=float, default=0.25)
+    parser.add_argument('--tolerancia-acuracia', type=float, default=0.0)
+    args = parser.parse_args(argv)
+
+    # Lida antes de medir: --salvar por cima da própria baseline ainda compara com a anterior
+    baselines = None
+    if not args.sem_comparar and os.path.exists(args.comparar):
+        baselines = ler_baselines(args.comparar)
+    elif not args.sem_comparar and args.comparar != BASELINE_PADRAO:
+        parser.error(f"baseline não encontrada: {args.comparar}")
+
+    paralelo = {'auto': None, 'sim': True, 'nao': False}[args.paralelo]
+    resultados = rodar(args.arquivos, args.extratores, args.seed, paralelo)
+
+    if args.salvar:
+        gravar_baseline(args.salvar, ambiente(), {'arquivos': args.arquivos, 'seed': args.seed, 'resultados': resultados})
+        print(f"Baseline deste ambiente gravada em {args.salvar}")
+
+    if baselines is None and not args.sem_comparar and not args.salvar:
+        print(f"Sem baseline em {args.comparar}: grave uma com --salvar.")
+
+    if baselines:
+        baseline = baseline_do_ambiente(baselines, ambiente())
+        mesmo_ambiente = baseline is not None
+        if not mesmo_ambiente:
+            # Vazão medida em outra máquina não diz nada sobre esta; a acurácia vale de qualquer uma
+            corpus = (args.arquivos, args.seed)
+            baseline = next((b for b in baselines.values() if (b.get('arquivos'), b.get('seed')) == corpus), next(iter(baselines.values())))
+            print(f"Aviso: {args.comparar} não tem medição deste ambiente; só a acurácia é comparada (grave uma com --salvar).")
+        if (baseline.get('arquivos'), baseline.get('seed')) != (args.arquivos, args.seed):
+            print("Aviso: baseline com outro corpus (--arquivos/--seed); a acurácia não é comparável.")
+        regressoes = comparar(resultados, baseline['resultados'], args.tolerancia, args.tolerancia_acuracia, mesmo_ambiente)
+        for r in regressoes: print("REGRESSÃO:", r)
+        if regressoes: return 1
+        print("Sem regressões além da tolerância.")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
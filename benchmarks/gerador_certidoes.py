@@ -0,0 +1,199 @@
+import random
+from datetime import date, timedelta
+
+# =============================================================================
+# GERADOR DE CERTIDÕES DE PROTESTO SINTÉTICAS (PARA O BENCHMARK DO LEITOR DE PDF)
+# =============================================================================
+# Cada layout escreve os blocos de protesto com os rótulos e as manias de um cartório
+# (nome colado no código interno, CNPJ do hospital antes do credor, Espécie com sigla...)
+# e devolve junto o gabarito: o registro que o leitor TEM que montar para cada bloco.
+# O PDF é escrito à mão (texto simples em Helvetica/WinAnsi), sem dependência nova:
+# é o caso das certidões de verdade que vêm com texto (não escaneadas).
+
+CNPJ_HOSPITAL = '85.307.098/0001-87'
+DEVEDOR = 'SOS CARDIO SERVICOS HOSPITALARES LTDA'
+LINHAS_POR_PAGINA = 52
+
+PALAVRAS_NOME = [
+    'DISTRIBUIDORA', 'HOSPITALAR', 'MEDICA', 'SUPRIMENTOS', 'OXIGENIO', 'LABORATORIO', 'ANALISES',
+    'COMERCIAL', 'FARMACIA', 'LAVANDERIA', 'MANUTENCAO', 'ALFA', 'BETA', 'GAMA', 'DELTA', 'SUL', 'NORTE',
+]
+SUFIXOS_NOME = ['LTDA', 'S/A', 'EIRELI', 'ME']
+ESPECIES = [('DUPLICATA MERCANTIL', 'DM'), ('DUPLICATA DE SERVICO', 'DS'), ('NOTA PROMISSORIA', 'NP'), ('CHEQUE', 'CH')]
+BANCOS_APRESENTANTES = ['BANCO ALFA S/A', 'COOPERATIVA DE CREDITO SUL', 'FIDC RECEBIVEIS BETA']
+
+def _nome(r):
+    return ' '.join(r.sample(PALAVRAS_NOME, r.randint(1, 3)) + [r.choice(SUFIXOS_NOME)])
+
+def _cnpj(r):
+    while True:
+        s = ''.join(r.choice('0123456789') for _ in range(14))
+        cnpj = f"{s[:2]}.{s[2:5]}.{s[5:8]}/{s[8:12]}-{s[12:]}"
+        if cnpj != CNPJ_HOSPITAL: return cnpj
+
+def _cpf(r):
+    s = f"{r.randint(0, 99_999_999_999):011d}"
+    return f"{s[:3]}.{s[3:6]}.{s[6:9]}-{s[9:]}"
+
+def _valor(r, minimo, maximo):
+    centavos = r.randint(minimo * 100, maximo * 100)
+    inteiro = f"{centavos // 100:,}".replace(',', '.')
+    return f"{inteiro},{centavos % 100:02d}"
+
+def _data(r, base, dias):
+    return (base + timedelta(days=r.randint(0, dias))).strftime('%d/%m/%Y')
+
+def _datas(r):
+    emissao = date(2025, 1, 1) + timedelta(days=r.randint(0, 400))
+    vencimento = emissao + timedelta(days=r.randint(10, 90))
+    protesto = vencimento + timedelta(days=r.randint(5, 60))
+    return emissao.strftime('%d/%m/%Y'), vencimento.strftime('%d/%m/%Y'), protesto.strftime('%d/%m/%Y')
+
+# Cada layout: (r, protocolo) -> (linhas do bloco, gabarito sem o nome do arquivo)
+
+def _bloco_salles(r, protocolo):
+    # Salles: "Sacador Endereço:" e o código interno colado no nome ("0123FORNECEDOR")
+    nome, cnpj = _nome(r), _cnpj(r)
+    valor, custas = _valor(r, 100, 90_000), _valor(r, 10, 900)
+    emissao, vencimento, protesto = _datas(r)
+    titulo = f"NF-{r.randint(1, 999_999)}"
+    especie = r.choice(ESPECIES)[0]
+    linhas = [
+        f"Protocolo: {protocolo}",
+        f"Sacador: Endereço: {r.randint(100, 9999)}{nome} - CNPJ {cnpj}",
+        f"Devedor: {DEVEDOR} CNPJ {CNPJ_HOSPITAL}",
+        f"Valor: R$ {valor}",
+        f"Custas: R$ {custas}",
+        f"Emissão: {emissao}",
+        f"Vencimento: {vencimento}",
+        f"Data do Protesto: {protesto}",
+        f"Título nº: {titulo}",
+        f"Espécie: {especie}",
+    ]
+    return linhas, {
+        'Protocolo': protocolo, 'Credor/Sacador': nome, 'CNPJ/CPF Credor': cnpj, 'Valor/Saldo': f"R$ {valor}",
+        'Custas/Taxas': f"R$ {custas}", 'Emissão': emissao, 'Vencimento': vencimento, 'Data do Protesto': protesto,
+        'Título/Número': titulo, 'Espécie': especie,
+    }
+
+def _bloco_credor_original(r, protocolo):
+    # Tabelionato com "Credor original", valores sem R$ e Espécie com a sigla depois do hífen
+    nome, cnpj = _nome(r), _cnpj(r)
+    valor, custas = _valor(r, 100, 250_000), _valor(r, 10, 900)
+    emissao, vencimento, protesto = _datas(r)
+    titulo = f"{r.randint(1, 999_999)}/{r.randint(1, 12)}"
+    especie, sigla = r.choice(ESPECIES)
+    linhas = [
+        f"Protocolo {protocolo}",
+        f"Credor original: {nome}",
+        f"CPF/CNPJ: {cnpj}",
+        f"Devedor: {DEVEDOR} - {CNPJ_HOSPITAL}",
+        f"Valor Original: {valor}",
+        f"Emolumentos: {custas}",
+        f"Data Emissão: {emissao}   Venc.: {vencimento}",
+        f"Protestado em: {protesto}",
+        f"nº do Título: {titulo}",
+        f"Espécie do Titulo: {especie} - {sigla}",
+    ]
+    return linhas, {
+        'Protocolo': protocolo, 'Credor/Sacador': nome, 'CNPJ/CPF Credor': cnpj, 'Valor/Saldo': f"R$ {valor}",
+        'Custas/Taxas': f"R$ {custas}", 'Emissão': emissao, 'Vencimento': vencimento, 'Data do Protesto': protesto,
+        'Título/Número': titulo, 'Espécie': especie,
+    }
+
+def _bloco_apresentante(r, protocolo):
+    # Sem sacador: quem aparece é o apresentante (banco/FIDC ou pessoa física), sem emissão,
+    # e o CNPJ do hospital vem ANTES do documento do credor
+    pessoa_fisica = r.random() < 0.3
+    nome = f"{r.choice(['JOAO', 'MARIA', 'ANA', 'PEDRO'])} {r.choice(['SILVA', 'SOUZA', 'LIMA'])}" if pessoa_fisica else r.choice(BANCOS_APRESENTANTES)
+    documento = _cpf(r) if pessoa_fisica else _cnpj(r)
+    valor, custas = _valor(r, 100, 50_000), _valor(r, 10, 900)
+    _, vencimento, protesto = _datas(r)
+    titulo = f"{r.randint(0, 999_999):06d}"
+    especie = r.choice(ESPECIES)[0]
+    linhas = [
+        f"Protocolo nº {protocolo}",
+        f"Devedor: {DEVEDOR}",
+        f"CNPJ do devedor: {CNPJ_HOSPITAL}",
+        f"Apresentante: {nome} - Documento {documento}",
+        f"Saldo: R$ {valor}",
+        f"Taxas: R$ {custas}",
+        f"Vencimento: {vencimento}",
+        f"Protesto em: {protesto}",
+        f"Número: {titulo}",
+        f"Espécie: {especie}",
+    ]
+    return linhas, {
+        'Protocolo': protocolo, 'Credor/Sacador': nome, 'CNPJ/CPF Credor': documento, 'Valor/Saldo': f"R$ {valor}",
+        'Custas/Taxas': f"R$ {custas}", 'Emissão': '-', 'Vencimento': vencimento, 'Data do Protesto': protesto,
+        'Título/Número': titulo, 'Espécie': especie,
+    }
+
+LAYOUTS_CERTIDAO = {
+    'salles': ('1º Tabelionato de Protesto - Cartório Salles', _bloco_salles),
+    'credor_original': ('2º Tabelião de Protesto de Letras e Títulos', _bloco_credor_original),
+    'apresentante': ('Cartório do 3º Ofício de Protestos', _bloco_apresentante),
+}
+
+def pdf_texto(paginas):
+    """Lista de páginas (cada uma, lista de linhas) -> bytes de um PDF só com texto."""
+    objetos = []
+    def adicionar(conteudo):
+        objetos.append(conteudo)
+        return len(objetos)
+
+    catalogo, raiz_paginas = adicionar(None), adicionar(None)
+    fonte = adicionar(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+    filhos = []
+    for linhas in paginas:
+        escapadas = (l.encode('cp1252').replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)') for l in linhas)
+        corpo = b"BT /F1 10 Tf 40 800 Td 14 TL " + b" ".join(b"(" + l + b") '" for l in escapadas) + b" ET"
+        conteudo = adicionar(b"<< /Length %d >>\nstream\n" % len(corpo) + corpo + b"\nendstream")
+        filhos.append(adicionar(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 595 842] /Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>"
+            % (raiz_paginas, fonte, conteudo)
+        ))
+    objetos[catalogo - 1] = b"<< /Type /Catalog /Pages %d 0 R >>" % raiz_paginas
+    objetos[raiz_paginas - 1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(b"%d 0 R" % f for f in filhos), len(filhos))
+
+    saida, posicoes = b"%PDF-1.4\n", []
+    for numero, objeto in enumerate(objetos, 1):
+        posicoes.append(len(saida))
+        saida += b"%d 0 obj\n" % numero + objeto + b"\nendobj\n"
+    xref = len(saida)
+    saida += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objetos) + 1) + b"".join(b"%010d 00000 n \n" % p for p in posicoes)
+    saida += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objetos) + 1, catalogo, xref)
+    return saida
+
+def gerar_certidao(layout, qtd_protestos, seed=0):
+    """
+    Uma certidão com `qtd_protestos` blocos no layout do cartório.
+    Retorna (bytes do PDF, número de páginas, gabarito: lista de registros esperados).
+    """
+    r = random.Random(seed)
+    cabecalho, bloco = LAYOUTS_CERTIDAO[layout]
+    linhas = ["CERTIDÃO DE PROTESTO", cabecalho, f"Emitida em {_data(r, date(2026, 1, 1), 200)}", ""]
+    gabarito, protocolos = [], set()
+    for _ in range(qtd_protestos):
+        protocolo = f"{r.randint(10_000, 99_999_999):0{r.choice([5, 7, 8])}d}"
+        while protocolo in protocolos: protocolo = str(r.randint(10_000_000, 99_999_999))
+        protocolos.add(protocolo)
+        linhas_bloco, esperado = bloco(r, protocolo)
+        linhas += linhas_bloco + [""]
+        gabarito.append(esperado)
+
+    # Quebra de página no meio dos blocos (como nas certidões de verdade), com rodapé
+    corpo = [linhas[i:i + LINHAS_POR_PAGINA] for i in range(0, len(linhas), LINHAS_POR_PAGINA)]
+    paginas = [pagina + ["", f"Página {n} de {len(corpo)}"] for n, pagina in enumerate(corpo, 1)]
+    return pdf_texto(paginas), len(paginas), gabarito
+
+def gerar_corpus(qtd_arquivos, seed=0, layouts=None, protestos_por_arquivo=(1, 60)):
+    """[(nome do arquivo, bytes, páginas, gabarito)] alternando os layouts de cartório."""
+    layouts = layouts or list(LAYOUTS_CERTIDAO)
+    r = random.Random(seed)
+    corpus = []
+    for i in range(qtd_arquivos):
+        layout = layouts[i % len(layouts)]
+        pdf, paginas, gabarito = gerar_certidao(layout, r.randint(*protestos_por_arquivo), seed=r.randrange(2 ** 32))
+        corpus.append((f"{layout}_{i:04d}.pdf", pdf, paginas, gabarito))
+    return corpus
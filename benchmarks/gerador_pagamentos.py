@@ -0,0 +1,187 @@
+import numpy as np
+import pandas as pd
+from datetime import datetime, timedelta
+
+from modules.codigo_barras import dv_mod10, dv_mod11_boleto, dv_mod11_arrecadacao
+
+# =============================================================================
+# GERADOR DE PAGAMENTOS SINTÉTICOS (PARA BENCHMARK DO MOTOR CNAB)
+# =============================================================================
+# Monta DataFrames no formato da Pagamentos_Dia (ou do export do Tasy, com os apelidos
+# de coluna), com boletos de 44, linhas digitáveis de 47/48 com DVs corretos e todos
+# os tipos de chave PIX. Tudo vetorizado em numpy para chegar a 1M de linhas em segundos.
+
+TIPOS_TITULO = {
+    'boleto_44': 0.25,
+    'linha_47': 0.15,
+    'arrecadacao_48': 0.10,
+    'pix_email': 0.10,
+    'pix_aleatoria': 0.10,
+    'pix_cpf': 0.08,
+    'pix_cnpj': 0.08,
+    'pix_telefone': 0.07,
+    'pix_dados_bancarios': 0.07,
+}
+
+NOMES = [
+    'DISTRIBUIDORA HOSPITALAR ALFA LTDA', 'Médica Suprimentos Ção S/A', 'LABORATORIO BETA ANALISES',
+    'CLINICA DE IMAGEM GAMA', 'Oxigênio Medicinal Sul Ltda', 'COOPERATIVA DE ANESTESIOLOGIA',
+    'LAVANDERIA INDUSTRIAL DELTA', 'FARMÁCIA DE MANIPULAÇÃO ÔMEGA', 'MANUTENCAO PREDIAL EPSILON ME',
+    'JOÃO DA SILVA (AUTÔNOMO)',
+]
+BANCOS = ['001', '033', '104', '136', '237', '341', '748', '756']
+TIPOS_CONTA = ['CORRENTE', 'Poupança', 'pagamento', np.nan]
+
+# Apelidos de coluna do export do Tasy (o motor resolve pelo get_val/resolver_coluna)
+COLUNAS_TASY = {
+    'NOME_FAVORECIDO': ' Favorecido ',
+    'VALOR_PAGAMENTO': 'VALOR',
+    'DATA_PAGAMENTO': 'data',
+    'cnpj_beneficiario': 'CNPJ',
+    'BANCO_FAVORECIDO': 'BANCO',
+    'AGENCIA_FAVORECIDA': 'AGENCIA',
+    'DIGITO_AGENCIA_FAVORECIDA': 'DV_AGENCIA',
+    'CONTA_FAVORECIDA': 'CONTA',
+    'DIGITO_CONTA_FAVORECIDA': 'DV_CONTA',
+}
+
+def _textos(matriz):
+    # Matriz de dígitos/bytes ASCII -> lista de strings (uma por linha)
+    largura = matriz.shape[1]
+    texto = np.ascontiguousarray(matriz, dtype=np.uint8).tobytes().decode('ascii')
+    return [texto[i:i + largura] for i in range(0, len(texto), largura)]
+
+def _digitos(matriz):
+    return _textos(matriz + 48)
+
+def _inserir(matriz, posicao, coluna):
+    return np.concatenate([matriz[:, :posicao], coluna[:, None], matriz[:, posicao:]], axis=1)
+
+def _barras_bancarias(rng, n, centavos):
+    # banco(3) + moeda 9 + DV + fator de vencimento(4) + valor(10) + campo livre(25)
+    banco = np.array([list(map(int, b)) for b in BANCOS])[rng.integers(0, len(BANCOS), n)]
+    fator = rng.integers(1000, 9999, n)
+    valor = np.minimum(centavos, 9_999_999_999)
+    corpo = np.concatenate([
+        banco, np.full((n, 1), 9),
+        (fator[:, None] // 10 ** np.arange(3, -1, -1)) % 10,
+        (valor[:, None] // 10 ** np.arange(9, -1, -1)) % 10,
+        rng.integers(0, 10, (n, 25)),
+    ], axis=1)
+    return _inserir(corpo, 4, dv_mod11_boleto(corpo))
+
+def _linhas_47(barras):
+    c1 = np.concatenate([barras[:, 0:4], barras[:, 19:24]], axis=1)
+    c2, c3 = barras[:, 24:34], barras[:, 34:44]
+    return np.concatenate([
+        c1, dv_mod10(c1)[:, None], c2, dv_mod10(c2)[:, None], c3, dv_mod10(c3)[:, None],
+        barras[:, 4:5], barras[:, 5:19],
+    ], axis=1)
+
+def _barras_arrecadacao(rng, n):
+    # 8 + segmento + referência (6/7 = mod 10, 8/9 = mod 11) + DV + 40 dígitos
+    corpo = np.concatenate([
+        np.full((n, 1), 8), rng.integers(1, 7, (n, 1)), rng.choice([6, 7, 8, 9], (n, 1)), rng.integers(0, 10, (n, 40)),
+    ], axis=1)
+    mod10 = np.isin(corpo[:, 2], (6, 7))
+    return _inserir(corpo, 3, np.where(mod10, dv_mod10(corpo), dv_mod11_arrecadacao(corpo))), mod10
+
+def _linhas_48(barras, mod10):
+    blocos = []
+    for i in range(4):
+        bloco = barras[:, 11 * i:11 * i + 11]
+        blocos += [bloco, np.where(mod10, dv_mod10(bloco), dv_mod11_arrecadacao(bloco))[:, None]]
+    return np.concatenate(blocos, axis=1)
+
+def _cpfs(rng, n):
+    d = rng.integers(0, 10, (n, 9))
+    dv1 = (d * np.arange(10, 1, -1)).sum(axis=1) * 10 % 11 % 10
+    d = np.concatenate([d, dv1[:, None]], axis=1)
+    dv2 = (d * np.arange(11, 1, -1)).sum(axis=1) * 10 % 11 % 10
+    return np.concatenate([d, dv2[:, None]], axis=1)
+
+def _cnpjs(rng, n):
+    pesos = np.array([6, 5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2])
+    d = np.concatenate([rng.integers(0, 10, (n, 8)), np.tile([0, 0, 0, 1], (n, 1))], axis=1)
+    for p in (pesos[1:], pesos):
+        r = (d * p).sum(axis=1) % 11
+        d = np.concatenate([d, np.where(r < 2, 0, 11 - r)[:, None]], axis=1)
+    return d
+
+def _formatar_cpf(s):
+    return f"{s[:3]}.{s[3:6]}.{s[6:9]}-{s[9:]}"
+
+def _formatar_cnpj(s):
+    return f"{s[:2]}.{s[2:5]}.{s[5:8]}/{s[8:12]}-{s[12:]}"
+
+def _uuids(rng, n):
+    hexa = np.frombuffer(b'0123456789abcdef', dtype=np.uint8)[rng.integers(0, 16, (n, 32))]
+    traco = np.full((n, 1), ord('-'), dtype=np.uint8)
+    return _textos(np.concatenate([hexa[:, :8], traco, hexa[:, 8:12], traco, hexa[:, 12:16], traco, hexa[:, 16:20], traco, hexa[:, 20:]], axis=1))
+
+def gerar_pagamentos(n, seed=0, estilo='cockpit', hoje=None):
+    """
+    DataFrame sintético com `n` pagamentos.
+    estilo='cockpit' usa os nomes da Pagamentos_Dia; estilo='tasy' usa os apelidos do export
+    (COLUNAS_TASY) e separa código de barras e chave PIX em COD_BARRAS / CHAVE_PIX.
+    """
+    rng = np.random.default_rng(seed)
+    hoje = hoje or datetime.now()
+    nomes_tipos = list(TIPOS_TITULO)
+    tipos = np.array(nomes_tipos)[rng.choice(len(nomes_tipos), n, p=list(TIPOS_TITULO.values()))]
+
+    centavos = np.maximum(rng.lognormal(10, 1.5, n).astype(np.int64), 1)
+    chaves = np.empty(n, dtype=object)
+
+    for tipo in ('boleto_44', 'linha_47'):
+        sel = tipos == tipo
+        barras = _barras_bancarias(rng, sel.sum(), centavos[sel])
+        chaves[sel] = _digitos(barras if tipo == 'boleto_44' else _linhas_47(barras))
+    sel = tipos == 'arrecadacao_48'
+    barras, mod10 = _barras_arrecadacao(rng, sel.sum())
+    chaves[sel] = _digitos(_linhas_48(barras, mod10))
+
+    sel = np.flatnonzero(tipos == 'pix_email')
+    chaves[sel] = [f"financeiro{i}@fornecedor{i % 97}.com.br" for i in sel]
+    sel = tipos == 'pix_aleatoria'
+    chaves[sel] = _uuids(rng, sel.sum())
+    sel = tipos == 'pix_cpf'
+    chaves[sel] = _digitos(_cpfs(rng, sel.sum()))
+    sel = tipos == 'pix_cnpj'
+    chaves[sel] = _digitos(_cnpjs(rng, sel.sum()))
+    sel = tipos == 'pix_telefone'
+    chaves[sel] = ['+55' + t for t in _digitos(np.concatenate([rng.integers(1, 10, (sel.sum(), 2)), np.full((sel.sum(), 1), 9), rng.integers(0, 10, (sel.sum(), 8))], axis=1))]
+    chaves[tipos == 'pix_dados_bancarios'] = ''
+
+    docs = np.empty(n, dtype=object)
+    pf = rng.random(n) < 0.2
+    docs[pf] = [_formatar_cpf(s) for s in _digitos(_cpfs(rng, pf.sum()))]
+    docs[~pf] = [_formatar_cnpj(s) for s in _digitos(_cnpjs(rng, (~pf).sum()))]
+
+    datas = np.array([(hoje + timedelta(days=d)).strftime('%d/%m/%Y') for d in range(31)])[rng.integers(0, 31, n)]
+
+    df = pd.DataFrame({
+        'Pagar?': True,
+        'NOME_FAVORECIDO': np.array(NOMES, dtype=object)[rng.integers(0, len(NOMES), n)],
+        'DATA_PAGAMENTO': datas,
+        'VALOR_PAGAMENTO': centavos / 100,
+        'CHAVE_PIX_OU_COD_BARRAS': chaves,
+        'cnpj_beneficiario': docs,
+        'BANCO_FAVORECIDO': np.array(BANCOS, dtype=object)[rng.integers(0, len(BANCOS), n)],
+        'AGENCIA_FAVORECIDA': rng.integers(1, 9999, n).astype(str),
+        'DIGITO_AGENCIA_FAVORECIDA': rng.choice(['0', '1', 'X', ' '], n),
+        'CONTA_FAVORECIDA': rng.integers(1000, 99_999_999, n).astype(str),
+        'DIGITO_CONTA_FAVORECIDA': rng.integers(0, 10, n).astype(str),
+        'TIPO_CONTA': np.array(TIPOS_CONTA, dtype=object)[rng.integers(0, len(TIPOS_CONTA), n)],
+        'Banco_Origem': 'Unicred - C.C',
+    })
+
+    if estilo == 'tasy':
+        boleto = np.isin(tipos, ['boleto_44', 'linha_47', 'arrecadacao_48'])
+        df.insert(4, 'COD_BARRAS', np.where(boleto, chaves, ''))
+        df.insert(5, 'CHAVE_PIX', np.where(boleto, '', chaves))
+        df = df.drop(columns='CHAVE_PIX_OU_COD_BARRAS').rename(columns=COLUNAS_TASY)
+        # Valores do Tasy chegam como texto com vírgula decimal
+        df['VALOR'] = [f"{v / 100:.2f}".replace('.', ',') for v in centavos]
+
+    return df
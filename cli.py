@@ -0,0 +1,235 @@
+"""
+Linha de comando do motor CNAB e do conversor de certidões de protesto (sem Streamlit).
+
+Uso (da raiz do projeto):
+    python cli.py remessa pagamentos.xlsx --saida remessas/
+    python cli.py remessa pagamentos.parquet --saida remessas/ --paralelo sim --workers 4 --resumo resumo.json
+    python cli.py remessa pagamentos.xlsx --saida remessas/ --confirmar
+    python cli.py remessa trimestre.parquet --saida remessas/ --max-registros-lote 20000 --max-bytes 50000000
+    python cli.py liberar            (lista as remessas confirmadas)
+    python cli.py liberar 123 --conta "Unicred - C.C"
+    python cli.py protestos certidoes/ --saida Protestos.xlsx --paralelo sim --workers 4
+    python cli.py protestos certidoes/ --historico historico.xlsx
+    python cli.py protestos certidoes/ --formato parquet
+
+remessa: lê a planilha de pagamentos (CSV, xlsx ou Parquet), pré-valida o lote e grava uma
+remessa por conta de origem (REM_<CONTA>_ddmm_NSA<nsa>.txt; arquivo existente nunca é
+sobrescrito). Acima dos limites (--max-registros-lote, --max-bytes ou os tetos do layout) a
+remessa da conta é dividida em vários lotes/arquivos, cada arquivo com seu NSA. Com erro de validação, grava os erros em
+CSV na pasta de saída e sai com código 1, sem gerar remessa. Os títulos só ficam marcados como
+enviados (e barrados nas próximas remessas) com --confirmar, para quando o arquivo segue direto
+para o banco; sem ele, gerar de novo o mesmo lote continua possível.
+liberar: tira do índice de enviados os títulos de uma remessa recusada pelo banco.
+protestos: lê um diretório (ou uma lista) de PDFs de certidão e grava a planilha estruturada
+(xlsx em streaming, ou csv/parquet com --formato);
+PDF ilegível é listado no stderr (e no resumo) e o código de saída vira 1, sem perder os demais.
+Com --historico, a planilha ganha a aba Conciliação (títulos candidatos de cada protesto).
+Os dois imprimem o tempo de cada etapa; --resumo grava o mesmo resumo em JSON (para o cron).
+"""
+import os
+import sys
+import json
+import time
+import argparse
+from datetime import datetime
+
+import pandas as pd
+
+from modules.utils import para_centavos
+from modules.cnab_engine import (
+    gerar_remessas_por_conta, confirmar_remessas, extrair_protestos_pdfs, CONTAS_ORIGEM, chave_nsa,
+    LIMITE_REGISTROS_LOTE,
+)
+from modules.pagamentos_emitidos import liberar_remessa, remessas_emitidas
+from modules.validacao import validar_pagamentos, avisos_pagamentos
+from modules.conciliacao_protestos import IndiceHistorico, conciliar_protestos
+from modules.exportacao import FORMATOS_EXPORTACAO, exportar, formato_do_caminho, nome_exportacao
+
+# Valores da coluna Pagar? que contam como marcado (planilha exportada vira texto)
+MARCADO = {'TRUE', 'VERDADEIRO', 'SIM', 'S', 'X', '1', '1.0'}
+
+class Cronometro:
+    """Acumula o tempo de cada etapa do lote, na ordem em que rodaram."""
+
+    def __init__(self):
+        self.etapas = {}
+
+    def medir(self, etapa, funcao, *args, **kwargs):
+        inicio = time.perf_counter()
+        resultado = funcao(*args, **kwargs)
+        self.etapas[etapa] = round(time.perf_counter() - inicio, 4)
+        return resultado
+
+    def imprimir(self):
+        for etapa, segundos in self.etapas.items():
+            print(f"  {etapa:<24} {segundos:>9.3f}s")
+        print(f"  {'total':<24} {sum(self.etapas.values()):>9.3f}s")
+
+def ler_pagamentos(caminho):
+    """Planilha de pagamentos como texto (zeros à esquerda de código, CPF e conta preservados)."""
+    extensao = os.path.splitext(caminho)[1].lower()
+    if extensao == '.csv':
+        return pd.read_csv(caminho, dtype=str, sep=None, engine='python', encoding='utf-8-sig', keep_default_na=False)
+    if extensao in ('.xlsx', '.xlsm', '.xls'):
+        return pd.read_excel(caminho, dtype=str, keep_default_na=False)
+    if extensao == '.parquet':
+        return pd.read_parquet(caminho)
+    raise ValueError(f"Formato de planilha não suportado: {extensao} (use .csv, .xlsx ou .parquet)")
+
+def preparar_pagamentos(df):
+    # Mesma preparação da carga do cockpit: só os marcados em Pagar? e dinheiro em centavos
+    if 'Pagar?' in df.columns:
+        marcado = df['Pagar?'].map(lambda v: v is True or str(v).strip().upper() in MARCADO)
+        df = df[marcado.to_numpy(dtype=bool)]
+    df = df.copy()
+    if 'VALOR_PAGAMENTO' in df.columns:
+        df['VALOR_CENTAVOS'] = para_centavos(df['VALOR_PAGAMENTO'])
+        df['VALOR_PAGAMENTO'] = df['VALOR_CENTAVOS'] / 100
+    return df
+
+def _paralelo(opcao):
+    return {'auto': None, 'sim': True, 'nao': False}[opcao]
+
+def comando_remessa(args):
+    cronometro = Cronometro()
+    df = cronometro.medir('leitura', lambda: preparar_pagamentos(ler_pagamentos(args.arquivo)))
+    os.makedirs(args.saida, exist_ok=True)
+    resumo = {'comando': 'remessa', 'arquivo': args.arquivo, 'pagamentos': len(df), 'remessas': []}
+
+    if df.empty:
+        print("Nenhum pagamento marcado para pagar.")
+    else:
+        erros = cronometro.medir('validacao', validar_pagamentos, df) if not args.sem_validacao else pd.DataFrame()
+        avisos = avisos_pagamentos(df) if not args.sem_validacao else pd.DataFrame()
+        for aviso in avisos.itertuples(index=False):
+            print(f"Aviso: linha {aviso.linha} ({aviso.campo}): {aviso.erro}", file=sys.stderr)
+        if not erros.empty:
+            caminho_erros = os.path.join(args.saida, f"ERROS_{datetime.now().strftime('%d%m')}.csv")
+            erros.to_csv(caminho_erros, index=False, sep=';', encoding='utf-8-sig')
+            print(f"{erros['linha'].nunique()} título(s) com problema; nada gerado. Erros em {caminho_erros}")
+            resumo['erros'] = len(erros)
+        else:
+            # Os arquivos vão direto para a pasta de saída, um bloco por vez
+            remessas = cronometro.medir(
+                'geracao', gerar_remessas_por_conta, df, args.saida, _paralelo(args.paralelo), args.workers,
+                args.max_registros_lote, args.max_bytes,
+            )
+            for remessa in remessas:
+                resumo['remessas'].append({
+                    'conta': remessa['conta'], 'nsa': remessa['nsa'], 'arquivo': remessa['caminho'],
+                    'pagamentos': remessa['qtd_pagamentos'], 'lotes': remessa['qtd_lotes'], 'bytes': remessa['bytes'],
+                })
+                print(f"{remessa['conta']} (NSA {remessa['nsa']}): {remessa['caminho']} ({remessa['qtd_pagamentos']} pagamento(s))")
+            if args.confirmar:
+                resumo['confirmados'] = cronometro.medir('confirmacao', confirmar_remessas, df, remessas)
+                print(f"{resumo['confirmados']} título(s) marcados como enviados.")
+            else:
+                print("Títulos não marcados como enviados (use --confirmar quando o arquivo for direto para o banco).")
+
+    cronometro.imprimir()
+    _gravar_resumo(args.resumo, resumo, cronometro)
+    return 1 if resumo.get('erros') else 0
+
+def comando_liberar(args):
+    if args.nsa is None:
+        emitidas = remessas_emitidas()
+        print(emitidas.to_string(index=False) if not emitidas.empty else "Nenhuma remessa confirmada.")
+        return 0
+    conta = chave_nsa(CONTAS_ORIGEM[args.conta]) if args.conta else None
+    qtd = liberar_remessa(args.nsa, conta)
+    print(f"{qtd} título(s) da remessa NSA {args.nsa} liberados para reenvio.")
+    return 0 if qtd else 1
+
+def listar_pdfs(entradas):
+    caminhos = []
+    for entrada in entradas:
+        if os.path.isdir(entrada):
+            caminhos += sorted(
+                os.path.join(entrada, nome) for nome in os.listdir(entrada) if nome.lower().endswith('.pdf')
+            )
+        else:
+            caminhos.append(entrada)
+    return caminhos
+
+def comando_protestos(args):
+    cronometro = Cronometro()
+    caminhos = listar_pdfs(args.entradas)
+    if not caminhos:
+        print("Nenhum PDF encontrado.")
+        return 1
+
+    # Os caminhos vão direto para o leitor: cada PDF é aberto por quem o extrai (o processo do
+    # pool, no lote grande), sem copiar o lote inteiro para a memória antes
+    df, erros = cronometro.medir('extracao', extrair_protestos_pdfs, caminhos, _paralelo(args.paralelo), args.workers, not args.sem_cache)
+    for nome, erro in zip(erros['Cartório/Arquivo'], erros['erro']):
+        print(f"Erro em {nome}: {erro}", file=sys.stderr)
+    planilhas = {'Protestos': df}
+    resumo = {'comando': 'protestos', 'pdfs': len(caminhos), 'registros': len(df)}
+    if args.historico and not df.empty:
+        indice = cronometro.medir('indice_historico', lambda: IndiceHistorico(ler_pagamentos(args.historico)))
+        conciliacao = cronometro.medir('conciliacao', conciliar_protestos, df, indice)
+        planilhas['Conciliação'] = conciliacao
+        resumo['sem_candidato'] = int((conciliacao['Situação'] == 'sem candidato').sum())
+        print(f"Conciliação com {args.historico}: {len(df) - resumo['sem_candidato']} de {len(df)} protesto(s) com título candidato")
+
+    formato = args.formato or formato_do_caminho(args.saida)
+    saida = args.saida or nome_exportacao(f"Protestos_Processados_{datetime.now().strftime('%d%m')}", formato, planilhas)
+    cronometro.medir('exportacao', exportar, planilhas, formato, saida)
+    print(f"{len(caminhos)} PDF(s), {len(df)} registro(s) de protesto: {saida}")
+
+    cronometro.imprimir()
+    resumo.update(saida=saida, erros=erros.to_dict('records'))
+    _gravar_resumo(args.resumo, resumo, cronometro)
+    return 1 if len(erros) else 0
+
+def _gravar_resumo(caminho, resumo, cronometro):
+    if not caminho: return
+    resumo = {**resumo, 'executado_em': datetime.now().isoformat(timespec='seconds'), 'tempos_s': cronometro.etapas}
+    with open(caminho, 'w', encoding='utf-8') as f:
+        json.dump(resumo, f, indent=2, ensure_ascii=False)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Remessa CNAB 240 e certidões de protesto em lote (sem Streamlit)")
+    comandos = parser.add_subparsers(dest='comando', required=True)
+
+    remessa = comandos.add_parser('remessa', help="gera as remessas CNAB a partir da planilha de pagamentos")
+    remessa.add_argument('arquivo', help="planilha de pagamentos (.csv, .xlsx ou .parquet)")
+    remessa.add_argument('--saida', default='.', help="pasta onde gravar as remessas (padrão: pasta atual)")
+    remessa.add_argument('--paralelo', choices=['auto', 'sim', 'nao'], default='auto')
+    remessa.add_argument('--workers', type=int, default=None)
+    remessa.add_argument('--sem-validacao', action='store_true', help="pula a pré-validação do lote")
+    remessa.add_argument('--max-registros-lote', type=int, default=LIMITE_REGISTROS_LOTE,
+                         help=f"registros por lote, com header e trailer (padrão e teto do layout: {LIMITE_REGISTROS_LOTE})")
+    remessa.add_argument('--max-bytes', type=int, default=None,
+                         help="tamanho máximo de cada arquivo em bytes; acima disso a remessa é dividida (padrão: sem limite)")
+    remessa.add_argument('--confirmar', action='store_true',
+                         help="marca os títulos como enviados (barrados nas próximas remessas) logo depois de gravar")
+    remessa.add_argument('--resumo', help="grava o resumo com os tempos em JSON")
+    remessa.set_defaults(funcao=comando_remessa)
+
+    liberar = comandos.add_parser('liberar', help="libera para reenvio os títulos de uma remessa confirmada (recusada pelo banco)")
+    liberar.add_argument('nsa', type=int, nargs='?', help="NSA da remessa (sem ele, lista as remessas confirmadas)")
+    liberar.add_argument('--conta', choices=list(CONTAS_ORIGEM), help="conta de origem (padrão: qualquer conta com esse NSA)")
+    liberar.set_defaults(funcao=comando_liberar)
+
+    protestos = comandos.add_parser('protestos', help="estrutura as certidões de protesto em planilha")
+    protestos.add_argument('entradas', nargs='+', help="PDFs ou diretórios com PDFs")
+    protestos.add_argument('--saida', help="arquivo de saída (padrão: Protestos_Processados_ddmm.xlsx)")
+    protestos.add_argument('--formato', choices=list(FORMATOS_EXPORTACAO),
+                           help="xlsx, csv ou parquet (padrão: pela extensão de --saida, senão xlsx); csv/parquet com --historico sai em .zip")
+    protestos.add_argument('--paralelo', choices=['auto', 'sim', 'nao'], default='auto')
+    protestos.add_argument('--workers', type=int, default=None)
+    protestos.add_argument('--sem-cache', action='store_true', help="relê todos os PDFs, ignorando o cache em disco")
+    protestos.add_argument('--historico', help="planilha do Historico (.csv, .xlsx ou .parquet) para conciliar os protestos")
+    protestos.add_argument('--resumo', help="grava o resumo com os tempos em JSON")
+    protestos.set_defaults(funcao=comando_protestos)
+
+    args = parser.parse_args(argv)
+    try:
+        return args.funcao(args)
+    except (ValueError, RuntimeError, OSError) as e:
+        print(f"Erro: {e}", file=sys.stderr)
+        return 2
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,118 @@
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import contextlib
+
+# =============================================================================
+# CACHE EM DISCO DAS CERTIDÕES DE PROTESTO JÁ LIDAS
+# =============================================================================
+# O mesmo PDF volta várias vezes (lote corrigido, outro analista da controladoria) e o
+# pdfplumber é a parte cara. Cada arquivo fica guardado pelo SHA-256 dos bytes, com o
+# texto das páginas e os registros já extraídos, cada um carimbado com a versão de quem
+# o produziu: texto de outro extrator é descartado; registros de outro parser são
+# refeitos a partir do texto guardado (sem reabrir o PDF). Acima do tamanho máximo, sai
+# o que foi usado há mais tempo (LRU).
+
+CAMINHO_CACHE_PROTESTOS = os.environ.get('CNAB_PROTESTOS_CACHE_DB', 'protestos_cache.sqlite3')
+LIMITE_CACHE_MB = float(os.environ.get('CNAB_PROTESTOS_CACHE_MB', '256'))
+TIMEOUT_TRAVA = 30
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS extracoes_pdf (
+    hash          TEXT PRIMARY KEY,
+    versao_texto  TEXT NOT NULL,
+    texto         TEXT NOT NULL,
+    versao_parser TEXT,
+    registros     TEXT,
+    tamanho       INTEGER NOT NULL,
+    usado_em      REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_extracoes_usado_em ON extracoes_pdf (usado_em);
+"""
+
+@contextlib.contextmanager
+def _conectar(caminho=None):
+    conn = sqlite3.connect(caminho or CAMINHO_CACHE_PROTESTOS, timeout=TIMEOUT_TRAVA, isolation_level=None)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(_ESQUEMA)
+        yield conn
+    finally:
+        conn.close()
+
+def hash_pdf(conteudo):
+    """SHA-256 dos bytes do PDF. Aceita arquivo aberto: lido em blocos e devolvido à posição original."""
+    if isinstance(conteudo, (bytes, bytearray, memoryview)):
+        return hashlib.sha256(conteudo).hexdigest()
+    h, inicio = hashlib.sha256(), conteudo.tell()
+    for bloco in iter(lambda: conteudo.read(2 ** 20), b''):
+        h.update(bloco)
+    conteudo.seek(inicio)
+    return h.hexdigest()
+
+def buscar_extracoes(hashes, versao_texto, caminho=None):
+    """
+    Procura vários PDFs de uma vez. Retorna {hash: (texto, versao_parser, registros)} só dos
+    que têm texto da `versao_texto`; registros vem None se nunca foram extraídos.
+    Os encontrados passam a ser os mais recentes do LRU.
+    """
+    unicos = list(dict.fromkeys(hashes))
+    if not unicos: return {}
+    with _conectar(caminho) as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("CREATE TEMP TABLE consulta (hash TEXT PRIMARY KEY) WITHOUT ROWID")
+            conn.executemany("INSERT OR IGNORE INTO consulta (hash) VALUES (?)", [(h,) for h in unicos])
+            linhas = conn.execute(
+                "SELECT e.hash, e.texto, e.versao_parser, e.registros FROM consulta c "
+                "JOIN extracoes_pdf e ON e.hash = c.hash WHERE e.versao_texto = ?", (versao_texto,)
+            ).fetchall()
+            conn.executemany("UPDATE extracoes_pdf SET usado_em = ? WHERE hash = ?", [(time.time(), h) for h, *_ in linhas])
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+    return {
+        h: (texto, versao_parser, json.loads(registros) if registros is not None else None)
+        for h, texto, versao_parser, registros in linhas
+    }
+
+def gravar_extracoes(itens, versao_texto, versao_parser, caminho=None, limite_mb=None):
+    """
+    Grava [(hash, texto, registros)] e apaga o que foi usado há mais tempo até o cache
+    caber em `limite_mb` (padrão LIMITE_CACHE_MB). Entradas de outra versão do extrator
+    de texto saem na hora: nunca mais seriam encontradas.
+    """
+    if not itens: return 0
+    agora = time.time()
+    linhas = []
+    for h, texto, registros in itens:
+        registros_json = json.dumps(registros, ensure_ascii=False)
+        tamanho = len(texto.encode('utf-8')) + len(registros_json.encode('utf-8'))
+        linhas.append((h, versao_texto, texto, versao_parser, registros_json, tamanho, agora))
+    limite_bytes = int((LIMITE_CACHE_MB if limite_mb is None else limite_mb) * 2 ** 20)
+
+    with _conectar(caminho) as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT OR REPLACE INTO extracoes_pdf (hash, versao_texto, texto, versao_parser, registros, tamanho, usado_em) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", linhas
+            )
+            conn.execute("DELETE FROM extracoes_pdf WHERE versao_texto != ?", (versao_texto,))
+            conn.execute(
+                "DELETE FROM extracoes_pdf WHERE hash IN ("
+                "  SELECT hash FROM (SELECT hash, SUM(tamanho) OVER (ORDER BY usado_em DESC, hash) AS acumulado FROM extracoes_pdf)"
+                "  WHERE acumulado > ?)", (limite_bytes,)
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+    return len(linhas)
+
+def limpar_cache_protestos(caminho=None):
+    with _conectar(caminho) as conn:
+        return conn.execute("DELETE FROM extracoes_pdf").rowcount
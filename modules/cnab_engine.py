@@ -1,9 +1,25 @@
 import os
 import re
+import mmap
+import threading
+import zipfile
+import sqlite3
 import io  # <--- Adicionado para manipulação de arquivos em memória
-import pdfplumber  # <--- Adicionado para leitura dos PDFs de protesto
+import numpy as np
 import pandas as pd
+from collections import deque, OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from modules.cnab_layouts import obter_layout, TAMANHO_REGISTRO, FIM_DE_LINHA
+from modules.nsa import reservar_nsa, chave_nsa, registrar_arquivo_nsa
+from modules.pagamentos_emitidos import registrar_pagamentos
+from modules.codigo_barras import digitos_para_barras_lote
+# Leitor de certidões de protesto: mora em modules/protestos.py, reexportado aqui para as telas
+from modules.protestos import extrair_dados_protesto_pdf, extrair_protestos_pdfs, extrair_protestos_em_fluxo
+from modules.utils import (
+    limpar_numero_serie, classificar_chaves_pagamento, para_centavos, centavos, formatar_centavos,
+    normalizar_texto, normalizar_texto_serie,
+)
 
 # --- CONFIGURAÇÕES GERAIS ---
 DADOS_HOSPITAL = {
@@ -24,36 +40,40 @@ DADOS_HOSPITAL = {
     'uf': 'SC'
 }
 
+# Contas de origem habilitadas para remessa, pelo nome usado na coluna Banco_Origem do cockpit.
+# Cada conta segue o mesmo formato do DADOS_HOSPITAL; o 'banco' escolhe o layout em modules/cnab_layouts.py.
+CONTAS_ORIGEM = {
+    'Unicred - C.C': DADOS_HOSPITAL,
+}
+CONTA_PADRAO = 'Unicred - C.C'
+COLUNA_CONTA_ORIGEM = 'Banco_Origem'
+
 # --- FUNÇÕES UTILITÁRIAS ---
 
-def obter_proximo_sequencial():
+def _nsa_legado():
+    # Último NSA gravado pelo contador antigo (nsa_counter.txt), usado só para semear o controle novo
     try:
-        arquivo_nsa = "nsa_counter.txt"
-        
-        # 1. Verifica se o arquivo já existe e lê o número que está lá
-        if os.path.exists(arquivo_nsa):
-            with open(arquivo_nsa, "r") as f: 
-                conteudo = f.read().strip()
-                atual = int(conteudo) if conteudo else 0
-        else:
-            atual = 0
-            
-        # 2. O PULO DO GATO: Se o banco travou os números baixos (testes), forçamos o salto para o 15
-        if atual < 15:
-            atual = 14
-            
-        # 3. Soma +1 (ou seja, vai gerar o 15 agora, e amanhã o 16, 17...)
-        novo = atual + 1
-        
-        # 4. Salva o novo número para a próxima vez
-        with open(arquivo_nsa, "w") as f: 
-            f.write(str(novo))
-            
-        return novo
-        
-    except Exception as e:
-        # Fallback de segurança 
-        return int(datetime.now().strftime('%H%M%S'))
+        with open("nsa_counter.txt", "r") as f:
+            conteudo = f.read().strip()
+            return int(conteudo) if conteudo else 0
+    except (OSError, ValueError):
+        return 0
+
+def reservar_sequenciais(qtd, conta=None, arquivos=None):
+    """
+    Reserva `qtd` NSAs consecutivos para a conta (um por arquivo de uma mesma rodada).
+    A reserva é atômica entre sessões; ver modules/nsa.py.
+    """
+    conta = conta or DADOS_HOSPITAL
+    semente = _nsa_legado() if conta is DADOS_HOSPITAL else 0
+    try:
+        return reservar_nsa(chave_nsa(conta), qtd, arquivos=arquivos, semente=semente)
+    except sqlite3.Error as e:
+        # Sem controle de NSA não dá para garantir número inédito: melhor parar do que o banco recusar
+        raise RuntimeError(f"Não foi possível reservar o NSA da remessa: {e}") from e
+
+def obter_proximo_sequencial(conta=None, arquivo=None):
+    return reservar_sequenciais(1, conta, [arquivo] if arquivo else None)[0]
 
 def get_val(row, possible_names, default=''):
     """
@@ -78,7 +98,10 @@ def limpar_numero(valor):
     return ''.join(filter(str.isdigit, s_val))
 
 def converter_linha_digitavel_para_barras(linha):
-    linha = limpar_numero(linha) 
+    return _digitos_para_barras(limpar_numero(linha))
+
+def _digitos_para_barras(linha):
+    # Recebe a linha já limpa (só dígitos)
     if len(linha) == 44: return linha 
     
     if len(linha) == 47: 
@@ -122,65 +145,87 @@ def classificar_transacao_real(dado):
 # GERADORES DE SEGMENTO
 # =============================================================================
 
+def _layout(registro, conta=None):
+    # Layouts pré-compilados do banco da conta de origem (modules/cnab_layouts.py)
+    return obter_layout((conta or DADOS_HOSPITAL)['banco'], registro)
+
+def _montar_segmento_j(num_lote, seq_lote_interno, cod_barras, nome_fav, dt_str, valor_str):
+    return _layout('segmento_j').linha(
+        lote=num_lote, seq_lote=seq_lote_interno, cod_barras=cod_barras, nome_favorecido=nome_fav,
+        data_vencimento=dt_str, valor_titulo=valor_str, data_pagamento=dt_str, valor_pagamento=valor_str,
+    )
+
+def _montar_segmento_j52(num_lote, seq_lote_interno, tipo_insc_cedente, doc_fav, nome_fav):
+    return _layout('segmento_j52').linha(
+        lote=num_lote, seq_lote=seq_lote_interno,
+        tipo_insc_pagador=tipo_insc_cedente, doc_pagador=doc_fav[:14], nome_pagador=nome_fav,
+        tipo_insc_beneficiario=tipo_insc_cedente, doc_beneficiario=doc_fav[:14], nome_beneficiario=nome_fav,
+        doc_sacador=DADOS_HOSPITAL['cnpj'], nome_sacador=DADOS_HOSPITAL['nome'],
+    )
+
+def _montar_segmento_a(num_lote, seq_lote_interno, banco_fav, agencia_fav, dv_agencia_fav,
+                       conta_fav, dv_conta_fav, nome_fav, chave_pix_raw, dt_str, valor_str):
+    return _layout('segmento_a').linha(
+        lote=num_lote, seq_lote=seq_lote_interno, banco_favorecido=banco_fav, agencia_favorecida=agencia_fav,
+        dv_agencia_favorecida=dv_agencia_fav, conta_favorecida=conta_fav, dv_conta_favorecida=dv_conta_fav,
+        nome_favorecido=nome_fav, seu_numero=chave_pix_raw, data_pagamento=dt_str, valor_pagamento=valor_str,
+        data_real=dt_str, valor_real=valor_str,
+    )
+
+def _montar_segmento_b(num_lote, seq_lote_interno, tipo_chave_code, tipo_insc, doc_fav, info_10, info_11, chave_pix_raw):
+    return _layout('segmento_b').linha(
+        lote=num_lote, seq_lote=seq_lote_interno, tipo_chave=tipo_chave_code, tipo_inscricao=tipo_insc,
+        doc_favorecido=doc_fav, informacao_10=info_10, informacao_11=info_11, informacao_12=chave_pix_raw,
+    )
+
+def _info_11_pix(tipo_chave_code, tc_raw):
+    # --- LÓGICA DO TIPO DE CONTA PARA DADOS BANCÁRIOS (05) ---
+    if tipo_chave_code == '005':
+        tipo_conta = "01" # Default para Conta Corrente
+        if 'POUPANCA' in tc_raw or 'POUPANÇA' in tc_raw:
+            tipo_conta = "03"
+        elif 'PAGAMENTO' in tc_raw:
+            tipo_conta = "02"
+        # O manual exige que se envie o tipo da conta na informação 11 (60 posições)
+        return tipo_conta.ljust(60)[:60]
+    return INFO_11_PADRAO
+
+INFO_10_PIX = "NAO INFORMADO".ljust(35)[:35]
+INFO_11_PADRAO = f"{'0':0>5}{'':<15}{'BAIRRO':<15}{'CIDADE':<15}{'00000':0>5}{'000':0>3}{'SC':<2}"
+
+def _centavos_da_linha(row):
+    # VALOR_CENTAVOS vem pronto da carga da planilha; sem ele, converte o valor em reais da linha
+    if 'VALOR_CENTAVOS' in row.index and pd.notna(row['VALOR_CENTAVOS']): return int(row['VALOR_CENTAVOS'])
+    return centavos(get_val(row, ['VALOR_PAGAMENTO', 'VALOR'], 0))
+
 def gerar_segmento_j_combo(row, seq_lote_interno, num_lote):
     chave_bruta = get_val(row, ['CHAVE_PIX_OU_COD_BARRAS', 'COD_BARRAS', 'CHAVE_PIX'])
     cod_barras = converter_linha_digitavel_para_barras(chave_bruta)
     
-    try: valor = float(get_val(row, ['VALOR_PAGAMENTO', 'VALOR'], 0.0))
-    except: valor = 0.0
-    
-    # CORREÇÃO 1: Fuga do erro de ponto flutuante (Boletos)
-    valor_str = f"{valor:.2f}".replace(".", "").zfill(15)
+    # CORREÇÃO 1: Valor em centavos inteiros, sem passar por float formatado (Boletos)
+    valor_str = str(_centavos_da_linha(row)).zfill(15)
     
     try:
         dt_obj = datetime.strptime(str(get_val(row, ['DATA_PAGAMENTO', 'DATA'])), '%d/%m/%Y')
         dt_str = dt_obj.strftime('%d%m%Y')
     except: dt_str = datetime.now().strftime('%d%m%Y')
     
-    nome_fav = str(get_val(row, ['NOME_FAVORECIDO', 'NOME', 'FAVORECIDO']))
-
-    seg_j = (
-        f"{'136':<3}{num_lote:0>4}{'3':<1}{seq_lote_interno:0>5}{'J':<1}{'000':<3}" 
-        f"{cod_barras[:44]:0>44}"       
-        f"{nome_fav[:30]:<30}"          
-        f"{dt_str:<8}"                  
-        f"{valor_str:0>15}"             
-        f"{'0':0>15}{'0':0>15}"         
-        f"{dt_str:<8}"                  
-        f"{valor_str:0>15}"             
-        f"{'0':0>15}"                   
-        f"{'':<20}{'':<20}{'09':<2}"    
-        f"{'':<6}{'':<10}"              
-    )[:240] + "\r\n"
+    nome_fav = normalizar_texto(str(get_val(row, ['NOME_FAVORECIDO', 'NOME', 'FAVORECIDO'])))
+
+    seg_j = _montar_segmento_j(num_lote, seq_lote_interno, cod_barras, nome_fav, dt_str, valor_str)
     
     seq_lote_interno += 1
     doc_fav = limpar_numero(get_val(row, ['cnpj_beneficiario', 'CNPJ']))
     if not doc_fav: doc_fav = "00000000000"
     tipo_insc_cedente = "1" if len(doc_fav) <= 11 else "2"
     
-    seg_j52 = (
-        f"{'136':<3}{num_lote:0>4}{'3':<1}{seq_lote_interno:0>5}{'J':<1}{'   ':<3}"
-        f"{'52':<2}"                    
-        f"{tipo_insc_cedente:<1}"       
-        f"{doc_fav[:14]:0>15}"          
-        f"{nome_fav[:40]:<40}"          
-        f"{tipo_insc_cedente:<1}"       
-        f"{doc_fav[:14]:0>15}"          
-        f"{nome_fav[:40]:<40}"          
-        f"{'2':<1}"                     
-        f"{DADOS_HOSPITAL['cnpj']:0>15}"
-        f"{DADOS_HOSPITAL['nome']:<40}" 
-        f"{'':<53}"                     
-    )[:240] + "\r\n"
+    seg_j52 = _montar_segmento_j52(num_lote, seq_lote_interno, tipo_insc_cedente, doc_fav, nome_fav)
     
     return seg_j + seg_j52, 2
 
 def gerar_segmentos_pix_a_b(row, seq_lote_interno, data_arq, num_lote):
-    try: valor = float(get_val(row, ['VALOR_PAGAMENTO', 'VALOR'], 0.0))
-    except: valor = 0.0
-    
-    # CORREÇÃO 2: String formatada direto em 15 posições (PIX)
-    valor_str = f"{valor:.2f}".replace(".", "").zfill(15)
+    # CORREÇÃO 2: Centavos inteiros formatados direto em 15 posições (PIX)
+    valor_str = str(_centavos_da_linha(row)).zfill(15)
     
     chave_pix_raw = str(get_val(row, ['CHAVE_PIX_OU_COD_BARRAS', 'CHAVE_PIX', 'CHAVE'])).strip()
     if chave_pix_raw.lower() in ['nan', 'none']: chave_pix_raw = ''
@@ -201,92 +246,218 @@ def gerar_segmentos_pix_a_b(row, seq_lote_interno, data_arq, num_lote):
         dt_str = dt_obj.strftime('%d%m%Y')
     except: dt_str = data_arq
     
-    nome_fav = str(get_val(row, ['NOME_FAVORECIDO', 'NOME', 'FAVORECIDO']))
+    nome_fav = normalizar_texto(str(get_val(row, ['NOME_FAVORECIDO', 'NOME', 'FAVORECIDO'])))
 
-    seg_a = (
-        f"{'136':<3}{num_lote:0>4}{'3':<1}{seq_lote_interno:0>5}{'A':<1}{'000':<3}{'009':<3}"
-        f"{banco_fav[:3]:0>3}{agencia_fav[:5]:0>5}{dv_agencia_fav[:1]:<1}"
-        f"{conta_fav[:12]:0>12}{dv_conta_fav[:1]:<1}{' ':1}"
-        f"{nome_fav[:30]:<30}{chave_pix_raw[:20]:<20}{dt_str:<8}{'BRL':<3}"
-        f"{'0':0>15}{valor_str:0>15}{'':<20}{dt_str:<8}{valor_str:0>15}"
-        f"{'':<40}{'00':<2}{'':<5}{'':<2}{'':<3}{'0':<1}{'':<10}"
-    )[:240] + "\r\n"
+    seg_a = _montar_segmento_a(num_lote, seq_lote_interno, banco_fav, agencia_fav, dv_agencia_fav,
+                               conta_fav, dv_conta_fav, nome_fav, chave_pix_raw, dt_str, valor_str)
 
     seq_lote_interno += 1
     doc_fav = limpar_numero(get_val(row, ['cnpj_beneficiario', 'CNPJ']))
     if not doc_fav: doc_fav = "00000000000"
     tipo_insc = "1" if len(doc_fav) <= 11 else "2"
     
-    info_10 = "NAO INFORMADO".ljust(35)[:35]
-    
-    # --- LÓGICA DO TIPO DE CONTA PARA DADOS BANCÁRIOS (05) ---
-    if tipo_chave_code == '005':
-        tipo_conta = "01" # Default para Conta Corrente
-        tc_raw = str(get_val(row, ['TIPO_CONTA'])).upper()
-        if 'POUPANCA' in tc_raw or 'POUPANÇA' in tc_raw:
-            tipo_conta = "03"
-        elif 'PAGAMENTO' in tc_raw:
-            tipo_conta = "02"
-        # O manual exige que se envie o tipo da conta na informação 11 (60 posições)
-        info_11 = tipo_conta.ljust(60)[:60]
-    else:
-        info_11 = f"{'0':0>5}{'':<15}{'BAIRRO':<15}{'CIDADE':<15}{'00000':0>5}{'000':0>3}{'SC':<2}"
-
-    seg_b = (
-        f"{'136':<3}{num_lote:0>4}{'3':<1}{seq_lote_interno:0>5}{'B':<1}"
-        f"{tipo_chave_code[:3]:0>3}{tipo_insc[:1]:<1}{doc_fav[:14]:0>14}"
-        f"{info_10}"
-        f"{info_11}"
-        f"{chave_pix_raw[:99]:<99}"
-        f"{'':<6}{'':<8}"
-    )[:240] + "\r\n"
+    tc_raw = str(get_val(row, ['TIPO_CONTA'])).upper() if tipo_chave_code == '005' else ''
+    info_11 = _info_11_pix(tipo_chave_code, tc_raw)
+
+    seg_b = _montar_segmento_b(num_lote, seq_lote_interno, tipo_chave_code, tipo_insc, doc_fav, INFO_10_PIX, info_11, chave_pix_raw)
     
     return seg_a + seg_b, 2
 
-def gerar_header_lote(num_lote, forma_lancamento, versao_layout):
-    return (
-        f"{'136':<3}{num_lote:0>4}{'1':<1}{'C':<1}{'20':<2}{forma_lancamento:<2}{versao_layout:<3}{'':<1}{'2':<1}"
-        f"{DADOS_HOSPITAL['cnpj']:0>14}{DADOS_HOSPITAL['convenio']:0>20}"
-        f"{DADOS_HOSPITAL['agencia']:0>5}{DADOS_HOSPITAL['dv_agencia']:<1}"
-        f"{DADOS_HOSPITAL['conta']:0>12}{DADOS_HOSPITAL['dv_conta']:<1}{' ':1}"
-        f"{DADOS_HOSPITAL['nome']:<30}{'':<40}" 
-        f"{DADOS_HOSPITAL['logradouro']:<30}{DADOS_HOSPITAL['numero']:0>5}"
-        f"{DADOS_HOSPITAL['complemento']:<15}{DADOS_HOSPITAL['cidade']:<20}"
-        f"{DADOS_HOSPITAL['cep']:0>5}{DADOS_HOSPITAL['cep_sufixo']:0>3}"
-        f"{DADOS_HOSPITAL['uf']:<2}{'':<8}{'':<10}\r\n"
-    )[:242]
-
-def gerar_trailer_lote(num_lote, qtd_registros, total_valor):
-    # CORREÇÃO 3: Trailer exige 18 posições numéricas, zfill(18)
-    valor_total_str = f"{total_valor:.2f}".replace(".", "").zfill(18)
+def _dados_empresa(conta):
+    return dict(
+        cnpj=conta['cnpj'], convenio=conta['convenio'],
+        agencia=conta['agencia'], dv_agencia=conta['dv_agencia'],
+        conta=conta['conta'], dv_conta=conta['dv_conta'], nome_empresa=conta['nome'],
+    )
+
+def gerar_header_lote(num_lote, forma_lancamento, versao_layout, conta=None):
+    conta = conta or DADOS_HOSPITAL
+    return _layout('header_lote', conta).linha(
+        lote=num_lote, forma_lancamento=forma_lancamento, versao_layout=versao_layout, **_dados_empresa(conta),
+        logradouro=conta['logradouro'], numero=conta['numero'],
+        complemento=conta['complemento'], cidade=conta['cidade'],
+        cep=conta['cep'], cep_sufixo=conta['cep_sufixo'], uf=conta['uf'],
+    )
+
+def gerar_trailer_lote(num_lote, qtd_registros, total_centavos, conta=None):
+    # CORREÇÃO 3: Trailer exige 18 posições numéricas, zfill(18); total já em centavos inteiros
+    valor_total_str = str(int(total_centavos)).zfill(18)
     
     qtd_total_lote = qtd_registros + 2 
-    return (
-        f"{'136':<3}{num_lote:0>4}{'5':<1}{'':<9}{qtd_total_lote:0>6}"
-        f"{valor_total_str:<18}{'0':0>18}{'0':0>6}{'':<165}{'':<10}\r\n"
-    )[:242]
+    return _layout('trailer_lote', conta).linha(lote=num_lote, qtd_registros=qtd_total_lote, valor_total=valor_total_str)
+
+def gerar_header_arquivo(nsa, data_arq, hora_arq, conta=None):
+    conta = conta or DADOS_HOSPITAL
+    return _layout('header_arquivo', conta).linha(data_geracao=data_arq, hora_geracao=hora_arq, nsa=nsa, **_dados_empresa(conta))
+
+def gerar_trailer_arquivo(total_registros_arquivo, conta=None, qtd_lotes=1):
+    return _layout('trailer_arquivo', conta).linha(qtd_lotes=qtd_lotes, qtd_registros=total_registros_arquivo + 2)
 
 # =============================================================================
-# MOTOR PRINCIPAL DE REMESSA
+# MOTOR COLUNAR (APELIDOS RESOLVIDOS UMA VEZ POR DATAFRAME)
 # =============================================================================
 
-def gerar_cnab_remessa(df_pagamentos):
-    if df_pagamentos.empty: return None
+def resolver_coluna(df, possible_names, default=''):
+    """
+    Versão colunar do get_val: resolve os apelidos uma única vez e devolve, para todas
+    as linhas, o primeiro valor preenchido seguindo a ordem das colunas do Excel/Tasy.
+    """
+    nomes = {name.upper() for name in possible_names}
+    resultado = np.empty(len(df), dtype=object)
+    resultado[:] = [default] * len(df)
+    pendente = np.ones(len(df), dtype=bool)
 
-    nsa = obter_proximo_sequencial()
-    now = datetime.now()
-    data_arq = now.strftime('%d%m%Y')
-    hora_arq = now.strftime('%H%M%S')
-    
-    header_arq = (
-        f"{'136':<3}{'0000':0>4}{'0':<1}{'':<9}{'2':<1}{DADOS_HOSPITAL['cnpj']:0>14}"
-        f"{DADOS_HOSPITAL['convenio']:0>20}{DADOS_HOSPITAL['agencia']:0>5}"
-        f"{DADOS_HOSPITAL['dv_agencia']:<1}{DADOS_HOSPITAL['conta']:0>12}"
-        f"{DADOS_HOSPITAL['dv_conta']:<1}{' ':1}{DADOS_HOSPITAL['nome']:<30}"
-        f"{'UNICRED':<30}{'':<10}{'1':<1}{data_arq:<8}{hora_arq:<6}{nsa:0>6}"
-        f"{'083':<3}{'00000':0>5}{'':<69}\r\n"
-    )[:242]
+    for pos, key in enumerate(df.columns):
+        if str(key).strip().upper() not in nomes: continue
+        serie = df.iloc[:, pos]
+        preenchido = (serie.notna() & (serie.astype(str).str.strip() != '')).to_numpy()
+        usar = pendente & preenchido
+        if usar.any():
+            resultado[usar] = serie.to_numpy(dtype=object)[usar]
+            pendente &= ~preenchido
+        if not pendente.any(): break
 
+    return resultado
+
+def _mapear_unicos(valores, funcao):
+    # Aplica a função uma vez por valor distinto (fornecedores, datas e bancos se repetem muito no lote)
+    serie = pd.Series(valores, dtype=object).astype(str)
+    mapa = {u: funcao(u) for u in pd.unique(serie)}
+    return serie.map(mapa).tolist()
+
+def _formatar_data_pagamento(texto, fallback):
+    try: return datetime.strptime(texto, '%d/%m/%Y').strftime('%d%m%Y')
+    except: return fallback
+
+def _doc_favorecido(valor):
+    doc = limpar_numero(valor)
+    return doc if doc else "00000000000"
+
+def _agencia_ou_zero(valor):
+    return limpar_numero(valor) or "0"
+
+def _banco_ou_zeros(valor):
+    return limpar_numero(valor) or "000"
+
+def _conta_favorecida(valor):
+    conta = limpar_numero(valor) or "0"
+    return "1" if conta == "0" else conta
+
+def _chave_pix_limpa(valor):
+    chave = valor.strip()
+    return '' if chave.lower() in ['nan', 'none'] else chave
+
+ALIASES_COD_BARRAS = ['CHAVE_PIX_OU_COD_BARRAS', 'COD_BARRAS', 'CHAVE_PIX']
+
+def converter_codigos_barras_lote(valores):
+    """
+    Versão em lote do converter_linha_digitavel_para_barras, para a coluna bruta inteira:
+    limpa para dígitos, converte linhas de 47/48 para o código de 44 e confere os DVs.
+    Retorna (dígitos limpos, códigos de barras, máscara de DVs válidos), calculados uma vez só
+    e reaproveitados na classificação e na renderização dos boletos.
+    """
+    digitos = limpar_numero_serie(valores)
+    barras, validos = digitos_para_barras_lote(digitos)
+    return digitos, barras, validos
+
+def classificar_lote_colunar(df, digitos=None):
+    """Devolve uma máscara booleana (True = BOLETO) para o DataFrame inteiro."""
+    if digitos is None:
+        return classificar_chaves_pagamento(resolver_coluna(df, ALIASES_COD_BARRAS))['tipo_pagamento'].to_numpy() == 'BOLETO'
+    return np.fromiter(map(len, digitos), dtype=np.int64, count=len(digitos)) >= 44
+
+def _serie(valores):
+    return pd.Series(valores, dtype=object).astype(str)
+
+def _sequenciais(seq_inicial, qtd):
+    return pd.Series(np.arange(seq_inicial, seq_inicial + 2 * qtd, 2)).astype(str)
+
+def centavos_colunar(df):
+    """Centavos (int64) de todas as linhas: usa VALOR_CENTAVOS da carga ou converte VALOR_PAGAMENTO/VALOR."""
+    if 'VALOR_CENTAVOS' in df.columns and df['VALOR_CENTAVOS'].notna().all():
+        return df['VALOR_CENTAVOS'].to_numpy(dtype=np.int64)
+    return para_centavos(resolver_coluna(df, ['VALOR_PAGAMENTO', 'VALOR'], 0))
+
+def _colunas_comuns(df, data_fallback):
+    valores = centavos_colunar(df)
+    valores_str = formatar_centavos(valores, 15)
+    datas = _serie(_mapear_unicos(resolver_coluna(df, ['DATA_PAGAMENTO', 'DATA']), lambda t: _formatar_data_pagamento(t, data_fallback)))
+    nomes = normalizar_texto_serie(_serie(resolver_coluna(df, ['NOME_FAVORECIDO', 'NOME', 'FAVORECIDO'])))
+    docs = _serie(_mapear_unicos(resolver_coluna(df, ['cnpj_beneficiario', 'CNPJ']), _doc_favorecido))
+    tipos_insc = pd.Series(np.where(docs.str.len() <= 11, "1", "2"), dtype=object).astype(str)
+    return valores, valores_str, datas, nomes, docs, tipos_insc
+
+def renderizar_boletos_colunar(df, num_lote, seq_inicial=1, data_arq=None, conta=None, barras=None):
+    """
+    Gera os segmentos J + J52 de todas as linhas de uma vez, montando cada campo como coluna.
+    barras: códigos já convertidos (converter_codigos_barras_lote), para não refazer a conversão.
+    Retorna (lista de registros na ordem do arquivo, centavos (int64) na ordem do lote).
+    """
+    data_arq = data_arq or datetime.now().strftime('%d%m%Y')
+    valores, valores_str, datas, nomes, docs, tipos_insc = _colunas_comuns(df, data_arq)
+    if barras is None: _, barras, _ = converter_codigos_barras_lote(resolver_coluna(df, ALIASES_COD_BARRAS))
+    barras = _serie(barras)
+
+    seq = _sequenciais(seq_inicial, len(df))
+    seq_j52 = _sequenciais(seq_inicial + 1, len(df))
+    docs_14 = docs.str.slice(0, 14)
+
+    conta = conta or DADOS_HOSPITAL
+    seg_j = _layout('segmento_j', conta).linhas(
+        lote=num_lote, seq_lote=seq, cod_barras=barras, nome_favorecido=nomes,
+        data_vencimento=datas, valor_titulo=valores_str, data_pagamento=datas, valor_pagamento=valores_str,
+    )
+    seg_j52 = _layout('segmento_j52', conta).linhas(
+        lote=num_lote, seq_lote=seq_j52,
+        tipo_insc_pagador=tipos_insc, doc_pagador=docs_14, nome_pagador=nomes,
+        tipo_insc_beneficiario=tipos_insc, doc_beneficiario=docs_14, nome_beneficiario=nomes,
+        doc_sacador=conta['cnpj'], nome_sacador=conta['nome'],
+    )
+
+    return _intercalar(seg_j, seg_j52), valores
+
+def renderizar_pix_colunar(df, num_lote, seq_inicial=1, data_arq=None, conta=None):
+    """
+    Gera os segmentos A + B de todas as linhas de uma vez, montando cada campo como coluna.
+    Retorna (lista de registros na ordem do arquivo, centavos (int64) na ordem do lote).
+    """
+    data_arq = data_arq or datetime.now().strftime('%d%m%Y')
+    valores, valores_str, datas, nomes, docs, tipos_insc = _colunas_comuns(df, data_arq)
+
+    chaves = _serie(_mapear_unicos(resolver_coluna(df, ['CHAVE_PIX_OU_COD_BARRAS', 'CHAVE_PIX', 'CHAVE']), _chave_pix_limpa))
+    tipos_chave = _serie(classificar_chaves_pagamento(chaves)['tipo_chave_pix'])
+    bancos = _serie(_mapear_unicos(resolver_coluna(df, ['BANCO_FAVORECIDO', 'BANCO'], '000'), _banco_ou_zeros))
+    agencias = _serie(_mapear_unicos(resolver_coluna(df, ['AGENCIA_FAVORECIDA', 'AGENCIA'], '0'), _agencia_ou_zero))
+    dvs_agencia = _serie(_mapear_unicos(resolver_coluna(df, ['DIGITO_AGENCIA_FAVORECIDA', 'DV_AGENCIA'], ' '), lambda t: t.strip() or " "))
+    contas = _serie(_mapear_unicos(resolver_coluna(df, ['CONTA_FAVORECIDA', 'CONTA'], '0'), _conta_favorecida))
+    dvs_conta = _serie(_mapear_unicos(resolver_coluna(df, ['DIGITO_CONTA_FAVORECIDA', 'DV_CONTA'], '0'), lambda t: t.strip() or "0"))
+    tipos_conta = _mapear_unicos(resolver_coluna(df, ['TIPO_CONTA']), str.upper)
+    infos_11 = _serie([
+        _info_11_pix(tc, raw) if tc == '005' else INFO_11_PADRAO
+        for tc, raw in zip(tipos_chave, tipos_conta)
+    ])
+
+    seg_a = _layout('segmento_a', conta).linhas(
+        lote=num_lote, seq_lote=_sequenciais(seq_inicial, len(df)), banco_favorecido=bancos, agencia_favorecida=agencias,
+        dv_agencia_favorecida=dvs_agencia, conta_favorecida=contas, dv_conta_favorecida=dvs_conta,
+        nome_favorecido=nomes, seu_numero=chaves, data_pagamento=datas, valor_pagamento=valores_str,
+        data_real=datas, valor_real=valores_str,
+    )
+    seg_b = _layout('segmento_b', conta).linhas(
+        lote=num_lote, seq_lote=_sequenciais(seq_inicial + 1, len(df)), tipo_chave=tipos_chave, tipo_inscricao=tipos_insc,
+        doc_favorecido=docs, informacao_10=INFO_10_PIX, informacao_11=infos_11, informacao_12=chaves,
+    )
+
+    return _intercalar(seg_a, seg_b), valores
+
+# =============================================================================
+# MOTOR PRINCIPAL DE REMESSA
+# =============================================================================
+
+CONFIG_LOTES = [('BOLETO', '31', '040'), ('PIX', '45', '046')]
+
+def _gerar_cnab_por_linha(df_pagamentos, nsa, data_arq, hora_arq):
+    # Caminho original (linha a linha com get_val), mantido para conferência do motor colunar
     lotes = {'PIX': [], 'BOLETO': []}
     
     for _, row in df_pagamentos.iterrows():
@@ -294,13 +465,11 @@ def gerar_cnab_remessa(df_pagamentos):
         tipo_real = classificar_transacao_real(chave_bruta)
         lotes[tipo_real].append(row)
             
-    content = header_arq
+    content = gerar_header_arquivo(nsa, data_arq, hora_arq)
     num_lote_arq = 1
     total_registros_arquivo = 0
 
-    config = [('BOLETO', '31', '040'), ('PIX', '45', '046')]
-
-    for tipo, forma, layout in config:
+    for tipo, forma, layout in CONFIG_LOTES:
         itens = lotes[tipo]
         if not itens: continue
 
@@ -319,109 +488,676 @@ def gerar_cnab_remessa(df_pagamentos):
             content += seg_str
             seq_lote_interno += qtd
             qtd_regs_lote += qtd
-            try: total_valor_lote += float(get_val(row, ['VALOR_PAGAMENTO', 'VALOR'], 0.0))
-            except: pass
+            total_valor_lote += _centavos_da_linha(row)
             
         content += gerar_trailer_lote(num_lote_arq, qtd_regs_lote, total_valor_lote)
         total_registros_arquivo += (qtd_regs_lote + 2)
         num_lote_arq += 1
 
-    trailer_arq = (
-        f"{'136':<3}{'9999':<4}{'9':<1}{'':<9}{'000001':0>6}"
-        f"{total_registros_arquivo+2:0>6}{'000000':0>6}{'':<205}\r\n"
-    )[:242]
-    
-    return content + trailer_arq
+    return content + gerar_trailer_arquivo(total_registros_arquivo, qtd_lotes=num_lote_arq - 1)
+
+# Quantidade de pagamentos renderizados por vez no modo streaming (memória constante por bloco)
+TAMANHO_BLOCO_CNAB = 5000
+
+def _intercalar(seg_1, seg_2):
+    # Cada pagamento gera dois registros (J/J52 ou A/B): devolve-os na ordem do arquivo
+    linhas = np.empty(2 * len(seg_1), dtype=object)
+    linhas[0::2] = seg_1.to_numpy(dtype=object)
+    linhas[1::2] = seg_2.to_numpy(dtype=object)
+    return linhas.tolist()
+
+# Modo automático: a partir desse volume compensa pagar a subida do pool de processos
+LIMIAR_PARALELO = 50000
+
+def _usar_paralelo(qtd_pagamentos, paralelo):
+    if paralelo is None:
+        return qtd_pagamentos >= LIMIAR_PARALELO and (os.cpu_count() or 1) > 1
+    return bool(paralelo)
+
+def _renderizar_bloco(tarefa):
+    # Roda dentro dos processos do pool, por isso precisa ser função de módulo (picklável)
+    tipo, bloco, num_lote, seq_inicial, data_arq, conta, barras = tarefa
+    if tipo == 'PIX': return renderizar_pix_colunar(bloco, num_lote, seq_inicial, data_arq, conta)
+    return renderizar_boletos_colunar(bloco, num_lote, seq_inicial, data_arq, conta, barras)
+
+def _mapear_em_ordem(executor, funcao, tarefas, janela):
+    # Igual ao executor.map, mas com no máximo `janela` blocos em voo (memória limitada)
+    pendentes = deque()
+    for tarefa in tarefas:
+        pendentes.append(executor.submit(funcao, tarefa))
+        if len(pendentes) >= janela:
+            yield pendentes.popleft().result()
+    while pendentes:
+        yield pendentes.popleft().result()
+
+def _codigos_e_lotes(df_pagamentos):
+    # Códigos limpos e convertidos uma vez só: servem para separar os lotes e para o segmento J
+    digitos, barras, _ = converter_codigos_barras_lote(resolver_coluna(df_pagamentos, ALIASES_COD_BARRAS))
+    mascara_boleto = classificar_lote_colunar(df_pagamentos, digitos)
+    lotes = [
+        (tipo, forma, layout, posicoes)
+        for tipo, forma, layout in CONFIG_LOTES
+        for posicoes in [np.flatnonzero(mascara_boleto if tipo == 'BOLETO' else ~mascara_boleto)]
+        if len(posicoes)
+    ]
+    return np.asarray(barras, dtype=object), lotes
+
+def _blocos_arquivo(df_pagamentos, lotes, barras, nsa, data_arq, hora_arq, tamanho_bloco, executor, janela, conta, renderizar=None):
+    """
+    Um arquivo de remessa (header, lotes planejados em `lotes` e trailers), em blocos de linhas.
+    renderizar: função que monta cada fatia (padrão _renderizar_bloco; no serial pode ser a do cache).
+    """
+    renderizar = renderizar or _renderizar_bloco
+    yield [gerar_header_arquivo(nsa, data_arq, hora_arq, conta)]
+    total_registros_arquivo = 0
+
+    for num_lote_arq, (tipo, forma, layout, posicoes) in enumerate(lotes, start=1):
+        yield [gerar_header_lote(num_lote_arq, forma, layout, conta)]
+        # Cada pagamento ocupa 2 registros, então a fatia que começa no pagamento i abre no seq 2*i + 1
+        tarefas = (
+            (tipo, df_pagamentos.iloc[fatia], num_lote_arq, 2 * inicio + 1, data_arq, conta,
+             barras[fatia].tolist() if tipo == 'BOLETO' else None)
+            for inicio in range(0, len(posicoes), tamanho_bloco)
+            for fatia in [posicoes[inicio:inicio + tamanho_bloco]]
+        )
+        resultados = _mapear_em_ordem(executor, _renderizar_bloco, tarefas, janela) if executor else map(renderizar, tarefas)
+
+        total_centavos_lote = 0
+        for linhas, valores in resultados:
+            # Soma inteira de centavos: o trailer bate exatamente com os segmentos
+            total_centavos_lote += int(valores.sum())
+            yield linhas
+
+        qtd_regs_lote = 2 * len(posicoes)
+        yield [gerar_trailer_lote(num_lote_arq, qtd_regs_lote, total_centavos_lote, conta)]
+        total_registros_arquivo += (qtd_regs_lote + 2)
+
+    yield [gerar_trailer_arquivo(total_registros_arquivo, conta, qtd_lotes=len(lotes))]
+
+# =============================================================================
+# CACHE DE SEGMENTOS RENDERIZADOS (REGERAÇÃO INCREMENTAL NO COCKPIT)
+# =============================================================================
+# A tesouraria marca e desmarca alguns títulos e gera a remessa de novo várias vezes antes
+# da final. Os dois registros de um pagamento só dependem da própria linha (mais a data do
+# arquivo e a conta de origem); lote e seq_lote são emendados na hora. Então cada linha fica
+# guardada pelo hash do seu conteúdo e, no clique seguinte, só as linhas novas ou alteradas
+# passam pelo renderizador; numeração, headers e trailers são refeitos como sempre.
+
+# Só o caminho serial usa o cache, e só até esse volume (o cache vive na memória do app)
+LIMITE_CACHE_SEGMENTOS = 20_000
+_CACHE_SEGMENTOS = OrderedDict()  # (contexto, hash da linha) -> (registro_1, registro_2, centavos)
+_ESTATISTICAS_CACHE = {'acertos': 0, 'renderizadas': 0}
+# O Streamlit roda o script de cada sessão numa thread: duas remessas ao mesmo tempo mexem
+# no mesmo LRU. Toda leitura/escrita do cache passa pela trava; a renderização fica fora dela
+_TRAVA_CACHE = threading.Lock()
+
+# Colunas que os renderizadores leem (os apelidos do resolver_coluna e o VALOR_CENTAVOS da carga).
+# Só elas entram no hash da linha: coluna de exibição (OC, NF, Observação, Pagar?...) mudando
+# não invalida o cache. Coluna nova lida pelo motor precisa entrar aqui também.
+COLUNAS_RENDERIZACAO = frozenset(nome.upper() for nome in ALIASES_COD_BARRAS + [
+    'CHAVE', 'VALOR_CENTAVOS', 'VALOR_PAGAMENTO', 'VALOR', 'DATA_PAGAMENTO', 'DATA',
+    'NOME_FAVORECIDO', 'NOME', 'FAVORECIDO', 'cnpj_beneficiario', 'CNPJ', 'BANCO_FAVORECIDO', 'BANCO',
+    'AGENCIA_FAVORECIDA', 'AGENCIA', 'DIGITO_AGENCIA_FAVORECIDA', 'DV_AGENCIA',
+    'CONTA_FAVORECIDA', 'CONTA', 'DIGITO_CONTA_FAVORECIDA', 'DV_CONTA', 'TIPO_CONTA',
+])
+
+def limpar_cache_segmentos():
+    with _TRAVA_CACHE:
+        _CACHE_SEGMENTOS.clear()
+        _ESTATISTICAS_CACHE.update(acertos=0, renderizadas=0)
+
+def estatisticas_cache_segmentos():
+    """Pagamentos servidos pelo cache (acertos) e renderizados de novo desde o último limpar_cache_segmentos."""
+    with _TRAVA_CACHE:
+        return dict(_ESTATISTICAS_CACHE, tamanho=len(_CACHE_SEGMENTOS))
+
+def _chaves_cache(df, data_arq, conta):
+    # O contexto entra na chave: mesmo título com outra data de arquivo, conta ou colunas é outra entrada
+    lidas = [pos for pos, coluna in enumerate(df.columns) if str(coluna).strip().upper() in COLUNAS_RENDERIZACAO]
+    df = df.iloc[:, lidas]
+    contexto = hash((tuple(map(str, df.columns)), data_arq, tuple(sorted((conta or DADOS_HOSPITAL).items()))))
+    try: hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    except TypeError: hashes = pd.util.hash_pandas_object(df.astype(str), index=False).to_numpy()  # célula com lista/dict
+    return [(contexto, int(h)) for h in hashes]
+
+def _renumerar(registro, lote, seq, posicoes):
+    (ini_lote, fim_lote), (ini_seq, fim_seq) = posicoes
+    return registro[:ini_lote] + lote + registro[fim_lote:ini_seq] + str(seq).zfill(fim_seq - ini_seq) + registro[fim_seq:]
+
+def _renderizar_bloco_cache(tarefa):
+    """Mesmo contrato do _renderizar_bloco, renderizando só as linhas que ainda não estão no cache."""
+    tipo, bloco, num_lote, seq_inicial, data_arq, conta, barras = tarefa
+    chaves = _chaves_cache(bloco, data_arq, conta)
+    # Cópia local das entradas do bloco: outra sessão pode despejar a chave entre as duas travas
+    with _TRAVA_CACHE:
+        entradas = {chave: _CACHE_SEGMENTOS[chave] for chave in chaves if chave in _CACHE_SEGMENTOS}
+    faltando = [i for i, chave in enumerate(chaves) if chave not in entradas]
+    if faltando:
+        novas, valores = _renderizar_bloco((
+            tipo, bloco.iloc[faltando], num_lote, 1, data_arq, conta,
+            [barras[i] for i in faltando] if barras is not None else None,
+        ))
+        for i, reg_1, reg_2, valor in zip(faltando, novas[0::2], novas[1::2], valores.tolist()):
+            entradas[chaves[i]] = (reg_1, reg_2, valor)
+
+    with _TRAVA_CACHE:
+        for chave in chaves:
+            _CACHE_SEGMENTOS[chave] = entradas[chave]
+            _CACHE_SEGMENTOS.move_to_end(chave)
+        while len(_CACHE_SEGMENTOS) > LIMITE_CACHE_SEGMENTOS:
+            _CACHE_SEGMENTOS.popitem(last=False)
+        _ESTATISTICAS_CACHE['renderizadas'] += len(faltando)
+        _ESTATISTICAS_CACHE['acertos'] += len(chaves) - len(faltando)
+
+    registros = ('segmento_j', 'segmento_j52') if tipo == 'BOLETO' else ('segmento_a', 'segmento_b')
+    pos_1, pos_2 = ([_layout(r, conta).posicao('lote'), _layout(r, conta).posicao('seq_lote')] for r in registros)
+    lote = str(num_lote).zfill(pos_1[0][1] - pos_1[0][0])
+    linhas, centavos_bloco = [], []
+    for i, chave in enumerate(chaves):
+        reg_1, reg_2, valor = entradas[chave]
+        seq = seq_inicial + 2 * i
+        linhas += [_renumerar(reg_1, lote, seq, pos_1), _renumerar(reg_2, lote, seq + 1, pos_2)]
+        centavos_bloco.append(valor)
+    return linhas, np.array(centavos_bloco, dtype=np.int64)
+
+def _blocos_cnab_colunar(df_pagamentos, nsa, data_arq, hora_arq, tamanho_bloco=TAMANHO_BLOCO_CNAB, paralelo=False, workers=None, conta=None):
+    """
+    Produz a remessa em blocos de linhas: header, lotes renderizados em fatias de
+    `tamanho_bloco` pagamentos e trailers calculados à medida que os blocos saem.
+    Com paralelo=True as fatias são renderizadas num pool de processos; o seq_lote_interno
+    inicial de cada fatia é calculado antes, então a numeração e os trailers são os mesmos do modo serial.
+    No serial, até LIMITE_CACHE_SEGMENTOS pagamentos, as linhas já renderizadas vêm do cache.
+    """
+    barras, lotes = _codigos_e_lotes(df_pagamentos)
+    if any(len(posicoes) > PAGAMENTOS_POR_LOTE_MAX for _, _, _, posicoes in lotes):
+        raise ValueError(
+            f"Lote com mais de {PAGAMENTOS_POR_LOTE_MAX} pagamentos estoura a numeração do CNAB 240; "
+            "use escrever_remessas_divididas para dividir em vários lotes/arquivos."
+        )
+    executor = ProcessPoolExecutor(max_workers=workers) if paralelo else None
+    janela = 2 * (workers or os.cpu_count() or 1)
+    renderizar = _renderizar_bloco_cache if not paralelo and len(df_pagamentos) <= LIMITE_CACHE_SEGMENTOS else None
+    try:
+        yield from _blocos_arquivo(df_pagamentos, lotes, barras, nsa, data_arq, hora_arq, tamanho_bloco, executor, janela, conta, renderizar)
+    finally:
+        if executor: executor.shutdown(cancel_futures=True)
+
+def _preparar_remessa(nsa=None, conta=None):
+    if nsa is None: nsa = obter_proximo_sequencial(conta)
+    now = datetime.now()
+    return nsa, now.strftime('%d%m%Y'), now.strftime('%H%M%S')
+
+def _digitos_ou(valores, padrao):
+    digitos = pd.Series(limpar_numero_serie(valores), dtype=object)
+    return digitos.where(digitos != '', padrao)
+
+def chaves_pagamento_colunar(df, data_arq=None, barras=None, boleto=None, valores=None, chaves_pix=None):
+    """
+    Chave de duplicidade de cada linha, como o título sai no arquivo:
+    boleto -> 'BOLETO:<código de barras>'; PIX -> 'PIX:<chave ou banco-agência-conta>:<centavos>:<ddmmaaaa>'.
+    barras/boleto/valores/chaves_pix: colunas que quem chama já calculou (a validação), para não
+    refazer a conversão dos códigos e dos valores.
+    """
+    data_arq = data_arq or datetime.now().strftime('%d%m%Y')
+    if barras is None or boleto is None:
+        digitos, barras, _ = converter_codigos_barras_lote(resolver_coluna(df, ALIASES_COD_BARRAS))
+        boleto = classificar_lote_colunar(df, digitos)
+    if valores is None: valores = centavos_colunar(df)
+    if chaves_pix is None:
+        chaves_pix = _mapear_unicos(resolver_coluna(df, ['CHAVE_PIX_OU_COD_BARRAS', 'CHAVE_PIX', 'CHAVE']), _chave_pix_limpa)
+    pix = ~np.asarray(boleto, dtype=bool)
+    chaves = pd.Series(np.where(boleto, 'BOLETO:' + pd.Series(barras, dtype=object), None), index=df.index, dtype=object)
+    if not pix.any(): return chaves
+
+    # Só as linhas PIX montam a chave do PIX; entre elas, só as sem chave olham os dados bancários
+    df_pix = df[pix]
+    destino = pd.Series(chaves_pix, dtype=object).to_numpy()[pix].copy()
+    sem_chave = destino == ''
+    if sem_chave.any():
+        # PIX por dados bancários é identificado pela conta do favorecido (mesmas regras do
+        # _banco_ou_zeros / _agencia_ou_zero / _conta_favorecida, na coluna inteira)
+        df_banco = df_pix[sem_chave]
+        contas = _digitos_ou(resolver_coluna(df_banco, ['CONTA_FAVORECIDA', 'CONTA'], '0'), '0')
+        destino[sem_chave] = (
+            _digitos_ou(resolver_coluna(df_banco, ['BANCO_FAVORECIDO', 'BANCO'], '000'), '000') + '-'
+            + _digitos_ou(resolver_coluna(df_banco, ['AGENCIA_FAVORECIDA', 'AGENCIA'], '0'), '0') + '-'
+            + contas.where(contas != '0', '1')
+        ).to_numpy()
+    datas = pd.Series(_mapear_unicos(resolver_coluna(df_pix, ['DATA_PAGAMENTO', 'DATA']), lambda t: _formatar_data_pagamento(t, data_arq)), dtype=object)
+    valores_pix = pd.Series(np.asarray(valores, dtype=np.int64)[pix]).astype(str).astype(object)
+    chaves[pix] = ('PIX:' + pd.Series(destino, dtype=object) + ':' + valores_pix + ':' + datas).to_numpy()
+    return chaves
+
+def confirmar_remessa(df_pagamentos, nsa, conta=None, data_arq=None):
+    """
+    Passo explícito de "remessa enviada ao banco": os títulos do arquivo entram no índice de já
+    emitidos (modules/pagamentos_emitidos.py) com o NSA dele e a validação passa a barrá-los.
+    Gerar ou baixar o arquivo não marca nada; remessa recusada volta com liberar_remessa.
+    Retorna a quantidade de títulos registrados agora (os que já estavam no índice não contam).
+    """
+    if df_pagamentos.empty: return 0
+    return registrar_pagamentos(chaves_pagamento_colunar(df_pagamentos, data_arq), nsa, chave_nsa(conta or DADOS_HOSPITAL))
+
+def gerar_linhas_cnab(df_pagamentos, nsa=None, tamanho_bloco=TAMANHO_BLOCO_CNAB, paralelo=None, workers=None, conta=None):
+    """
+    Versão em streaming do gerar_cnab_remessa: devolve os registros um a um (com "\\r\\n"),
+    sem montar o arquivo inteiro em memória.
+    paralelo=None decide pelo volume (LIMIAR_PARALELO); True/False força o modo.
+    """
+    if df_pagamentos.empty: return
+    nsa, data_arq, hora_arq = _preparar_remessa(nsa, conta)
+    usar_pool = _usar_paralelo(len(df_pagamentos), paralelo)
+    for linhas in _blocos_cnab_colunar(df_pagamentos, nsa, data_arq, hora_arq, tamanho_bloco, usar_pool, workers, conta):
+        yield from linhas
+
+def escrever_cnab_remessa(df_pagamentos, destino, nsa=None, encoding='utf-8', tamanho_bloco=TAMANHO_BLOCO_CNAB, paralelo=None, workers=None, conta=None):
+    """
+    Escreve a remessa direto num arquivo binário (open(..., 'wb'), BytesIO, tempfile...),
+    bloco a bloco. Retorna a quantidade de registros gravados (0 se não houver pagamentos).
+    """
+    if df_pagamentos.empty: return 0
+    nsa, data_arq, hora_arq = _preparar_remessa(nsa, conta)
+    usar_pool = _usar_paralelo(len(df_pagamentos), paralelo)
+    qtd_registros = 0
+    for linhas in _blocos_cnab_colunar(df_pagamentos, nsa, data_arq, hora_arq, tamanho_bloco, usar_pool, workers, conta):
+        destino.write(''.join(linhas).encode(encoding))
+        qtd_registros += len(linhas)
+    return qtd_registros
+
+def gerar_cnab_remessa_buffer(df_pagamentos, nsa=None, paralelo=None, workers=None, conta=None):
+    """
+    Gera a remessa num io.BytesIO já posicionado no início, pronto para o st.download_button.
+    Retorna None se não houver pagamentos.
+    """
+    buffer = io.BytesIO()
+    if not escrever_cnab_remessa(df_pagamentos, buffer, nsa=nsa, paralelo=paralelo, workers=workers, conta=conta): return None
+    buffer.seek(0)
+    return buffer
+
+def gerar_cnab_remessa(df_pagamentos, modo='colunar', paralelo=None, workers=None, conta=None):
+    """
+    Gera o arquivo de remessa CNAB 240.
+    modo='colunar' (padrão) processa o DataFrame inteiro de uma vez;
+    modo='linha' usa o motor original linha a linha (saída idêntica, byte a byte).
+    Os títulos só contam como enviados depois do confirmar_remessa.
+    paralelo=None liga o pool de processos só para remessas grandes (ver LIMIAR_PARALELO).
+    conta: dados da conta de origem (padrão DADOS_HOSPITAL); o modo 'linha' só atende a conta padrão.
+    """
+    if df_pagamentos.empty: return None
+    # O que pode recusar a remessa vem antes da reserva: NSA reservado e não usado vira buraco na sequência
+    if modo not in ('colunar', 'linha'):
+        raise ValueError(f"Modo de geração desconhecido: {modo} (use 'colunar' ou 'linha').")
+    if modo == 'linha' and conta is not None and conta is not DADOS_HOSPITAL:
+        raise ValueError("modo='linha' só gera remessa para a conta padrão (DADOS_HOSPITAL).")
+    _layout('header_arquivo', conta)  # banco da conta sem layout cadastrado: KeyError já aqui
+
+    nsa, data_arq, hora_arq = _preparar_remessa(conta=conta)
+
+    if modo == 'linha':
+        conteudo = _gerar_cnab_por_linha(df_pagamentos, nsa, data_arq, hora_arq)
+    else:
+        usar_pool = _usar_paralelo(len(df_pagamentos), paralelo)
+        blocos = _blocos_cnab_colunar(df_pagamentos, nsa, data_arq, hora_arq, TAMANHO_BLOCO_CNAB, usar_pool, workers, conta)
+        conteudo = ''.join(linha for linhas in blocos for linha in linhas)
+    return conteudo
 
 # Alias
 gerar_cnab_pix = gerar_cnab_remessa
 
-
 # =============================================================================
-# 📄 NOVA FUNCIONALIDADE: LEITOR INTELIGENTE DE PROTESTOS (PDF)
+# REMESSA DIVIDIDA EM VÁRIOS LOTES / ARQUIVOS (LIMITES DO BANCO E DO LAYOUT)
 # =============================================================================
 
-def extrair_dados_protesto_pdf(uploaded_files):
+BYTES_POR_REGISTRO = TAMANHO_REGISTRO + len(FIM_DE_LINHA)
+# Tetos do próprio layout: seq_lote tem 5 dígitos, lote 4 e a contagem de registros do arquivo 6
+LIMITE_REGISTROS_LOTE = 100_000
+LIMITE_LOTES_ARQUIVO = 9_999
+LIMITE_REGISTROS_ARQUIVO = 999_999
+PAGAMENTOS_POR_LOTE_MAX = (LIMITE_REGISTROS_LOTE - 2) // 2
+# NSA do header na prévia (nada é reservado; o arquivo não vai para o banco)
+NSA_PREVIA = 0
+
+def _bytes_por_pagamento(df_pagamentos, lotes, barras, encoding):
+    """
+    Bytes que cada pagamento ocupa no arquivo (2 registros). Texto só ASCII dá sempre
+    2 x BYTES_POR_REGISTRO; linhas com algo fora do ASCII (o nome já sai normalizado, mas a
+    chave PIX vai como veio) são renderizadas à parte e medidas já codificadas.
+    """
+    tamanhos = np.full(len(df_pagamentos), 2 * BYTES_POR_REGISTRO, dtype=np.int64)
+    ascii_ok = np.ones(len(df_pagamentos), dtype=bool)
+    for pos in range(df_pagamentos.shape[1]):
+        ascii_ok &= df_pagamentos.iloc[:, pos].astype(str).str.isascii().to_numpy(dtype=bool, na_value=True)
+    if ascii_ok.all(): return tamanhos
+
+    for tipo, _, _, posicoes in lotes:
+        medir = posicoes[~ascii_ok[posicoes]]
+        if not len(medir): continue
+        linhas, _ = _renderizar_bloco((tipo, df_pagamentos.iloc[medir], 1, 1, None, None, barras[medir].tolist() if tipo == 'BOLETO' else None))
+        tamanhos[medir] = [len((a + b).encode(encoding)) for a, b in zip(linhas[0::2], linhas[1::2])]
+    return tamanhos
+
+def planejar_arquivos(lotes, max_registros_lote=LIMITE_REGISTROS_LOTE, max_bytes_arquivo=None, bytes_pagamento=None):
     """
-    Processa os arquivos PDF de certidões de protesto (suporta múltiplos layouts).
+    Distribui os lotes (tipo, forma, layout, posições) em arquivos respeitando o máximo de
+    registros por lote (contando header e trailer do lote) e de bytes por arquivo.
+    bytes_pagamento: tamanho de cada pagamento por posição (padrão 2 registros de BYTES_POR_REGISTRO).
+    Mantém a ordem dos pagamentos. Retorna uma lista de arquivos, cada um com a sua lista de lotes.
     """
+    por_lote = (min(max_registros_lote, LIMITE_REGISTROS_LOTE) - 2) // 2
+    if por_lote < 1: raise ValueError("Limite de registros por lote pequeno demais para caber um pagamento.")
+    bytes_arquivo = (max_bytes_arquivo or np.inf) - 2 * BYTES_POR_REGISTRO
+
+    arquivos, atual, regs_livres, bytes_livres = [], [], LIMITE_REGISTROS_ARQUIVO - 2, bytes_arquivo
+    for tipo, forma, layout, posicoes in lotes:
+        tamanhos = bytes_pagamento[posicoes] if bytes_pagamento is not None else np.full(len(posicoes), 2 * BYTES_POR_REGISTRO)
+        acumulado = np.concatenate([[0], np.cumsum(tamanhos)])
+        inicio = 0
+        while inicio < len(posicoes):
+            # Quantos pagamentos cabem num lote novo neste arquivo (lote gasta header + trailer)
+            cabe_bytes = np.searchsorted(acumulado, acumulado[inicio] + bytes_livres - 2 * BYTES_POR_REGISTRO, side='right') - 1 - inicio
+            cabe = min(por_lote, (regs_livres - 2) // 2, cabe_bytes)
+            if cabe < 1 or len(atual) == LIMITE_LOTES_ARQUIVO:
+                if not atual: raise ValueError("Limite de bytes por arquivo pequeno demais para caber um pagamento.")
+                arquivos.append(atual)
+                atual, regs_livres, bytes_livres = [], LIMITE_REGISTROS_ARQUIVO - 2, bytes_arquivo
+                continue
+            atual.append((tipo, forma, layout, posicoes[inicio:inicio + cabe]))
+            regs_livres -= 2 + 2 * cabe
+            bytes_livres -= 2 * BYTES_POR_REGISTRO + (acumulado[inicio + cabe] - acumulado[inicio])
+            inicio += cabe
+    if atual: arquivos.append(atual)
+    return arquivos
+
+def escrever_remessas_divididas(df_pagamentos, abrir_destino, max_registros_lote=LIMITE_REGISTROS_LOTE, max_bytes_arquivo=None,
+                                conta=None, encoding='utf-8', tamanho_bloco=TAMANHO_BLOCO_CNAB, paralelo=None, workers=None, previa=False):
+    """
+    Gera quantas remessas forem necessárias para respeitar os limites, cada uma com seu NSA
+    (reservados de uma vez), seus lotes e trailers próprios. Os arquivos saem um de cada vez,
+    em streaming, então a memória fica limitada a um bloco de renderização (no serial, até
+    LIMITE_CACHE_SEGMENTOS pagamentos, as linhas já renderizadas vêm do cache).
+    abrir_destino(nsa, indice) deve devolver um arquivo binário aberto (usado com `with`).
+    previa=True não reserva NSA: os headers saem com NSA_PREVIA.
+    Retorna uma lista com o resumo de cada arquivo (nsa, qtd_lotes, qtd_pagamentos, qtd_registros,
+    bytes, indice = linhas do DataFrame que o arquivo leva, para o confirmar_remessa).
+    """
+    if df_pagamentos.empty: return []
+    barras, lotes = _codigos_e_lotes(df_pagamentos)
+    tamanhos = _bytes_por_pagamento(df_pagamentos, lotes, barras, encoding) if max_bytes_arquivo else None
+    arquivos = planejar_arquivos(lotes, max_registros_lote, max_bytes_arquivo, tamanhos)
+    nsas = [NSA_PREVIA] * len(arquivos) if previa else reservar_sequenciais(len(arquivos), conta)
+    now = datetime.now()
+    data_arq, hora_arq = now.strftime('%d%m%Y'), now.strftime('%H%M%S')
+
+    executor = ProcessPoolExecutor(max_workers=workers) if _usar_paralelo(len(df_pagamentos), paralelo) else None
+    janela = 2 * (workers or os.cpu_count() or 1)
+    renderizar = _renderizar_bloco_cache if executor is None and len(df_pagamentos) <= LIMITE_CACHE_SEGMENTOS else None
+    resumo = []
     try:
-        all_records = []
-        
-        for uploaded_file in uploaded_files:
-            text = ""
-            with pdfplumber.open(io.BytesIO(uploaded_file.read())) as pdf:
-                for page in pdf.pages:
-                    extracted = page.extract_text()
-                    if extracted:
-                        text += extracted + "\n"
-
-            # Quebra o texto sempre que encontrar a palavra "Protocolo"
-            chunks = re.split(r'(?i)Protocolo[:\s]*', text)
-
-            for chunk in chunks[1:]: 
-                record = {'Cartório/Arquivo': uploaded_file.name}
-
-                # 1. Protocolo
-                m_prot = re.search(r'\b(\d{5,10})\b', chunk[:150])
-                record['Protocolo'] = m_prot.group(1) if m_prot else "-"
-
-                # 2. Credor / Sacador (Regras de faxina para o Cartório Salles)
-                sacador_match = re.search(r'(?:Sacador|Credor(?: original)?|Cedente)[:\s]+(?:Endere[çc]o[:\s]+)?([^\n]+)', chunk, re.IGNORECASE)
-                
-                if not sacador_match:
-                    sacador_match = re.search(r'Apresentante[:\s]+([^\n]+)', chunk, re.IGNORECASE)
-
-                if sacador_match:
-                    nome_limpo = sacador_match.group(1).strip()
-                    nome_limpo = re.split(r'(?i)\s*-|\s*CNPJ|\s*CPF|\s*Documento', nome_limpo)[0].strip()
-                    nome_limpo = re.sub(r'^\d{3,4}(?=[A-Za-z])', '', nome_limpo)
-                    record['Credor/Sacador'] = nome_limpo
-                else:
-                    record['Credor/Sacador'] = "Não identificado"
-
-                # 3. CNPJ / CPF do Credor (A BALA DE PRATA PARA PEGAR O FORNECEDOR E IGNORAR O HOSPITAL)
-                # Extrai todos os padrões de CNPJ e CPF do bloco do protesto
-                todos_documentos = re.findall(r'\d{2}\.\d{3}\.\d{3}/\d{4}\-\d{2}|\d{3}\.\d{3}\.\d{3}\-\d{2}', chunk)
-                # Remove o CNPJ do hospital da lista para sobrar apenas o do fornecedor
-                docs_fornecedor = [doc for doc in todos_documentos if doc != '85.307.098/0001-87']
-                
-                record['CNPJ/CPF Credor'] = docs_fornecedor[0] if docs_fornecedor else "-"
-
-                # 4. Valor
-                valor = re.search(r'(?:Valor(?: Original| Declarado)?|Saldo)[:\s]*(?:R\$)?\s*([\d\.,]{4,})', chunk, re.IGNORECASE)
-                record['Valor/Saldo'] = f"R$ {valor.group(1).strip()}" if valor else "-"
-
-                # 5. Custas Cartorárias
-                custas = re.search(r'(?:Custas|Emolumentos|Taxas)[:\s]*(?:R\$)?\s*([\d\.,]{3,})', chunk, re.IGNORECASE)
-                record['Custas/Taxas'] = f"R$ {custas.group(1).strip()}" if custas else "-"
-
-                # 6. Emissão do Título
-                emissao = re.search(r'(?:Emissão|Data Emissã[oo])[:\s]*(\d{2}/\d{2}/\d{4})', chunk, re.IGNORECASE)
-                record['Emissão'] = emissao.group(1) if emissao else "-"
-
-                # 7. Vencimento original
-                vencimento = re.search(r'(?:Vencimento|Venc\.)[:\s]*(\d{2}/\d{2}/\d{4})', chunk, re.IGNORECASE)
-                record['Vencimento'] = vencimento.group(1) if vencimento else "-"
-
-                # 8. Data do Protesto
-                protesto = re.search(r'(?:Data(?:\s+do)?\s+Protesto|Protestado\s+em|Protesto\s+em)[:\s]*(\d{2}/\d{2}/\d{4})', chunk, re.IGNORECASE)
-                record['Data do Protesto'] = protesto.group(1) if protesto else "-"
-
-                # 9. Título/Número
-                titulo = re.search(r'(?:nº(?:\s+do)?\s+Título|Título\s+n.*?|Número)[:\s]*([A-Za-z0-9\-\.\/]+)', chunk, re.IGNORECASE)
-                record['Título/Número'] = titulo.group(1).strip() if titulo else "-"
-
-                # 10. Espécie
-                especie = re.search(r'Espécie(?: do Titulo)?[:\s]+([A-Za-zÀ-ÿ0-9\s\(\)]+?)(?:\s*-|\s*Emissão|\s*Saldo|\s*Vencimento|\n)', chunk, re.IGNORECASE)
-                record['Espécie'] = especie.group(1).strip() if especie else "-"
-
-                # Filtro anti-lixo
-                if record['Protocolo'] != "-" and record['Valor/Saldo'] != "-":
-                    all_records.append(record)
-                
-        return pd.DataFrame(all_records)
-        
-    except Exception as e:
-        print(f"Erro interno ao ler PDF: {e}")
-        return pd.DataFrame()
+        for indice, (nsa, lotes_arquivo) in enumerate(zip(nsas, arquivos)):
+            qtd_registros = qtd_bytes = 0
+            with abrir_destino(nsa, indice) as destino:
+                for linhas in _blocos_arquivo(df_pagamentos, lotes_arquivo, barras, nsa, data_arq, hora_arq, tamanho_bloco, executor, janela, conta, renderizar):
+                    dados = ''.join(linhas).encode(encoding)
+                    destino.write(dados)
+                    qtd_registros += len(linhas)
+                    qtd_bytes += len(dados)
+
+            posicoes = np.concatenate([p for _, _, _, p in lotes_arquivo])
+            resumo.append({
+                'nsa': nsa, 'qtd_lotes': len(lotes_arquivo), 'qtd_pagamentos': len(posicoes),
+                'qtd_registros': qtd_registros, 'bytes': qtd_bytes, 'indice': df_pagamentos.index[posicoes],
+            })
+    finally:
+        if executor: executor.shutdown(cancel_futures=True)
+    return resumo
+
+def gerar_remessas_divididas_zip(df_pagamentos, destino, max_registros_lote=LIMITE_REGISTROS_LOTE, max_bytes_arquivo=None,
+                                 conta=None, nome_conta=CONTA_PADRAO, paralelo=None, workers=None):
+    """
+    Versão do escrever_remessas_divididas que empacota as remessas num .zip gravado em `destino`
+    (caminho ou arquivo binário), um REM_<CONTA>_ddmm_NSA<nsa>.txt por arquivo. Cada remessa é
+    comprimida à medida que os blocos saem: nada do zip fica inteiro na memória.
+    Retorna o resumo, com o nome de cada arquivo.
+    """
+    nomes = {}
+
+    with zipfile.ZipFile(destino, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+        def abrir(nsa, indice):
+            nomes[nsa] = nome_arquivo_remessa(nome_conta, nsa=nsa)
+            return zf.open(nomes[nsa], 'w', force_zip64=True)
+        resumo = escrever_remessas_divididas(
+            df_pagamentos, abrir, max_registros_lote, max_bytes_arquivo, conta=conta, paralelo=paralelo, workers=workers
+        )
+
+    for item in resumo:
+        item['arquivo'] = nomes[item['nsa']]
+        registrar_arquivo_nsa(chave_nsa(conta or DADOS_HOSPITAL), item['nsa'], item['arquivo'])
+    return resumo
+
+# =============================================================================
+# REMESSAS POR CONTA DE ORIGEM (UM ARQUIVO POR CONTA/CONVÊNIO)
+# =============================================================================
+
+def agrupar_por_conta_origem(df_pagamentos, coluna=COLUNA_CONTA_ORIGEM, conta_padrao=CONTA_PADRAO):
+    """
+    Separa os pagamentos pela conta de origem, preservando a ordem das linhas.
+    Linhas sem conta vão para a conta padrão; conta não cadastrada em CONTAS_ORIGEM gera ValueError.
+    """
+    if coluna in df_pagamentos.columns:
+        nomes = df_pagamentos[coluna].fillna('').astype(str).str.strip()
+        nomes = nomes.where(nomes != '', conta_padrao)
+    else:
+        nomes = pd.Series(conta_padrao, index=df_pagamentos.index)
+
+    cadastradas = {nome.upper(): nome for nome in CONTAS_ORIGEM}
+    chaves = nomes.str.upper()
+    desconhecidas = sorted(set(nomes[~chaves.isin(cadastradas.keys())]))
+    if desconhecidas:
+        raise ValueError(f"Conta de origem sem cadastro para remessa: {', '.join(desconhecidas)}")
+
+    return {cadastradas[chave]: grupo for chave, grupo in df_pagamentos.groupby(chaves, sort=False)}
+
+def _gerar_remessa_conta(tarefa):
+    # Roda nos processos do pool (ou direto, com uma conta só): cada arquivo da conta vai para o
+    # disco bloco a bloco, com o NSA no nome ('xb': uma remessa nunca sobrescreve outra).
+    # Na prévia os blocos são renderizados e descartados
+    nome, df_conta, conta, pasta, max_registros_lote, max_bytes_arquivo, paralelo, workers, previa = tarefa
+    caminhos = []
+
+    def abrir(nsa, indice):
+        if previa:
+            caminhos.append(None)
+            return open(os.devnull, 'wb')
+        caminhos.append(os.path.join(pasta, nome_arquivo_remessa(nome, nsa=nsa)))
+        return open(caminhos[-1], 'xb')
+
+    resumo = escrever_remessas_divididas(
+        df_conta, abrir, max_registros_lote, max_bytes_arquivo, conta=conta, paralelo=paralelo, workers=workers, previa=previa
+    )
+    for item, caminho in zip(resumo, caminhos):
+        item.update(conta=nome, arquivo=os.path.basename(caminho) if caminho else nome_arquivo_remessa(nome), caminho=caminho)
+        if caminho: registrar_arquivo_nsa(chave_nsa(conta), item['nsa'], item['arquivo'])
+    return resumo
+
+def gerar_remessas_por_conta(df_pagamentos, pasta, paralelo=None, workers=None,
+                             max_registros_lote=LIMITE_REGISTROS_LOTE, max_bytes_arquivo=None, previa=False):
+    """
+    Gera as remessas de cada conta de origem (coluna Banco_Origem) numa única passada, gravadas
+    direto em `pasta`, com as contas renderizadas em paralelo quando o volume justifica.
+    Conta que passa dos limites (registros por lote, bytes por arquivo ou os tetos do layout)
+    sai dividida em vários arquivos, cada um com seu NSA (ver escrever_remessas_divididas).
+    Retorna uma lista, na ordem das contas, com um dict por arquivo: conta (nome em CONTAS_ORIGEM),
+    nsa, arquivo (nome do .txt), caminho, indice (linhas do DataFrame que ele leva) e o resumo
+    (qtd_lotes, qtd_pagamentos, qtd_registros, bytes). Nada fica marcado como enviado: isso é o
+    confirmar_remessas, depois que o arquivo vai para o banco.
+    previa=True é a conferência antes da remessa final: mesma renderização e divisão em arquivos,
+    sem reservar NSA e sem gravar nada (pasta pode ser None; caminho vem None). Serve também para
+    deixar os segmentos no cache, e a remessa final logo depois só renderiza o que mudou.
+    """
+    if df_pagamentos.empty: return []
+    grupos = agrupar_por_conta_origem(df_pagamentos)
+    if not previa: os.makedirs(pasta, exist_ok=True)
+
+    # Com as contas no pool, cada uma é renderizada em série dentro do seu processo
+    em_pool = len(grupos) > 1 and _usar_paralelo(len(df_pagamentos), paralelo)
+    tarefas = [
+        (nome, grupo, CONTAS_ORIGEM[nome], pasta, max_registros_lote, max_bytes_arquivo,
+         False if em_pool else paralelo, None if em_pool else workers, previa)
+        for nome, grupo in grupos.items()
+    ]
+    if em_pool:
+        with ProcessPoolExecutor(max_workers=workers or min(len(tarefas), os.cpu_count() or 1)) as executor:
+            resumos = list(executor.map(_gerar_remessa_conta, tarefas))
+    else:
+        resumos = [_gerar_remessa_conta(t) for t in tarefas]
+    return [item for resumo in resumos for item in resumo]
+
+def confirmar_remessas(df_pagamentos, remessas):
+    """confirmar_remessa de cada arquivo do gerar_remessas_por_conta. Retorna o total de títulos marcados."""
+    return sum(
+        confirmar_remessa(df_pagamentos.loc[remessa['indice']], remessa['nsa'], CONTAS_ORIGEM[remessa['conta']])
+        for remessa in remessas
+    )
+
+def nome_arquivo_remessa(conta, data=None, nsa=None):
+    """REM_<CONTA>_ddmm.txt; com o NSA, REM_<CONTA>_ddmm_NSA<nsa>.txt (não repete no mesmo dia)."""
+    slug = re.sub(r'[^A-Za-z0-9]+', '_', conta).strip('_').upper()
+    sufixo = f"_NSA{nsa}" if nsa is not None else ""
+    return f"REM_{slug}_{(data or datetime.now()).strftime('%d%m')}{sufixo}.txt"
+
+def compactar_remessas(remessas, destino):
+    """
+    Junta num .zip em `destino` (caminho ou arquivo binário) os arquivos que o
+    gerar_remessas_por_conta gravou, lidos do disco aos pedaços. Retorna o destino.
+    """
+    with zipfile.ZipFile(destino, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+        for remessa in remessas:
+            zf.write(remessa['caminho'], remessa['arquivo'])
+    return destino
+
+
+# =============================================================================
+# LEITOR DE ARQUIVOS CNAB 240 (RETORNO DO BANCO / REMESSAS GERADAS)
+# =============================================================================
+
+# Campos extraídos por tipo de registro: coluna do DataFrame -> (registro do layout, campo)
+CAMPOS_LEITURA = {
+    'J': {'codigo': 'cod_barras', 'favorecido': 'nome_favorecido', 'data_pagamento': 'data_pagamento',
+          'valor_centavos': 'valor_pagamento', 'valor_titulo_centavos': 'valor_titulo'},
+    'J52': {'favorecido': 'nome_beneficiario', 'documento_favorecido': 'doc_beneficiario'},
+    'A': {'codigo': 'seu_numero', 'favorecido': 'nome_favorecido', 'data_pagamento': 'data_pagamento',
+          'valor_centavos': 'valor_pagamento', 'valor_real_centavos': 'valor_real', 'data_real': 'data_real'},
+    'B': {'documento_favorecido': 'doc_favorecido', 'chave_pix': 'informacao_12'},
+    'trailer_lote': {'valor_centavos': 'valor_total', 'qtd_registros': 'qtd_registros'},
+    'trailer_arquivo': {'qtd_registros': 'qtd_registros'},
+    'header_arquivo': {'nsa': 'nsa', 'data_geracao': 'data_geracao'},
+}
+REGISTRO_POR_SEGMENTO = {'J': 'segmento_j', 'J52': 'segmento_j52', 'A': 'segmento_a', 'B': 'segmento_b'}
+# Valores saem em centavos (Int64), como no resto do motor: a volta do arquivo é exata
+COLUNAS_NUMERICAS = {'valor_centavos', 'valor_titulo_centavos', 'valor_real_centavos', 'qtd_registros', 'nsa'}
+COLUNAS_DATA = {'data_pagamento', 'data_real', 'data_geracao'}
+
+def _carregar_bytes_cnab(origem):
+    # Caminho vira mmap (o SO pagina o arquivo sob demanda); bytes/file-like são usados como estão
+    if isinstance(origem, (str, os.PathLike)):
+        with open(origem, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0: return b''
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return _normalizar_registros(mm)
+    if hasattr(origem, 'read'):
+        origem = origem.read()
+    return _normalizar_registros(origem)
+
+def _normalizar_registros(dados):
+    """
+    Devolve uma matriz uint8 (registros x 240). Caminho rápido quando todas as linhas têm
+    exatamente 240 bytes + terminador; senão (ex.: acentos em UTF-8) reenquadra linha a linha.
+    """
+    if len(dados) == 0: return np.empty((0, 240), dtype=np.uint8)
+    primeira_quebra = dados.find(b'\n', 0, 250)
+    terminador = {241: b'\r\n', 240: b'\n', -1: b''}.get(primeira_quebra)
+
+    if terminador is not None:
+        tam_linha = 240 + len(terminador)
+        bruto = np.frombuffer(dados, dtype=np.uint8)
+        if terminador and len(bruto) % tam_linha == 240:
+            # Último registro sem quebra de linha
+            bruto = np.concatenate([bruto, np.frombuffer(terminador, dtype=np.uint8)])
+        if len(bruto) % tam_linha == 0:
+            matriz = bruto.reshape(-1, tam_linha)
+            if all((matriz[:, 240 + i] == c).all() for i, c in enumerate(terminador)):
+                return np.array(matriz[:, :240])
+
+    registros = []
+    for linha in bytes(dados).split(b'\n'):
+        linha = linha.rstrip(b'\r')
+        if not linha.strip(): continue
+        try: linha = linha.decode('utf-8').encode('latin-1', errors='replace')
+        except UnicodeDecodeError: pass
+        registros.append(linha[:240].ljust(240))
+    return np.frombuffer(b''.join(registros), dtype=np.uint8).reshape(-1, 240)
+
+def _fatiar_texto(matriz, inicio, fim):
+    bloco = np.ascontiguousarray(matriz[:, inicio:fim]).view(f'S{fim - inicio}').ravel()
+    return pd.Series(bloco).str.decode('latin-1').str.strip()
+
+def _fatiar_inteiro(matriz, inicio, fim):
+    # Converte os dígitos ASCII direto da matriz de bytes; campo com algo que não é dígito vira <NA>
+    digitos = matriz[:, inicio:fim].astype(np.int64) - 48
+    validos = ((digitos >= 0) & (digitos <= 9)).all(axis=1)
+    pesos = 10 ** np.arange(fim - inicio - 1, -1, -1, dtype=np.int64)
+    valores = (np.clip(digitos, 0, 9) * pesos).sum(axis=1)
+    return pd.Series(pd.arrays.IntegerArray(valores, ~validos))
+
+def ler_cnab_240(origem, banco=None):
+    """
+    Lê um arquivo CNAB 240 (retorno do banco ou REM_*.txt gerado aqui) para um DataFrame tipado,
+    uma linha por registro. As colunas são fatiadas em bloco sobre o arquivo mapeado em memória.
+    origem: caminho, bytes ou arquivo binário (ex.: upload do Streamlit).
+    Valores saem em centavos (colunas *_centavos, Int64); registro sem o campo fica <NA>.
+    """
+    matriz = _carregar_bytes_cnab(origem)
+    n = len(matriz)
+    df = pd.DataFrame({'linha': np.arange(1, n + 1)})
+    if n == 0: return df
+
+    banco = banco or bytes(matriz[0, 0:3]).decode('latin-1')
+    df['banco'] = _fatiar_texto(matriz, 0, 3)
+    df['lote'] = _fatiar_inteiro(matriz, 3, 7)
+    df['tipo_registro'] = _fatiar_inteiro(matriz, 7, 8)
+    df['seq_lote'] = _fatiar_inteiro(matriz, 8, 13)
+    df['ocorrencias'] = _fatiar_texto(matriz, 230, 240)
+
+    tipo = matriz[:, 7]
+    detalhe = tipo == ord('3')
+    segmento = np.where(detalhe, matriz[:, 13], ord(' ')).astype(np.uint8).view('S1')
+    # J-52: '52' nas posições 18-19 do segmento J. A posição 15 não entra: no retorno o banco
+    # devolve ali o código de movimento, no J-52 também
+    opcional_52 = detalhe & (matriz[:, 13] == ord('J')) & (matriz[:, 17] == ord('5')) & (matriz[:, 18] == ord('2'))
+    df['segmento'] = pd.Series(segmento).str.decode('latin-1').str.strip()
+    df.loc[opcional_52, 'segmento'] = 'J52'
+
+    mascaras = {seg: (df['segmento'] == seg).to_numpy() for seg in REGISTRO_POR_SEGMENTO}
+    mascaras['trailer_lote'] = tipo == ord('5')
+    mascaras['trailer_arquivo'] = tipo == ord('9')
+    mascaras['header_arquivo'] = tipo == ord('0')
+
+    colunas = {}
+    for chave, campos in CAMPOS_LEITURA.items():
+        mascara = mascaras[chave]
+        if not mascara.any(): continue
+        layout = obter_layout(banco, REGISTRO_POR_SEGMENTO.get(chave, chave))
+        sub = matriz[mascara]
+        for coluna, campo in campos.items():
+            inicio, fim = layout.posicao(campo)
+            valores = _fatiar_inteiro(sub, inicio, fim) if coluna in COLUNAS_NUMERICAS else _fatiar_texto(sub, inicio, fim)
+            valores.index = np.flatnonzero(mascara)
+            colunas.setdefault(coluna, []).append(valores)
+
+    for coluna, partes in colunas.items():
+        serie = pd.concat(partes).reindex(range(n))
+        if coluna in COLUNAS_DATA:
+            serie = pd.to_datetime(serie, format='%d%m%Y', errors='coerce')
+        df[coluna] = serie
+
+    return df
@@ -0,0 +1,283 @@
+import pandas as pd
+
+# =============================================================================
+# REGISTRO DE LAYOUTS CNAB 240 (LARGURA FIXA)
+# =============================================================================
+# Cada registro é uma tabela de campos:
+#   (nome, inicio, tamanho, alinhamento, preenchimento)            -> campo variável
+#   (nome, inicio, tamanho, alinhamento, preenchimento, valor)     -> campo fixo do layout
+# inicio é 1-based, como nos manuais dos bancos. alinhamento: '<' (texto) ou '>' (numérico).
+# Os layouts são compilados uma única vez na importação; se algum registro não somar
+# exatamente 240 posições contíguas o módulo nem carrega.
+
+TAMANHO_REGISTRO = 240
+FIM_DE_LINHA = "\r\n"
+
+
+class LayoutRegistro:
+    """Formatador pré-compilado de um tipo de registro (ex.: segmento J do banco 136)."""
+
+    def __init__(self, banco, registro, campos):
+        self.banco = banco
+        self.registro = registro
+        self.campos = _validar_campos(banco, registro, campos)
+
+        # Caminho por linha: um único str.format com largura e corte de cada campo
+        partes = []
+        for campo in self.campos:
+            nome, _, tamanho, alinhamento, preenchimento = campo[:5]
+            if len(campo) == 6:
+                partes.append(_formatar_fixo(campo).replace('{', '{{').replace('}', '}}'))
+            else:
+                partes.append(f"{{{nome}!s:{preenchimento}{alinhamento}{tamanho}.{tamanho}}}")
+        self._template = ''.join(partes) + FIM_DE_LINHA
+        self.variaveis = [c[0] for c in self.campos if len(c) == 5]
+
+    def posicao(self, nome):
+        """Devolve (inicio, fim) do campo no registro, 0-based e fim exclusivo (pronto para fatiar)."""
+        for campo in self.campos:
+            if campo[0] == nome:
+                return campo[1] - 1, campo[1] - 1 + campo[2]
+        raise KeyError(f"Layout {self.banco}/{self.registro}: campo '{nome}' não existe")
+
+    def linha(self, **valores):
+        """Monta um registro (com "\\r\\n") a partir dos valores de uma linha."""
+        return self._template.format(**valores)
+
+    def linhas(self, **colunas):
+        """
+        Monta os registros de um lote inteiro de uma vez. Cada valor pode ser uma
+        pd.Series de textos (um por linha) ou um escalar, repetido em todas as linhas.
+        """
+        resultado = None
+        literal = ''
+        for campo in self.campos:
+            if len(campo) == 6:
+                literal += _formatar_fixo(campo)
+                continue
+
+            nome, _, tamanho, alinhamento, preenchimento = campo
+            if nome not in colunas:
+                raise KeyError(f"Layout {self.banco}/{self.registro}: campo '{nome}' não informado")
+            valor = colunas[nome]
+            if not isinstance(valor, pd.Series):
+                literal += format(str(valor), f"{preenchimento}{alinhamento}{tamanho}.{tamanho}")
+                continue
+
+            lado = 'right' if alinhamento == '<' else 'left'
+            coluna = valor.str.slice(0, tamanho).str.pad(tamanho, side=lado, fillchar=preenchimento)
+            if literal:
+                coluna = literal + coluna
+                literal = ''
+            resultado = coluna if resultado is None else resultado + coluna
+
+        if resultado is None:
+            raise ValueError(f"Layout {self.banco}/{self.registro}: nenhuma coluna informada para montar as linhas")
+        return resultado + (literal + FIM_DE_LINHA)
+
+
+def _formatar_fixo(campo):
+    nome, _, tamanho, alinhamento, preenchimento, valor = campo
+    return format(valor, f"{preenchimento}{alinhamento}{tamanho}")
+
+
+def _validar_campos(banco, registro, campos):
+    campos = sorted(campos, key=lambda c: c[1])
+    posicao = 1
+    for campo in campos:
+        if len(campo) not in (5, 6):
+            raise ValueError(f"Layout {banco}/{registro}: campo mal definido {campo!r}")
+        nome, inicio, tamanho, alinhamento, preenchimento = campo[:5]
+        if inicio != posicao:
+            raise ValueError(f"Layout {banco}/{registro}: campo '{nome}' começa em {inicio}, esperado {posicao}")
+        if tamanho <= 0 or alinhamento not in ('<', '>') or len(preenchimento) != 1:
+            raise ValueError(f"Layout {banco}/{registro}: campo '{nome}' com tamanho/alinhamento/preenchimento inválido")
+        if len(campo) == 6 and len(str(campo[5])) > tamanho:
+            raise ValueError(f"Layout {banco}/{registro}: valor fixo do campo '{nome}' não cabe em {tamanho} posições")
+        posicao += tamanho
+
+    if posicao - 1 != TAMANHO_REGISTRO:
+        raise ValueError(f"Layout {banco}/{registro}: soma {posicao - 1} posições, esperado {TAMANHO_REGISTRO}")
+    return campos
+
+
+LAYOUTS_CNAB = {}
+
+def registrar_layout(banco, registros):
+    """Compila e registra todos os tipos de registro de um banco: {'segmento_j': [campos...], ...}."""
+    LAYOUTS_CNAB[banco] = {registro: LayoutRegistro(banco, registro, campos) for registro, campos in registros.items()}
+    return LAYOUTS_CNAB[banco]
+
+def obter_layout(banco, registro):
+    try:
+        return LAYOUTS_CNAB[banco][registro]
+    except KeyError:
+        raise KeyError(f"Layout CNAB não registrado: banco {banco}, registro {registro}") from None
+
+
+# =============================================================================
+# UNICRED (136) - PAGAMENTOS CNAB 240
+# =============================================================================
+
+registrar_layout('136', {
+    'header_arquivo': [
+        ('banco', 1, 3, '<', ' ', '136'),
+        ('lote', 4, 4, '>', '0', '0000'),
+        ('tipo_registro', 8, 1, '<', ' ', '0'),
+        ('brancos_1', 9, 9, '<', ' ', ''),
+        ('tipo_inscricao', 18, 1, '<', ' ', '2'),
+        ('cnpj', 19, 14, '>', '0'),
+        ('convenio', 33, 20, '>', '0'),
+        ('agencia', 53, 5, '>', '0'),
+        ('dv_agencia', 58, 1, '<', ' '),
+        ('conta', 59, 12, '>', '0'),
+        ('dv_conta', 71, 1, '<', ' '),
+        ('dv_agencia_conta', 72, 1, '<', ' ', ''),
+        ('nome_empresa', 73, 30, '<', ' '),
+        ('nome_banco', 103, 30, '<', ' ', 'UNICRED'),
+        ('brancos_2', 133, 10, '<', ' ', ''),
+        ('codigo_remessa', 143, 1, '<', ' ', '1'),
+        ('data_geracao', 144, 8, '<', ' '),
+        ('hora_geracao', 152, 6, '<', ' '),
+        ('nsa', 158, 6, '>', '0'),
+        ('versao_layout', 164, 3, '<', ' ', '083'),
+        ('densidade', 167, 5, '>', '0', '00000'),
+        ('brancos_3', 172, 69, '<', ' ', ''),
+    ],
+    'header_lote': [
+        ('banco', 1, 3, '<', ' ', '136'),
+        ('lote', 4, 4, '>', '0'),
+        ('tipo_registro', 8, 1, '<', ' ', '1'),
+        ('operacao', 9, 1, '<', ' ', 'C'),
+        ('tipo_servico', 10, 2, '<', ' ', '20'),
+        ('forma_lancamento', 12, 2, '<', ' '),
+        ('versao_layout', 14, 3, '<', ' '),
+        ('brancos_1', 17, 1, '<', ' ', ''),
+        ('tipo_inscricao', 18, 1, '<', ' ', '2'),
+        ('cnpj', 19, 14, '>', '0'),
+        ('convenio', 33, 20, '>', '0'),
+        ('agencia', 53, 5, '>', '0'),
+        ('dv_agencia', 58, 1, '<', ' '),
+        ('conta', 59, 12, '>', '0'),
+        ('dv_conta', 71, 1, '<', ' '),
+        ('dv_agencia_conta', 72, 1, '<', ' ', ''),
+        ('nome_empresa', 73, 30, '<', ' '),
+        ('mensagem', 103, 40, '<', ' ', ''),
+        ('logradouro', 143, 30, '<', ' '),
+        ('numero', 173, 5, '>', '0'),
+        ('complemento', 178, 15, '<', ' '),
+        ('cidade', 193, 20, '<', ' '),
+        ('cep', 213, 5, '>', '0'),
+        ('cep_sufixo', 218, 3, '>', '0'),
+        ('uf', 221, 2, '<', ' '),
+        ('brancos_2', 223, 8, '<', ' ', ''),
+        ('ocorrencias', 231, 10, '<', ' ', ''),
+    ],
+    'segmento_j': [
+        ('banco', 1, 3, '<', ' ', '136'),
+        ('lote', 4, 4, '>', '0'),
+        ('tipo_registro', 8, 1, '<', ' ', '3'),
+        ('seq_lote', 9, 5, '>', '0'),
+        ('segmento', 14, 1, '<', ' ', 'J'),
+        ('movimento', 15, 3, '<', ' ', '000'),
+        ('cod_barras', 18, 44, '>', '0'),
+        ('nome_favorecido', 62, 30, '<', ' '),
+        ('data_vencimento', 92, 8, '<', ' '),
+        ('valor_titulo', 100, 15, '>', '0'),
+        ('desconto', 115, 15, '>', '0', '0'),
+        ('acrescimo', 130, 15, '>', '0', '0'),
+        ('data_pagamento', 145, 8, '<', ' '),
+        ('valor_pagamento', 153, 15, '>', '0'),
+        ('qtd_moeda', 168, 15, '>', '0', '0'),
+        ('seu_numero', 183, 20, '<', ' ', ''),
+        ('nosso_numero', 203, 20, '<', ' ', ''),
+        ('moeda', 223, 2, '<', ' ', '09'),
+        ('brancos', 225, 6, '<', ' ', ''),
+        ('ocorrencias', 231, 10, '<', ' ', ''),
+    ],
+    'segmento_j52': [
+        ('banco', 1, 3, '<', ' ', '136'),
+        ('lote', 4, 4, '>', '0'),
+        ('tipo_registro', 8, 1, '<', ' ', '3'),
+        ('seq_lote', 9, 5, '>', '0'),
+        ('segmento', 14, 1, '<', ' ', 'J'),
+        ('brancos_1', 15, 3, '<', ' ', ''),
+        ('registro_opcional', 18, 2, '<', ' ', '52'),
+        ('tipo_insc_pagador', 20, 1, '<', ' '),
+        ('doc_pagador', 21, 15, '>', '0'),
+        ('nome_pagador', 36, 40, '<', ' '),
+        ('tipo_insc_beneficiario', 76, 1, '<', ' '),
+        ('doc_beneficiario', 77, 15, '>', '0'),
+        ('nome_beneficiario', 92, 40, '<', ' '),
+        ('tipo_insc_sacador', 132, 1, '<', ' ', '2'),
+        ('doc_sacador', 133, 15, '>', '0'),
+        ('nome_sacador', 148, 40, '<', ' '),
+        ('brancos_2', 188, 53, '<', ' ', ''),
+    ],
+    'segmento_a': [
+        ('banco', 1, 3, '<', ' ', '136'),
+        ('lote', 4, 4, '>', '0'),
+        ('tipo_registro', 8, 1, '<', ' ', '3'),
+        ('seq_lote', 9, 5, '>', '0'),
+        ('segmento', 14, 1, '<', ' ', 'A'),
+        ('movimento', 15, 3, '<', ' ', '000'),
+        ('camara', 18, 3, '<', ' ', '009'),
+        ('banco_favorecido', 21, 3, '>', '0'),
+        ('agencia_favorecida', 24, 5, '>', '0'),
+        ('dv_agencia_favorecida', 29, 1, '<', ' '),
+        ('conta_favorecida', 30, 12, '>', '0'),
+        ('dv_conta_favorecida', 42, 1, '<', ' '),
+        ('dv_agencia_conta', 43, 1, '<', ' ', ''),
+        ('nome_favorecido', 44, 30, '<', ' '),
+        ('seu_numero', 74, 20, '<', ' '),
+        ('data_pagamento', 94, 8, '<', ' '),
+        ('moeda', 102, 3, '<', ' ', 'BRL'),
+        ('qtd_moeda', 105, 15, '>', '0', '0'),
+        ('valor_pagamento', 120, 15, '>', '0'),
+        ('nosso_numero', 135, 20, '<', ' ', ''),
+        ('data_real', 155, 8, '<', ' '),
+        ('valor_real', 163, 15, '>', '0'),
+        ('informacao_2', 178, 40, '<', ' ', ''),
+        ('finalidade_doc', 218, 2, '<', ' ', '00'),
+        ('brancos', 220, 10, '<', ' ', ''),
+        ('aviso', 230, 1, '<', ' ', '0'),
+        ('ocorrencias', 231, 10, '<', ' ', ''),
+    ],
+    'segmento_b': [
+        ('banco', 1, 3, '<', ' ', '136'),
+        ('lote', 4, 4, '>', '0'),
+        ('tipo_registro', 8, 1, '<', ' ', '3'),
+        ('seq_lote', 9, 5, '>', '0'),
+        ('segmento', 14, 1, '<', ' ', 'B'),
+        ('tipo_chave', 15, 3, '>', '0'),
+        ('tipo_inscricao', 18, 1, '<', ' '),
+        ('doc_favorecido', 19, 14, '>', '0'),
+        ('informacao_10', 33, 35, '<', ' '),
+        ('informacao_11', 68, 60, '<', ' '),
+        ('informacao_12', 128, 99, '<', ' '),
+        ('brancos', 227, 6, '<', ' ', ''),
+        ('ispb', 233, 8, '<', ' ', ''),
+    ],
+    'trailer_lote': [
+        ('banco', 1, 3, '<', ' ', '136'),
+        ('lote', 4, 4, '>', '0'),
+        ('tipo_registro', 8, 1, '<', ' ', '5'),
+        ('brancos_1', 9, 9, '<', ' ', ''),
+        ('qtd_registros', 18, 6, '>', '0'),
+        ('valor_total', 24, 18, '>', '0'),
+        ('qtd_moeda', 42, 18, '>', '0', '0'),
+        ('aviso_debito', 60, 6, '>', '0', '0'),
+        ('brancos_2', 66, 165, '<', ' ', ''),
+        ('ocorrencias', 231, 10, '<', ' ', ''),
+    ],
+    'trailer_arquivo': [
+        ('banco', 1, 3, '<', ' ', '136'),
+        ('lote', 4, 4, '<', ' ', '9999'),
+        ('tipo_registro', 8, 1, '<', ' ', '9'),
+        ('brancos_1', 9, 9, '<', ' ', ''),
+        ('qtd_lotes', 18, 6, '>', '0'),
+        ('qtd_registros', 24, 6, '>', '0'),
+        ('qtd_contas', 30, 6, '>', '0', '000000'),
+        ('brancos_2', 36, 205, '<', ' ', ''),
+    ],
+})
@@ -0,0 +1,109 @@
+import numpy as np
+import pandas as pd
+
+# =============================================================================
+# CÓDIGO DE BARRAS / LINHA DIGITÁVEL EM LOTE
+# =============================================================================
+# Mesma regra do _digitos_para_barras do cnab_engine, mas para a coluna inteira:
+# os códigos de mesmo tamanho viram uma matriz de dígitos (numpy) e a conversão
+# 47/48 -> 44 e a conferência dos DVs são feitas por fatiamento de colunas.
+
+def matriz_digitos(digitos, largura):
+    """Lista de strings só com dígitos, todas com `largura` caracteres -> matriz uint8 (n, largura)."""
+    if not len(digitos): return np.zeros((0, largura), dtype=np.uint8)
+    return (np.frombuffer(''.join(digitos).encode('ascii'), dtype=np.uint8) - 48).reshape(-1, largura)
+
+def _textos(matriz):
+    # Volta da matriz de dígitos para uma lista de strings
+    largura = matriz.shape[1]
+    texto = (matriz + 48).astype(np.uint8).tobytes().decode('ascii')
+    return [texto[i:i + largura] for i in range(0, len(texto), largura)]
+
+# --- DÍGITOS VERIFICADORES ---
+
+def _pesos_da_direita(largura, ciclo):
+    # Pesos aplicados da direita para a esquerda, repetindo o ciclo (2,1 no mod 10; 2..9 no mod 11)
+    return np.resize(np.asarray(ciclo, dtype=np.int64), largura)[::-1]
+
+def dv_mod10(matriz):
+    """DV módulo 10 (pesos 2,1 da direita, somando os algarismos de cada produto) de cada linha."""
+    produtos = matriz.astype(np.int64) * _pesos_da_direita(matriz.shape[1], (2, 1))
+    soma = (produtos // 10 + produtos % 10).sum(axis=1)
+    return (10 - soma % 10) % 10
+
+def resto_mod11(matriz):
+    """Resto módulo 11 com pesos 2..9 da direita, de cada linha."""
+    return (matriz.astype(np.int64) * _pesos_da_direita(matriz.shape[1], range(2, 10))).sum(axis=1) % 11
+
+def dv_mod11_boleto(matriz):
+    # Boleto bancário: DV = 11 - resto; 0, 10 e 11 viram 1
+    dv = 11 - resto_mod11(matriz)
+    return np.where(dv >= 10, 1, dv)
+
+def dv_mod11_arrecadacao(matriz):
+    # Convênio/arrecadação: DV = 11 - resto; 10 e 11 viram 0
+    dv = 11 - resto_mod11(matriz)
+    return np.where(dv >= 10, 0, dv)
+
+def barras_validas(matriz):
+    """Confere o DV geral de códigos de barras de 44 posições (bancário ou arrecadação)."""
+    ok = np.zeros(len(matriz), dtype=bool)
+    arrecadacao = matriz[:, 0] == 8
+
+    banc = matriz[~arrecadacao]
+    corpo = np.concatenate([banc[:, :4], banc[:, 5:]], axis=1)
+    ok[~arrecadacao] = dv_mod11_boleto(corpo) == banc[:, 4]
+
+    arr = matriz[arrecadacao]
+    corpo = np.concatenate([arr[:, :3], arr[:, 4:]], axis=1)
+    referencia = arr[:, 2]
+    dv = np.where(np.isin(referencia, (6, 7)), dv_mod10(corpo), dv_mod11_arrecadacao(corpo))
+    ok[arrecadacao] = np.isin(referencia, (6, 7, 8, 9)) & (dv == arr[:, 3])
+    return ok
+
+# --- CONVERSÃO LINHA DIGITÁVEL -> CÓDIGO DE BARRAS ---
+
+def _converter_44(matriz):
+    return matriz, barras_validas(matriz)
+
+def _converter_47(matriz):
+    # Boleto bancário: banco+moeda, DV geral, fator+valor e os 3 campos livres sem os DVs de campo
+    barras = np.concatenate([matriz[:, 0:4], matriz[:, 32:47], matriz[:, 4:9], matriz[:, 10:20], matriz[:, 21:31]], axis=1)
+    campos_ok = (
+        (dv_mod10(matriz[:, 0:9]) == matriz[:, 9])
+        & (dv_mod10(matriz[:, 10:20]) == matriz[:, 20])
+        & (dv_mod10(matriz[:, 21:31]) == matriz[:, 31])
+    )
+    return barras, campos_ok & barras_validas(barras)
+
+def _converter_48(matriz):
+    # Arrecadação: 4 blocos de 11 dígitos + DV, módulo escolhido pelo 3º dígito
+    barras = np.concatenate([matriz[:, 12 * i:12 * i + 11] for i in range(4)], axis=1)
+    ok = matriz[:, 0] == 8
+    mod10 = np.isin(matriz[:, 2], (6, 7))
+    for i in range(4):
+        bloco = matriz[:, 12 * i:12 * i + 11]
+        ok &= np.where(mod10, dv_mod10(bloco), dv_mod11_arrecadacao(bloco)) == matriz[:, 12 * i + 11]
+    return barras, ok & barras_validas(barras)
+
+CONVERSORES = {44: _converter_44, 47: _converter_47, 48: _converter_48}
+
+def digitos_para_barras_lote(digitos):
+    """
+    Versão em lote do _digitos_para_barras para códigos já limpos (só dígitos).
+    Retorna (lista de códigos de barras, máscara numpy com os DVs conferidos).
+    Tamanhos fora de 44/47/48 seguem a regra antiga (corta em 44) e saem como inválidos.
+    """
+    digitos = pd.Series(digitos, dtype=object).astype(str)
+    tamanhos = digitos.str.len().to_numpy()
+    barras = digitos.str.slice(0, 44).to_numpy(dtype=object)
+    validos = np.zeros(len(digitos), dtype=bool)
+
+    for tamanho, converter in CONVERSORES.items():
+        sel = tamanhos == tamanho
+        if not sel.any(): continue
+        matriz, ok = converter(matriz_digitos(digitos[sel].tolist(), tamanho))
+        barras[sel] = _textos(matriz)
+        validos[sel] = ok
+
+    return barras.tolist(), validos
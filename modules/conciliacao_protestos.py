@@ -0,0 +1,166 @@
+import numpy as np
+import pandas as pd
+
+from modules.cnab_engine import resolver_coluna
+from modules.protestos import COLUNA_ARQUIVO
+from modules.utils import limpar_numero_serie, para_centavos
+
+# =============================================================================
+# CONCILIAÇÃO DOS PROTESTOS COM O HISTÓRICO DE CONTAS A PAGAR
+# =============================================================================
+# A controladoria procurava cada protesto na aba Historico na mão para achar o título de
+# origem. Aqui o Historico é normalizado uma vez (documento só com dígitos, nº do título
+# sem prefixo/zeros à esquerda, saldo em centavos) e vira índices de hash: documento,
+# raiz do CNPJ (filial diferente da matriz) e nº do título -> linhas. Cada protesto só
+# olha as linhas das suas chaves, e um lote de centenas de protestos contra 100 mil linhas
+# sai em milissegundos (montar o índice custa mais do que conciliar; a tela o reaproveita).
+#
+# Candidato aceito: mesmo credor (CNPJ/CPF ou raiz do CNPJ) com título OU valor batendo,
+# ou título E valor batendo sem o credor (protesto apresentado por banco/FIDC vem com o
+# documento do apresentante, não do fornecedor).
+
+COLUNAS_DOCUMENTO = ['CNPJ', 'cnpj_beneficiario', 'CNPJ/CPF', 'CPF/CNPJ', 'CNPJ Fornecedor', 'Documento']
+COLUNAS_TITULO = ['Nr. Titulo', 'Nr. Título', 'Titulo', 'Título', 'Nota Fiscal', 'NF']
+COLUNAS_VALOR = ['Saldo Atual', 'Valor', 'Valor Original', 'VALOR_PAGAMENTO']
+# Colunas do Historico que vão para a tabela da conciliação (as que existirem)
+COLUNAS_HISTORICO_EXIBIDAS = ['Beneficiario', 'Nr. Titulo', 'Saldo Atual', 'Vencimento', 'Carteira', 'data_processamento']
+COLUNAS_PROTESTO_EXIBIDAS = ['Protocolo', COLUNA_ARQUIVO, 'Credor/Sacador', 'CNPJ/CPF Credor', 'Valor/Saldo', 'Título/Número']
+
+# Diferença aceita entre o valor protestado e o saldo: o maior entre R$ 1,00 e 1%
+TOLERANCIA_CENTAVOS = 100
+TOLERANCIA_PERCENTUAL = 0.01
+MAX_CANDIDATOS = 5
+
+# Pesos de cada critério na ordenação dos candidatos
+PESO_DOCUMENTO, PESO_RAIZ, PESO_TITULO, PESO_VALOR = 3, 2, 3, 2
+
+_VAZIO = np.empty(0, dtype=np.int64)
+
+def normalizar_documentos(valores):
+    """CPF/CNPJ só com dígitos, com os zeros à esquerda que o Excel come (11 ou 14 dígitos). Vazio fica ""."""
+    digitos = pd.Series(limpar_numero_serie(valores), dtype=object)
+    tamanhos = digitos.str.len().to_numpy()
+    return np.where(tamanhos == 0, '', np.where(tamanhos > 11, digitos.str.zfill(14), digitos.str.zfill(11))).astype(object)
+
+def chaves_titulo(valores):
+    """Nº do título para comparação: só os dígitos, sem zeros à esquerda ('NF-000123' e '123.0' -> '123')."""
+    return pd.Series(limpar_numero_serie(valores), dtype=object).str.lstrip('0').to_numpy(dtype=object)
+
+def valores_em_centavos(valores):
+    """Valores em reais (número, '1234.56' ou 'R$ 1.234,56') -> int64 em centavos; vazio/'-' vira 0."""
+    texto = pd.Series(valores, dtype=object).fillna('').astype(str).str.replace(r'[R$\s]', '', regex=True)
+    brasileiro = texto.str.contains(',', regex=False)
+    texto = texto.where(~brasileiro, texto.str.replace('.', '', regex=False))
+    return para_centavos(texto)
+
+def _indexar(chaves, validas):
+    """
+    Índice de hash chave -> posições das linhas: {chave: código} mais as posições ordenadas
+    por código e onde cada código começa (sem um array por chave, que é o que pesa em 100k).
+    """
+    posicoes = np.flatnonzero(validas & (chaves != ''))
+    codigos, unicos = pd.factorize(chaves[posicoes])
+    ordem = np.argsort(codigos, kind='stable')
+    limites = np.searchsorted(codigos[ordem], np.arange(len(unicos) + 1))
+    return dict(zip(unicos.tolist(), range(len(unicos)))), posicoes[ordem], limites
+
+def _buscar(indice, chave):
+    codigo = indice[0].get(chave) if chave else None
+    if codigo is None: return _VAZIO
+    return indice[1][indice[2][codigo]:indice[2][codigo + 1]]
+
+class IndiceHistorico:
+    """Historico normalizado e indexado por documento, raiz do CNPJ e nº do título (posições de linha)."""
+
+    def __init__(self, df_historico):
+        self.historico = df_historico
+        self.documentos = normalizar_documentos(resolver_coluna(df_historico, COLUNAS_DOCUMENTO))
+        self.titulos = chaves_titulo(resolver_coluna(df_historico, COLUNAS_TITULO))
+        self.centavos = valores_em_centavos(resolver_coluna(df_historico, COLUNAS_VALOR))
+        self.raizes = np.array([d[:8] if len(d) == 14 else '' for d in self.documentos], dtype=object)
+
+        # A aba acumula uma cópia da base a cada upload: o mesmo título (documento, nº e
+        # saldo) entra no índice uma vez só, pela carga mais recente (a última linha)
+        chaves = pd.DataFrame({'d': self.documentos, 't': self.titulos, 'v': self.centavos})
+        validas = ~chaves.duplicated(keep='last').to_numpy()
+
+        self.por_documento = _indexar(self.documentos, validas)
+        self.por_raiz = _indexar(self.raizes, validas)
+        self.por_titulo = _indexar(self.titulos, validas)
+
+    def __len__(self):
+        return len(self.historico)
+
+    def candidatos(self, documento, titulo):
+        """Posições das linhas com o mesmo documento (ou, sem ele, a mesma raiz do CNPJ) ou o mesmo título."""
+        por_documento = _buscar(self.por_documento, documento)
+        por_raiz = _buscar(self.por_raiz, documento[:8]) if len(documento) == 14 and not por_documento.size else _VAZIO
+        por_titulo = _buscar(self.por_titulo, titulo)
+        return np.unique(np.concatenate([por_documento, por_raiz, por_titulo]))
+
+def _criterio(documento, raiz, titulo, valor):
+    partes = ['CNPJ/CPF' if documento else 'raiz do CNPJ' if raiz else None, 'título' if titulo else None, 'valor' if valor else None]
+    return ' + '.join(p for p in partes if p)
+
+def conciliar_protestos(df_protestos, historico, tolerancia_centavos=TOLERANCIA_CENTAVOS,
+                        tolerancia_percentual=TOLERANCIA_PERCENTUAL, max_candidatos=MAX_CANDIDATOS):
+    """
+    Liga cada protesto (tabela do extrair_protestos_pdfs) aos títulos candidatos do Historico.
+    historico: DataFrame da aba Historico ou um IndiceHistorico já montado (reaproveitável).
+    Devolve uma linha por (protesto, candidato), do melhor para o pior, com Situação
+    'único', 'ambíguo' (empate no melhor) ou 'sem candidato' (uma linha, sem o título).
+    """
+    indice = historico if isinstance(historico, IndiceHistorico) else IndiceHistorico(historico)
+    documentos = normalizar_documentos(df_protestos.get('CNPJ/CPF Credor', pd.Series('', index=df_protestos.index)))
+    titulos = chaves_titulo(df_protestos.get('Título/Número', pd.Series('', index=df_protestos.index)))
+    centavos = valores_em_centavos(df_protestos.get('Valor/Saldo', pd.Series('', index=df_protestos.index)))
+
+    pos_protesto, pos_historico, situacoes, criterios, pontuacoes, diferencas = [], [], [], [], [], []
+    for i, (documento, titulo, valor) in enumerate(zip(documentos, titulos, centavos)):
+        linhas = indice.candidatos(documento, titulo)
+        if linhas.size:
+            # Documento vazio ('-' na certidão, em branco no Historico) não é credor nenhum
+            mesmo_documento = (indice.documentos[linhas] == documento) & bool(documento)
+            mesma_raiz = ~mesmo_documento & (len(documento) == 14) & (indice.raizes[linhas] == documento[:8]) & bool(documento[:8])
+            mesmo_titulo = (indice.titulos[linhas] == titulo) & bool(titulo)
+            diferenca = np.abs(indice.centavos[linhas] - valor)
+            valor_ok = (valor > 0) & (diferenca <= max(tolerancia_centavos, valor * tolerancia_percentual))
+
+            credor = mesmo_documento | mesma_raiz
+            aceito = (credor & (mesmo_titulo | valor_ok)) | (mesmo_titulo & valor_ok)
+            pontos = (mesmo_documento * PESO_DOCUMENTO + mesma_raiz * PESO_RAIZ + mesmo_titulo * PESO_TITULO + valor_ok * PESO_VALOR)
+            escolhidos = np.flatnonzero(aceito)
+            escolhidos = escolhidos[np.lexsort((diferenca[escolhidos], -pontos[escolhidos]))][:max_candidatos]
+        else:
+            escolhidos = _VAZIO
+
+        if not escolhidos.size:
+            pos_protesto.append(i); pos_historico.append(-1); situacoes.append('sem candidato')
+            criterios.append(''); pontuacoes.append(0); diferencas.append(np.nan)
+            continue
+        empatados = int((pontos[escolhidos] == pontos[escolhidos[0]]).sum())
+        situacao = 'único' if empatados == 1 else 'ambíguo'
+        for j in escolhidos:
+            pos_protesto.append(i); pos_historico.append(linhas[j]); situacoes.append(situacao)
+            criterios.append(_criterio(mesmo_documento[j], mesma_raiz[j], mesmo_titulo[j], valor_ok[j]))
+            pontuacoes.append(int(pontos[j])); diferencas.append(diferenca[j] / 100)
+
+    pos_historico = np.asarray(pos_historico, dtype=np.int64)
+    achou = pos_historico >= 0
+    protestos = df_protestos[[c for c in COLUNAS_PROTESTO_EXIBIDAS if c in df_protestos.columns]]
+    resultado = protestos.iloc[pos_protesto].reset_index(drop=True)
+    resultado['Situação'] = situacoes
+    resultado['Critério'] = criterios
+    resultado['Pontuação'] = pontuacoes
+    resultado['Diferença (R$)'] = diferencas
+
+    historico_df = indice.historico
+    linhas_hist = np.full(len(resultado), None, dtype=object)
+    linhas_hist[achou] = historico_df.index.to_numpy()[pos_historico[achou]]
+    resultado['Linha Histórico'] = linhas_hist
+    for coluna in COLUNAS_HISTORICO_EXIBIDAS:
+        if coluna not in historico_df.columns: continue
+        valores = np.full(len(resultado), None, dtype=object)
+        valores[achou] = historico_df[coluna].to_numpy(dtype=object)[pos_historico[achou]]
+        resultado[f"Histórico: {coluna}"] = valores
+    return resultado
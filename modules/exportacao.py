@@ -0,0 +1,186 @@
+import os
+import re
+import zipfile
+import tempfile
+
+import pandas as pd
+import xlsxwriter
+
+# =============================================================================
+# EXPORTAÇÃO DE RELATÓRIOS (XLSX / CSV / PARQUET) SEM ESTOURAR A MEMÓRIA
+# =============================================================================
+# O pd.ExcelWriter monta a pasta de trabalho inteira (cada célula vira objeto) antes de
+# gravar, e num BytesIO: com centenas de milhares de linhas o processo do Streamlit dobra de
+# tamanho no download. Aqui o xlsx sai pelo xlsxwriter em constant_memory (cada linha vai
+# direto para o arquivo temporário da aba e é descartada), em blocos de linhas do DataFrame,
+# e o resultado vai para um arquivo temporário que só passa para o disco quando cresce.
+# Para o download da tela, exportar_arquivo grava direto em disco e devolve o arquivo aberto
+# (para usar num with); o download gerado no clique usa o exportar_bytes.
+# CSV e Parquet são as saídas rápidas (sem formatação); com mais de uma aba viram um .zip
+# com um arquivo por aba.
+
+FORMATOS_EXPORTACAO = {
+    'xlsx': ('.xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+    'csv': ('.csv', 'text/csv'),
+    'parquet': ('.parquet', 'application/octet-stream'),
+}
+LINHAS_POR_BLOCO = 20_000
+# O Excel para em 1.048.576 linhas: o que passar disso continua em "Aba (2)", "Aba (3)"...
+LINHAS_POR_ABA_XLSX = 1_048_575
+TAMANHO_ABA_XLSX = 31
+# Arquivo de saída fica na memória até esse tamanho e depois vai para o disco
+LIMITE_MEMORIA_SAIDA = 32 * 2 ** 20
+
+OPCOES_XLSX = {
+    'constant_memory': True,
+    'default_date_format': 'dd/mm/yyyy',
+    # Texto de planilha é texto: nada de virar fórmula ou link (e o link tem limite por aba)
+    'strings_to_formulas': False,
+    'strings_to_urls': False,
+    'nan_inf_to_errors': True,
+}
+
+_RE_CARACTERES_ABA = re.compile(r'[\[\]:*?/\\]')
+
+def _como_planilhas(planilhas):
+    # Aceita um DataFrame solto (uma aba só) ou {nome da aba: DataFrame}
+    return {'Dados': planilhas} if isinstance(planilhas, pd.DataFrame) else dict(planilhas)
+
+def nome_exportacao(prefixo, formato, planilhas):
+    """Nome do arquivo de download: prefixo + extensão do formato (.zip para CSV/Parquet com várias abas)."""
+    extensao = FORMATOS_EXPORTACAO[formato][0]
+    if formato != 'xlsx' and len(_como_planilhas(planilhas)) > 1: extensao = '.zip'
+    return f"{prefixo}{extensao}"
+
+def mime_exportacao(formato, planilhas):
+    if formato != 'xlsx' and len(_como_planilhas(planilhas)) > 1: return 'application/zip'
+    return FORMATOS_EXPORTACAO[formato][1]
+
+def _blocos(df):
+    for inicio in range(0, len(df), LINHAS_POR_BLOCO):
+        yield df.iloc[inicio:inicio + LINHAS_POR_BLOCO]
+
+def _nome_aba(nome, usados):
+    base = _RE_CARACTERES_ABA.sub('_', str(nome)).strip("'")[:TAMANHO_ABA_XLSX] or 'Dados'
+    candidato, n = base, 2
+    while candidato.lower() in usados:
+        sufixo = f" ({n})"
+        candidato, n = base[:TAMANHO_ABA_XLSX - len(sufixo)] + sufixo, n + 1
+    usados.add(candidato.lower())
+    return candidato
+
+def _linhas_excel(bloco):
+    # Tipos do Python que o xlsxwriter entende (numpy/pandas viram int, float, Timestamp) e vazio como None
+    valores = bloco.astype(object).where(bloco.notna(), None)
+    return valores.itertuples(index=False, name=None)
+
+def _gravar_xlsx(planilhas, destino):
+    pasta = xlsxwriter.Workbook(destino, OPCOES_XLSX)
+    negrito = pasta.add_format({'bold': True})
+    usados = set()
+    for aba, df in planilhas.items():
+        cabecalho = [str(c) for c in df.columns]
+        # Aba vazia ainda sai com o cabeçalho
+        for inicio in range(0, max(len(df), 1), LINHAS_POR_ABA_XLSX):
+            planilha = pasta.add_worksheet(_nome_aba(aba, usados))
+            planilha.write_row(0, 0, cabecalho, negrito)
+            planilha.freeze_panes(1, 0)
+            linha = 1
+            for bloco in _blocos(df.iloc[inicio:inicio + LINHAS_POR_ABA_XLSX]):
+                for valores in _linhas_excel(bloco):
+                    planilha.write_row(linha, 0, valores)
+                    linha += 1
+    pasta.close()
+
+def _gravar_csv(df, destino):
+    # Mesmo dialeto do CSV de erros da remessa: ';' e BOM para o Excel abrir acentuado
+    df.to_csv(destino, index=False, sep=';', encoding='utf-8-sig', chunksize=LINHAS_POR_BLOCO)
+
+def _gravar_parquet(df, destino):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Exportação em Parquet precisa do pacote pyarrow (pip install pyarrow).")
+
+    # Esquema do DataFrame inteiro (não do primeiro bloco), coluna a coluna: todos os blocos
+    # saem com os mesmos tipos. Texto misturado com número (comum no que vem do Sheets) não
+    # tem tipo Arrow e vai como texto
+    campos, como_texto = [], []
+    for coluna in df.columns:
+        try:
+            tipo = pa.array(df[coluna], from_pandas=True).type
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            tipo = pa.string()
+            como_texto.append(coluna)
+        campos.append(pa.field(str(coluna), tipo))
+    esquema = pa.schema(campos)
+
+    def preparar(bloco):
+        if not como_texto: return bloco
+        bloco = bloco.copy()
+        for coluna in como_texto:
+            bloco[coluna] = bloco[coluna].map(lambda v: None if pd.isna(v) else str(v)).astype(object)
+        return bloco
+
+    with pq.ParquetWriter(destino, esquema) as escritor:
+        for bloco in _blocos(df):
+            escritor.write_table(pa.Table.from_pandas(preparar(bloco), schema=esquema, preserve_index=False))
+
+def exportar(planilhas, formato='xlsx', destino=None):
+    """
+    Grava {nome da aba: DataFrame} (ou um DataFrame só) em xlsx, csv ou parquet, em blocos.
+    destino: caminho ou arquivo binário aberto; sem destino, devolve um arquivo temporário
+    (na memória até LIMITE_MEMORIA_SAIDA, depois em disco) já rebobinado para o download.
+    CSV/Parquet com mais de uma aba saem num .zip, um arquivo por aba.
+    """
+    if formato not in FORMATOS_EXPORTACAO:
+        raise ValueError(f"Formato de exportação não suportado: {formato} (use {', '.join(FORMATOS_EXPORTACAO)})")
+    planilhas = _como_planilhas(planilhas)
+    saida = destino if destino is not None else tempfile.SpooledTemporaryFile(max_size=LIMITE_MEMORIA_SAIDA)
+
+    if formato == 'xlsx':
+        _gravar_xlsx(planilhas, saida)
+    else:
+        gravar = _gravar_csv if formato == 'csv' else _gravar_parquet
+        if len(planilhas) == 1:
+            gravar(next(iter(planilhas.values())), saida)
+        else:
+            extensao, usados = FORMATOS_EXPORTACAO[formato][0], set()
+            with zipfile.ZipFile(saida, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+                for aba, df in planilhas.items():
+                    with zf.open(f"{_nome_aba(aba, usados)}{extensao}", 'w', force_zip64=True) as arquivo:
+                        gravar(df, arquivo)
+
+    if destino is None: saida.seek(0)
+    return saida
+
+def formato_do_caminho(caminho, padrao='xlsx'):
+    """Formato de exportação pela extensão do arquivo (.xlsx, .csv, .parquet); o resto fica no padrão."""
+    extensao = os.path.splitext(caminho or '')[1].lower()
+    return next((f for f, (ext, _) in FORMATOS_EXPORTACAO.items() if ext == extensao), padrao)
+
+def exportar_bytes(planilhas, formato='xlsx'):
+    """
+    Conteúdo exportado em bytes, para o data= como função do st.download_button: o Streamlit
+    lê o retorno inteiro para bytes de qualquer jeito, e arquivo devolvido pela função
+    ninguém fecharia. O temporário é fechado (e apagado) aqui mesmo.
+    """
+    with exportar(planilhas, formato) as saida:
+        return saida.read()
+
+def exportar_arquivo(planilhas, formato='xlsx'):
+    """
+    Arquivo exportado já aberto em 'rb', para ir direto ao st.download_button (que aceita
+    arquivo aberto do disco, mas não o SpooledTemporaryFile). O conteúdo não passa por bytes
+    aqui: é gravado num temporário em disco, cujo nome sai da pasta logo depois de aberto.
+    """
+    descritor, caminho = tempfile.mkstemp(suffix=nome_exportacao('', formato, planilhas))
+    try:
+        with os.fdopen(descritor, 'wb') as destino:
+            exportar(planilhas, formato, destino)
+        return open(caminho, 'rb')
+    finally:
+        # No Windows o arquivo aberto não sai da pasta: fica para a limpeza do temporário
+        try: os.remove(caminho)
+        except OSError: pass
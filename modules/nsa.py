@@ -0,0 +1,93 @@
+import os
+import sqlite3
+import contextlib
+from datetime import datetime
+
+import pandas as pd
+
+# =============================================================================
+# CONTROLE DO NSA (NÚMERO SEQUENCIAL DO ARQUIVO) DAS REMESSAS
+# =============================================================================
+# O banco recusa remessa com NSA repetido, então o contador fica num SQLite:
+# cada reserva é um UPDATE dentro de BEGIN IMMEDIATE (trava curta só de escrita),
+# o que deixa várias sessões do Streamlit pedirem números ao mesmo tempo sem colisão.
+
+CAMINHO_BANCO_NSA = os.environ.get('CNAB_NSA_DB', 'nsa_controle.sqlite3')
+NSA_MINIMO = 15  # O banco travou os números baixos (testes): a sequência começa no 15
+TIMEOUT_TRAVA = 30  # segundos esperando outra sessão terminar a reserva
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS sequencia_nsa (
+    chave  TEXT PRIMARY KEY,
+    ultimo INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS log_nsa (
+    chave        TEXT NOT NULL,
+    nsa          INTEGER NOT NULL,
+    arquivo      TEXT,
+    reservado_em TEXT NOT NULL,
+    PRIMARY KEY (chave, nsa)
+);
+"""
+
+@contextlib.contextmanager
+def _conectar(caminho=None):
+    conn = sqlite3.connect(caminho or CAMINHO_BANCO_NSA, timeout=TIMEOUT_TRAVA, isolation_level=None)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(_ESQUEMA)
+        yield conn
+    finally:
+        conn.close()
+
+def chave_nsa(conta):
+    """Cada convênio tem sua própria sequência de NSA no banco."""
+    return f"{conta['banco']}:{conta['convenio']}"
+
+def reservar_nsa(chave, qtd=1, arquivos=None, semente=0, caminho=None):
+    """
+    Reserva atomicamente `qtd` NSAs consecutivos da sequência `chave` e devolve o range.
+    arquivos: nomes dos arquivos na ordem dos NSAs (opcional, vai para o log).
+    semente: último NSA já usado fora deste controle (ex.: o antigo nsa_counter.txt),
+    considerado só na primeira reserva da chave.
+    """
+    if qtd < 1: raise ValueError("qtd de NSAs a reservar deve ser >= 1")
+    arquivos = list(arquivos or [])
+    if len(arquivos) > qtd: raise ValueError("Mais arquivos do que NSAs reservados.")
+    arquivos += [None] * (qtd - len(arquivos))
+
+    with _conectar(caminho) as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT OR IGNORE INTO sequencia_nsa (chave, ultimo) VALUES (?, ?)",
+                (chave, max(int(semente or 0), NSA_MINIMO - 1)),
+            )
+            conn.execute("UPDATE sequencia_nsa SET ultimo = ultimo + ? WHERE chave = ?", (qtd, chave))
+            ultimo = conn.execute("SELECT ultimo FROM sequencia_nsa WHERE chave = ?", (chave,)).fetchone()[0]
+            primeiro = ultimo - qtd + 1
+            agora = datetime.now().isoformat(timespec='seconds')
+            conn.executemany(
+                "INSERT INTO log_nsa (chave, nsa, arquivo, reservado_em) VALUES (?, ?, ?, ?)",
+                [(chave, primeiro + i, arq, agora) for i, arq in enumerate(arquivos)],
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+    return range(primeiro, ultimo + 1)
+
+def registrar_arquivo_nsa(chave, nsa, arquivo, caminho=None):
+    """Anota no log o arquivo que efetivamente usou o NSA (reservas feitas sem nome)."""
+    with _conectar(caminho) as conn:
+        conn.execute("UPDATE log_nsa SET arquivo = ? WHERE chave = ? AND nsa = ?", (arquivo, chave, int(nsa)))
+
+def historico_nsa(chave=None, caminho=None):
+    """Log de NSAs reservados (chave, nsa, arquivo, reservado_em), do mais recente para o mais antigo."""
+    sql = "SELECT chave, nsa, arquivo, reservado_em FROM log_nsa"
+    params = ()
+    if chave is not None:
+        sql += " WHERE chave = ?"
+        params = (chave,)
+    with _conectar(caminho) as conn:
+        return pd.read_sql_query(sql + " ORDER BY reservado_em DESC, nsa DESC", conn, params=params)
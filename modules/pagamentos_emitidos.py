@@ -0,0 +1,94 @@
+import os
+import json
+import sqlite3
+import contextlib
+from datetime import datetime
+
+import pandas as pd
+
+# =============================================================================
+# ÍNDICE DE PAGAMENTOS JÁ EMITIDOS EM REMESSA
+# =============================================================================
+# A Pagamentos_Dia é relida a cada clique e tudo vem marcado para pagar, então nada
+# impedia o mesmo boleto de ir em duas remessas seguidas. Cada título de uma remessa
+# confirmada como enviada fica registrado aqui pela sua chave (código de barras, ou
+# chave PIX + valor + data), com o NSA da remessa que o levou. A chave é PRIMARY KEY: a consulta de um lote
+# inteiro é um JOIN contra o índice, rápido mesmo com anos de histórico.
+
+CAMINHO_BANCO_EMITIDOS = os.environ.get('CNAB_EMITIDOS_DB', 'pagamentos_emitidos.sqlite3')
+TIMEOUT_TRAVA = 30
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS pagamentos_emitidos (
+    chave      TEXT PRIMARY KEY,
+    nsa        INTEGER NOT NULL,
+    conta      TEXT,
+    emitido_em TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_emitidos_nsa ON pagamentos_emitidos (nsa);
+"""
+
+@contextlib.contextmanager
+def _conectar(caminho=None):
+    conn = sqlite3.connect(caminho or CAMINHO_BANCO_EMITIDOS, timeout=TIMEOUT_TRAVA, isolation_level=None)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(_ESQUEMA)
+        yield conn
+    finally:
+        conn.close()
+
+def registrar_pagamentos(chaves, nsa, conta=None, caminho=None):
+    """
+    Grava as chaves dos títulos de uma remessa com o NSA dela.
+    Chave já registrada mantém o NSA original (a primeira remessa que levou o título).
+    Retorna quantas chaves entraram agora (as já registradas não contam).
+    """
+    agora = datetime.now().isoformat(timespec='seconds')
+    linhas = [(str(c), int(nsa), conta, agora) for c in pd.unique(pd.Series(chaves, dtype=object))]
+    with _conectar(caminho) as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            antes = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO pagamentos_emitidos (chave, nsa, conta, emitido_em) VALUES (?, ?, ?, ?)", linhas
+            )
+            inseridas = conn.total_changes - antes
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+    return inseridas
+
+def consultar_pagamentos(chaves, caminho=None):
+    """
+    Procura um lote de chaves no índice de uma vez.
+    Retorna DataFrame (chave, nsa, conta, emitido_em) só com as chaves já emitidas.
+    """
+    # O lote inteiro vai como um único parâmetro JSON (json_each), sem um INSERT por chave
+    unicas = json.dumps(pd.unique(pd.Series(chaves, dtype=object).astype(str)).tolist())
+    with _conectar(caminho) as conn:
+        return pd.read_sql_query(
+            "SELECT e.chave, e.nsa, e.conta, e.emitido_em FROM pagamentos_emitidos e "
+            "WHERE e.chave IN (SELECT value FROM json_each(?))",
+            conn, params=(unicas,),
+        )
+
+def liberar_remessa(nsa, conta=None, caminho=None):
+    """Tira do índice os títulos de uma remessa recusada/cancelada, para poderem ser reenviados."""
+    sql = "DELETE FROM pagamentos_emitidos WHERE nsa = ?"
+    params = [int(nsa)]
+    if conta is not None:
+        sql += " AND conta = ?"
+        params.append(conta)
+    with _conectar(caminho) as conn:
+        return conn.execute(sql, params).rowcount
+
+def remessas_emitidas(caminho=None):
+    """Remessas confirmadas no índice (nsa, conta, qtd_titulos, emitido_em), da mais recente para a mais antiga."""
+    with _conectar(caminho) as conn:
+        return pd.read_sql_query(
+            "SELECT nsa, conta, COUNT(*) AS qtd_titulos, MIN(emitido_em) AS emitido_em FROM pagamentos_emitidos "
+            "GROUP BY nsa, conta ORDER BY emitido_em DESC, nsa DESC",
+            conn,
+        )
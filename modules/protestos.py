@@ -0,0 +1,601 @@
+import io
+import os
+import re
+import sys
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pdfplumber
+import pypdfium2 as pdfium
+import pandas as pd
+
+from modules.cache_protestos import hash_pdf, buscar_extracoes, gravar_extracoes
+
+# =============================================================================
+# 📄 LEITOR INTELIGENTE DE PROTESTOS (PDF)
+# =============================================================================
+# Os cartórios mandam lotes de 50-200 certidões e o pdfplumber é pesado de CPU: cada PDF
+# é lido e quebrado em registros num processo do pool, e os resultados voltam na ordem
+# do upload. Arquivo ilegível não derruba o lote: vira uma linha na tabela de erros.
+# PDF já lido antes sai do cache em disco (modules/cache_protestos.py) sem abrir o PDF.
+# O texto sai do pdfium por padrão; o pdfplumber fica para a página que o pdfium não lê bem.
+# A tela usa extrair_protestos_em_fluxo: com pool, cada PDF entra na tabela assim que o seu
+# processo termina (na ordem do upload); sem pool, página a página, com os registros saindo na hora.
+
+# Extrator de texto das certidões: 'rapido' lê o texto direto do conteúdo da página pelo
+# pdfium (sem análise de layout, dezenas de vezes mais rápido) e cai no pdfplumber na página
+# que não passar na checagem; 'pdfplumber' é o leitor de antes, caractere a caractere.
+# Cada perfil de cartório escolhe o seu; este é o do perfil padrão (e de quem não escolher).
+EXTRATORES = ('rapido', 'pdfplumber')
+EXTRATOR_PADRAO = os.environ.get('CNAB_PROTESTOS_EXTRATOR', 'rapido')
+if EXTRATOR_PADRAO not in EXTRATORES:
+    raise ValueError(f"CNAB_PROTESTOS_EXTRATOR inválido: {EXTRATOR_PADRAO} (use {' ou '.join(EXTRATORES)})")
+
+# Suba a versão ao mudar o extrator de texto / as regras do parser: o cache antigo deixa de valer
+VERSAO_TEXTO = f'{EXTRATOR_PADRAO}-2'
+VERSAO_PARSER = '3'
+
+COLUNA_ARQUIVO = 'Cartório/Arquivo'
+COLUNAS_ERRO_PROTESTO = [COLUNA_ARQUIVO, 'erro']
+# Modo automático: abaixo disso a subida do pool custa mais do que ler os PDFs em série
+LIMIAR_PARALELO_PDFS = 4
+
+# Checagem do texto rápido: acima disso de caracteres ilegíveis (fonte sem tabela Unicode)
+# ou com linha desse tamanho (conteúdo sem quebra, os [^\n]+ do parser engoliriam tudo), a
+# página é relida pelo pdfplumber
+LIMITE_ILEGIVEIS_RAPIDO = 0.02
+LIMITE_LINHA_RAPIDO = 500
+_RE_ILEGIVEL = re.compile('[\ufffd\ue000-\uf8ff\x00-\x08\x0b\x0c\x0e-\x1f]')
+# O pdfium marca hífen de quebra e fim de linha à moda Windows
+_LIMPEZA_RAPIDO = str.maketrans({'\r': None, '\x02': None, '\ufffe': None})
+
+def _texto_rapido(pagina_pdfium):
+    """Texto da página direto do pdfium; None se não passar na checagem (vai para o pdfplumber)."""
+    textpage = pagina_pdfium.get_textpage()
+    try:
+        if textpage.count_chars() == 0: return ''  # página só imagem: o pdfplumber também não acharia nada
+        texto = textpage.get_text_range().translate(_LIMPEZA_RAPIDO)
+    finally:
+        textpage.close()
+    if not texto.strip(): return None
+    if len(_RE_ILEGIVEL.findall(texto)) > LIMITE_ILEGIVEIS_RAPIDO * len(texto): return None
+    if max(map(len, texto.split('\n'))) > LIMITE_LINHA_RAPIDO: return None
+    return texto
+
+def _texto_pdfplumber(pdf, indice):
+    page = pdf.pages[indice]
+    try: return page.extract_text() or ''
+    finally: page.close()
+
+class _CursorPdf(io.RawIOBase):
+    """
+    Leitura do mesmo arquivo aberto com posição própria: o pdfium e o pdfplumber leem o
+    upload cada um no seu ritmo sem um mover o cursor do outro, e sem copiar o PDF para bytes.
+    """
+
+    def __init__(self, arquivo):
+        self._arquivo, self._posicao = arquivo, 0
+
+    def readable(self): return True
+    def seekable(self): return True
+    def tell(self): return self._posicao
+
+    def seek(self, deslocamento, origem=io.SEEK_SET):
+        if origem == io.SEEK_CUR: deslocamento += self._posicao
+        elif origem == io.SEEK_END: deslocamento += self._arquivo.seek(0, io.SEEK_END)
+        self._posicao = deslocamento
+        return deslocamento
+
+    def readinto(self, destino):
+        self._arquivo.seek(self._posicao)
+        lidos = self._arquivo.readinto(destino)
+        self._posicao += lidos
+        return lidos
+
+def _leitor(fonte):
+    # Caminho e bytes cada leitor abre por conta própria; arquivo aberto ganha um cursor por leitor
+    if isinstance(fonte, str): return fonte
+    if isinstance(fonte, bytes): return io.BytesIO(fonte)
+    return io.BufferedReader(_CursorPdf(fonte))
+
+def _paginas_pdf(fonte):
+    """
+    Texto de cada página (com o "\\n" do fim), uma de cada vez. fonte: bytes, caminho ou
+    arquivo aberto/UploadedFile. Só as páginas que precisam abrem no pdfplumber, e cada uma
+    é fechada logo depois de lida: o pdfplumber guarda os caracteres de todas as páginas já
+    abertas e um lote de centenas de páginas estourava a memória.
+    O extrator sai do perfil do cartório, reconhecido na primeira página com texto.
+    """
+    plumber, perfil, extrator = None, None, EXTRATOR_PADRAO
+    try:
+        documento = pdfium.PdfDocument(fonte if isinstance(fonte, (str, bytes)) else _leitor(fonte))
+    except pdfium.PdfiumError:
+        # O pdfium recusou o arquivo: tudo pelo pdfplumber (que dá o erro de sempre, se for o caso)
+        documento, extrator = None, 'pdfplumber'
+    try:
+        if documento is None:
+            plumber = pdfplumber.open(_leitor(fonte))
+        for indice in range(len(documento if documento is not None else plumber.pages)):
+            texto = None
+            if extrator == 'rapido':
+                pagina = documento[indice]
+                try: texto = _texto_rapido(pagina)
+                finally: pagina.close()
+            if texto is not None and perfil is None and texto.strip():
+                perfil = perfil_do_documento(texto)
+                if perfil.extrator != 'rapido': extrator, texto = perfil.extrator, None
+            if texto is None:
+                if plumber is None: plumber = pdfplumber.open(_leitor(fonte))
+                texto = _texto_pdfplumber(plumber, indice)
+                if perfil is None and texto.strip() and documento is not None:
+                    perfil = perfil_do_documento(texto)
+                    extrator = perfil.extrator
+            if texto:
+                yield texto + "\n"
+    finally:
+        if plumber is not None: plumber.close()
+        if documento is not None: documento.close()
+
+def _texto_pdf(conteudo):
+    return ''.join(_paginas_pdf(conteudo))
+
+# =============================================================================
+# PERFIS DE LAYOUT POR CARTÓRIO
+# =============================================================================
+# Cada campo do perfil é uma lista de (rótulo, resto): o rótulo é consumido e o resto fica
+# num lookahead com o grupo (?P<valor>...). Todos os campos viram UMA regex (alternância)
+# compilada na importação, e cada bloco de protocolo é varrido uma vez só com finditer; vale
+# a 1ª ocorrência de cada campo, igual a um re.search por campo. Rótulo vazio = o próprio
+# valor é consumido (documentos). Rótulos de campos diferentes não podem começar no mesmo
+# ponto do texto, senão o primeiro da alternância esconde o outro.
+# O perfil do documento é escolhido pela assinatura (regex procurada só no começo do texto,
+# onde fica o cabeçalho do cartório); sem assinatura reconhecida, vale o PERFIL_PADRAO.
+
+# Até onde a assinatura do cartório é procurada
+LIMITE_ASSINATURA = 2000
+CNPJ_HOSPITAL = '85.307.098/0001-87'
+
+_RE_QUEBRA_PROTOCOLO = re.compile(r'(?i)Protocolo[:\s]*')
+_RE_NUMERO_PROTOCOLO = re.compile(r'\b(\d{5,10})\b')
+_RE_FIM_NOME_CREDOR = re.compile(r'(?i)\s*-|\s*CNPJ|\s*CPF|\s*Documento')
+_RE_PREFIXO_NUMERICO = re.compile(r'^\d{3,4}(?=[A-Za-z])')
+
+class PerfilCartorio:
+    """Extrator pré-compilado dos campos de uma certidão (um layout de cartório)."""
+
+    def __init__(self, nome, campos, assinatura=None, limpeza_credor=(), multiplos=('documentos',), extrator=None):
+        self.nome = nome
+        self.extrator = extrator or EXTRATOR_PADRAO
+        if self.extrator not in EXTRATORES:
+            raise ValueError(f"Perfil {nome}: extrator desconhecido {self.extrator}")
+        self.assinatura = re.compile(assinatura, re.IGNORECASE) if assinatura else None
+        self.limpeza_credor = tuple(limpeza_credor)
+        self.multiplos = set(multiplos)
+
+        ramos, self._campo_do_grupo, iniciais = [], {}, set()
+        for campo, alternativas in campos.items():
+            for rotulo, resto in alternativas:
+                grupo = f"v{len(ramos)}"
+                if '(?P<valor>' not in resto:
+                    raise ValueError(f"Perfil {nome}: campo {campo} sem o grupo (?P<valor>...)")
+                self._campo_do_grupo[grupo] = campo
+                valor = resto.replace('(?P<valor>', f'(?P<{grupo}>')
+                ramos.append(f"(?:{rotulo})(?={valor})" if rotulo else valor)
+                abre = _iniciais(rotulo or valor.split('>', 1)[1])
+                iniciais = iniciais | abre if iniciais is not None and abre is not None else None
+        # Com IGNORECASE o re não monta sozinho o filtro da 1ª letra e testaria todos os ramos
+        # em cada posição do texto; o lookahead com as iniciais descarta a posição de cara
+        filtro = f"(?=[{''.join(sorted(iniciais))}])" if iniciais else ''
+        self._varredura = re.compile(f"{filtro}(?:{'|'.join(ramos)})", re.IGNORECASE)
+
+    def reconhece(self, texto):
+        return bool(self.assinatura and self.assinatura.search(texto, 0, LIMITE_ASSINATURA))
+
+    def campos(self, bloco):
+        """{campo: 1º valor} num passe só; campos múltiplos (documentos) vêm como lista."""
+        achados = {}
+        for m in self._varredura.finditer(bloco):
+            campo = self._campo_do_grupo[m.lastgroup]
+            if campo in self.multiplos:
+                achados.setdefault(campo, []).append(m.group(m.lastgroup))
+            elif campo not in achados:
+                achados[campo] = m.group(m.lastgroup)
+        return achados
+
+    def limpar_credor(self, nome):
+        nome = nome.strip()
+        for limpeza in self.limpeza_credor:
+            nome = limpeza(nome)
+        return nome
+
+def _iniciais(padrao):
+    """
+    Caracteres que podem abrir o padrão, se cada alternativa de topo começa por uma letra
+    literal ou por \\d; senão None (sem filtro). Letras entram nas duas caixas.
+    """
+    iniciais, nivel, inicio = set(), 0, True
+    for i, c in enumerate(padrao):
+        if inicio:
+            if padrao.startswith('\\d', i): iniciais.add('\\d')
+            elif c.isalpha(): iniciais |= {c.lower(), c.upper()}
+            else: return None
+            inicio = False
+        if c == '(' and padrao[i - 1:i] != '\\': nivel += 1
+        elif c == ')' and padrao[i - 1:i] != '\\': nivel -= 1
+        elif c == '|' and nivel == 0: inicio = True
+    return iniciais
+
+def _cortar_documento(nome):
+    # "FORNECEDOR LTDA - CNPJ ..." -> "FORNECEDOR LTDA"
+    return _RE_FIM_NOME_CREDOR.split(nome)[0].strip()
+
+def _tirar_prefixo_numerico(nome):
+    # Cartório Salles cola o código interno no nome ("0123EMPRESA")
+    return _RE_PREFIXO_NUMERICO.sub('', nome)
+
+_DATA = r'[:\s]*(?P<valor>\d{2}/\d{2}/\d{4})'
+
+_DOCUMENTOS = [('', r'(?P<valor>\d{2}\.\d{3}\.\d{3}/\d{4}\-\d{2}|\d{3}\.\d{3}\.\d{3}\-\d{2})')]
+_VALOR = r'[:\s]*(?:R\$)?\s*(?P<valor>[\d\.,]{4,})'
+_CUSTAS = r'[:\s]*(?:R\$)?\s*(?P<valor>[\d\.,]{3,})'
+_TITULO = r'[:\s]*(?P<valor>[A-Za-z0-9\-\.\/]+)'
+_ESPECIE = r'[:\s]+(?P<valor>[A-Za-zÀ-ÿ0-9\s\(\)]+?)(?:\s*-|\s*Emissão|\s*Saldo|\s*Vencimento|\n)'
+
+# Layout que o leitor sempre entendeu (vários cartórios): vale para a certidão sem assinatura
+# reconhecida, com todos os rótulos conhecidos
+PERFIL_PADRAO = PerfilCartorio('padrao', {
+    'credor': [(r'Sacador|Credor(?: original)?|Cedente', r'[:\s]+(?:Endere[çc]o[:\s]+)?(?P<valor>[^\n]+)')],
+    'apresentante': [(r'Apresentante', r'[:\s]+(?P<valor>[^\n]+)')],
+    'documentos': _DOCUMENTOS,
+    'valor': [(r'Valor(?: Original| Declarado)?|Saldo', _VALOR)],
+    'custas': [(r'Custas|Emolumentos|Taxas', _CUSTAS)],
+    'emissao': [(r'Emissão|Data Emissã[oo]', _DATA)],
+    'vencimento': [(r'Vencimento|Venc\.', _DATA)],
+    'protesto': [(r'Data(?:\s+do)?\s+Protesto|Protestado\s+em|Protesto\s+em', _DATA)],
+    'titulo': [
+        (r'nº(?:\s+do)?\s+Título', _TITULO),
+        (r'Título\s+n', r'.*?' + _TITULO),
+        (r'Número', _TITULO),
+    ],
+    'especie': [(r'Espécie(?: do Titulo)?', _ESPECIE)],
+}, limpeza_credor=(_cortar_documento,))
+
+PERFIS_CARTORIO = []
+
+def registrar_perfil_cartorio(perfil):
+    """Registra o layout de um cartório; é testado antes dos já registrados e do padrão."""
+    if perfil.assinatura is None:
+        raise ValueError(f"Perfil {perfil.nome}: sem assinatura, nunca seria escolhido")
+    PERFIS_CARTORIO.insert(0, perfil)
+    return perfil
+
+# --- Cartórios conhecidos (só os rótulos que cada um usa) ---
+
+# Salles: "Sacador: Endereço:" e o código interno colado no nome ("0123FORNECEDOR")
+PERFIL_SALLES = registrar_perfil_cartorio(PerfilCartorio('salles', {
+    'credor': [(r'Sacador', r'[:\s]+(?:Endere[çc]o[:\s]+)?(?P<valor>[^\n]+)')],
+    'documentos': _DOCUMENTOS,
+    'valor': [(r'Valor', _VALOR)],
+    'custas': [(r'Custas', _CUSTAS)],
+    'emissao': [(r'Emissão', _DATA)],
+    'vencimento': [(r'Vencimento', _DATA)],
+    'protesto': [(r'Data\s+do\s+Protesto', _DATA)],
+    'titulo': [(r'Título\s+n', r'.*?' + _TITULO)],
+    'especie': [(r'Espécie', _ESPECIE)],
+}, assinatura=r'Cart[óo]rio\s+Salles', limpeza_credor=(_cortar_documento, _tirar_prefixo_numerico)))
+
+# Tabelião de Letras e Títulos: "Credor original", valores sem R$, emissão e vencimento na mesma linha
+PERFIL_LETRAS_TITULOS = registrar_perfil_cartorio(PerfilCartorio('letras_e_titulos', {
+    'credor': [(r'Credor\s+original', r'[:\s]+(?P<valor>[^\n]+)')],
+    'documentos': _DOCUMENTOS,
+    'valor': [(r'Valor\s+Original', _VALOR)],
+    'custas': [(r'Emolumentos', _CUSTAS)],
+    'emissao': [(r'Data\s+Emissão', _DATA)],
+    'vencimento': [(r'Venc\.', _DATA)],
+    'protesto': [(r'Protestado\s+em', _DATA)],
+    'titulo': [(r'nº\s+do\s+Título', _TITULO)],
+    'especie': [(r'Espécie\s+do\s+Titulo', _ESPECIE)],
+}, assinatura=r'Tabeli[ãa]o\s+de\s+Protesto\s+de\s+Letras', limpeza_credor=(_cortar_documento,)))
+
+# 3º Ofício: sem sacador (vale o apresentante, banco/FIDC ou pessoa física), sem emissão e
+# com o CNPJ do hospital antes do documento do credor
+PERFIL_TERCEIRO_OFICIO = registrar_perfil_cartorio(PerfilCartorio('terceiro_oficio', {
+    'apresentante': [(r'Apresentante', r'[:\s]+(?P<valor>[^\n]+)')],
+    'documentos': _DOCUMENTOS,
+    'valor': [(r'Saldo', _VALOR)],
+    'custas': [(r'Taxas', _CUSTAS)],
+    'vencimento': [(r'Vencimento', _DATA)],
+    'protesto': [(r'Protesto\s+em', _DATA)],
+    'titulo': [(r'Número', _TITULO)],
+    'especie': [(r'Espécie', _ESPECIE)],
+}, assinatura=r'3º\s+Of[íi]cio\s+de\s+Protestos', limpeza_credor=(_cortar_documento,)))
+
+def perfil_do_documento(texto):
+    return next((perfil for perfil in PERFIS_CARTORIO if perfil.reconhece(texto)), PERFIL_PADRAO)
+
+def _registro_do_bloco(perfil, chunk, nome_arquivo):
+    campos = perfil.campos(chunk)
+    record = {COLUNA_ARQUIVO: nome_arquivo}
+
+    m_prot = _RE_NUMERO_PROTOCOLO.search(chunk, 0, 150)
+    record['Protocolo'] = m_prot.group(1) if m_prot else "-"
+
+    credor = campos['credor'] if 'credor' in campos else campos.get('apresentante')
+    record['Credor/Sacador'] = perfil.limpar_credor(credor) if credor is not None else "Não identificado"
+
+    # CNPJ/CPF do fornecedor: o primeiro documento do bloco que não é o do hospital
+    docs_fornecedor = [doc for doc in campos.get('documentos', []) if doc != CNPJ_HOSPITAL]
+    record['CNPJ/CPF Credor'] = docs_fornecedor[0] if docs_fornecedor else "-"
+
+    record['Valor/Saldo'] = f"R$ {campos['valor'].strip()}" if 'valor' in campos else "-"
+    record['Custas/Taxas'] = f"R$ {campos['custas'].strip()}" if 'custas' in campos else "-"
+    record['Emissão'] = campos.get('emissao', "-")
+    record['Vencimento'] = campos.get('vencimento', "-")
+    record['Data do Protesto'] = campos.get('protesto', "-")
+    record['Título/Número'] = campos['titulo'].strip() if 'titulo' in campos else "-"
+    record['Espécie'] = campos['especie'].strip() if 'especie' in campos else "-"
+
+    # Filtro anti-lixo
+    if record['Protocolo'] != "-" and record['Valor/Saldo'] != "-":
+        return record
+    return None
+
+def iterar_registros_protesto(paginas, nome_arquivo):
+    """
+    Gera os registros de protesto à medida que os textos das páginas chegam. Só o bloco
+    ainda aberto (do último "Protocolo" em diante) atravessa a quebra de página: ele só
+    fecha quando aparece o próximo Protocolo ou o texto acaba. Mesmo resultado de quebrar
+    o texto inteiro de uma vez.
+    """
+    perfil, cabecalho, fechados = None, '', []
+    # Bloco aberto, a partir do início do último "Protocolo" (o [:\s]* do separador pode
+    # continuar na página seguinte, então ele é casado de novo junto com ela)
+    pendente = None
+    # Fim do cabeçalho: um "Protocolo" pode vir cortado entre dois pedaços de texto
+    sobra = ''
+
+    def decididos():
+        # A assinatura do cartório é procurada nos primeiros LIMITE_ASSINATURA caracteres;
+        # até eles chegarem, os blocos já fechados esperam
+        nonlocal perfil
+        if perfil is None and len(cabecalho) < LIMITE_ASSINATURA: return
+        if perfil is None: perfil = perfil_do_documento(cabecalho)
+        for chunk in fechados:
+            record = _registro_do_bloco(perfil, chunk, nome_arquivo)
+            if record is not None: yield record
+        fechados.clear()
+
+    for texto in paginas:
+        if len(cabecalho) < LIMITE_ASSINATURA: cabecalho += texto[:LIMITE_ASSINATURA - len(cabecalho)]
+        bloco = (sobra if pendente is None else pendente) + texto
+        marcas = list(_RE_QUEBRA_PROTOCOLO.finditer(bloco))
+        if not marcas:
+            # Antes do primeiro Protocolo é só cabeçalho da certidão: não precisa guardar
+            if pendente is None: sobra = bloco[-(len('Protocolo') - 1):]
+            else: pendente = bloco
+            continue
+        fechados.extend(bloco[atual.end():seguinte.start()] for atual, seguinte in zip(marcas, marcas[1:]))
+        pendente = bloco[marcas[-1].start():]
+        yield from decididos()
+
+    if pendente is not None:
+        fechados.append(pendente[_RE_QUEBRA_PROTOCOLO.match(pendente).end():])
+    if perfil is None: perfil = perfil_do_documento(cabecalho)
+    yield from decididos()
+
+def registros_protesto(text, nome_arquivo):
+    """Quebra o texto de uma certidão em registros de protesto (suporta múltiplos layouts)."""
+    return list(iterar_registros_protesto([text], nome_arquivo))
+
+def _sem_arquivo(registros):
+    # O cache guarda os registros sem o nome: o mesmo PDF pode voltar com outro nome
+    return [{k: v for k, v in r.items() if k != COLUNA_ARQUIVO} for r in registros]
+
+def _com_arquivo(registros, nome_arquivo):
+    return [{COLUNA_ARQUIVO: nome_arquivo, **r} for r in _sem_arquivo(registros)]
+
+def extrair_protestos_arquivo(tarefa):
+    """
+    Roda nos processos do pool (função de módulo, picklável): (nome, bytes ou caminho do PDF) ->
+    (texto das páginas, registros, mensagem de erro ou None).
+    """
+    nome_arquivo, conteudo = tarefa
+    try:
+        texto = _texto_pdf(conteudo)
+        return texto, registros_protesto(texto, nome_arquivo), None
+    except Exception as e:
+        return None, [], f"{type(e).__name__}: {e}"
+
+def _usar_pool(qtd_arquivos, paralelo):
+    if paralelo is None:
+        return qtd_arquivos >= LIMIAR_PARALELO_PDFS and (os.cpu_count() or 1) > 1
+    return bool(paralelo) and qtd_arquivos > 1
+
+def _ler_upload(arquivo):
+    # Caminho continua caminho (quem extrai abre o arquivo, no processo do pool se for o caso);
+    # UploadedFile do Streamlit, arquivo aberto em 'rb' ou BytesIO com .name viram bytes
+    if isinstance(arquivo, str): return os.path.basename(arquivo), arquivo
+    conteudo = arquivo.getvalue() if hasattr(arquivo, 'getvalue') else arquivo.read()
+    return os.path.basename(getattr(arquivo, 'name', '') or 'arquivo.pdf'), conteudo
+
+def _extrair_em_lote(tarefas, paralelo, workers):
+    if not _usar_pool(len(tarefas), paralelo):
+        return [extrair_protestos_arquivo(tarefa) for tarefa in tarefas]
+    resultados = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futuros = [executor.submit(extrair_protestos_arquivo, tarefa) for tarefa in tarefas]
+        for futuro in futuros:
+            # Processo que morre no meio (PDF que estoura memória) só perde o próprio arquivo
+            try: resultados.append(futuro.result())
+            except Exception as e: resultados.append((None, [], f"{type(e).__name__}: {e}"))
+    return resultados
+
+def _buscar_cache(hashes):
+    # Cache é só atalho: se o SQLite não abrir (disco cheio, pasta só leitura), extrai do zero
+    try: return buscar_extracoes(hashes, VERSAO_TEXTO)
+    except sqlite3.Error as e:
+        print(f"Cache de protestos indisponível: {e}", file=sys.stderr)
+        return {}
+
+def _gravar_cache(itens):
+    try: gravar_extracoes(itens, VERSAO_TEXTO, VERSAO_PARSER)
+    except sqlite3.Error as e: print(f"Cache de protestos indisponível: {e}", file=sys.stderr)
+
+def _resolver_cache(hashes):
+    """
+    Registros dos PDFs já lidos: ({hash: registros}, [(hash, texto, registros) a regravar]).
+    Se o parser mudou, os registros são refeitos a partir do texto guardado, sem reabrir o PDF.
+    """
+    por_hash, novos = {}, []
+    for h, (texto, versao_parser, registros) in _buscar_cache(hashes).items():
+        if versao_parser != VERSAO_PARSER or registros is None:
+            registros = _sem_arquivo(registros_protesto(texto, None))
+            novos.append((h, texto, registros))
+        por_hash[h] = registros
+    return por_hash, novos
+
+def extrair_protestos_pdfs(arquivos, paralelo=None, workers=None, usar_cache=True):
+    """
+    Extrai as certidões de vários PDFs, em paralelo quando o lote justifica. arquivos: caminhos
+    (abertos por quem extrai, no processo do pool) ou arquivos abertos/UploadedFile.
+    Retorna (DataFrame de protestos na ordem do upload, DataFrame de erros por arquivo).
+    paralelo=None decide pelo tamanho do lote (LIMIAR_PARALELO_PDFS); True/False força o modo.
+    usar_cache=True reaproveita PDFs já lidos (mesmos bytes) do cache em disco.
+    """
+    tarefas = [_ler_upload(arquivo) for arquivo in arquivos]
+    hashes = [_hash_arquivo(conteudo) for _, conteudo in tarefas]
+    em_cache, novos = _resolver_cache(hashes) if usar_cache else ({}, [])
+    por_hash = {h: (registros, None) for h, registros in em_cache.items()}
+
+    # PDF repetido no mesmo lote é lido uma vez só
+    faltando = {h: tarefa for h, tarefa in zip(hashes, tarefas) if h not in por_hash}
+    for h, (texto, registros, erro) in zip(faltando, _extrair_em_lote(list(faltando.values()), paralelo, workers)):
+        por_hash[h] = (registros, erro)
+        if erro is None: novos.append((h, texto, _sem_arquivo(registros)))
+
+    if usar_cache: _gravar_cache(novos)
+
+    registros = [r for (nome, _), h in zip(tarefas, hashes) for r in _com_arquivo(por_hash[h][0], nome)]
+    erros = [(nome, por_hash[h][1]) for (nome, _), h in zip(tarefas, hashes) if por_hash[h][1]]
+    return pd.DataFrame(registros), pd.DataFrame(erros, columns=COLUNAS_ERRO_PROTESTO)
+
+def _registros_do_cache(h, nome_arquivo):
+    em_cache, novos = _resolver_cache([h])
+    if h not in em_cache: return None
+    if novos: _gravar_cache(novos)
+    return _com_arquivo(em_cache[h], nome_arquivo)
+
+def _extrair_arquivo_em_fluxo(arquivo, nome_arquivo, usar_cache):
+    h = hash_pdf(arquivo) if usar_cache else None
+    registros = _registros_do_cache(h, nome_arquivo) if usar_cache else None
+    if registros is not None:
+        yield from registros
+        return
+
+    # O texto das páginas é pequeno perto dos objetos do pdfplumber: guardado só para o cache
+    textos = []
+    def lendo():
+        for texto in _paginas_pdf(arquivo):
+            textos.append(texto)
+            yield texto
+
+    registros = []
+    for record in iterar_registros_protesto(lendo(), nome_arquivo):
+        registros.append(record)
+        yield record
+    if usar_cache: _gravar_cache([(h, ''.join(textos), _sem_arquivo(registros))])
+
+def _nome_do_arquivo(arquivo):
+    return os.path.basename(getattr(arquivo, 'name', None) or str(arquivo))
+
+def _hash_arquivo(conteudo):
+    if not isinstance(conteudo, str): return hash_pdf(conteudo)
+    with open(conteudo, 'rb') as f: return hash_pdf(f)
+
+def _extrair_em_fluxo_pool(arquivos, usar_cache, workers):
+    # Um PDF inteiro por processo. Caminho vai como caminho (o processo abre o arquivo);
+    # upload vai como bytes, que é o que atravessa para o outro processo
+    nomes, prontos, hashes, tarefas = [], {}, {}, {}
+    for i, arquivo in enumerate(arquivos):
+        nomes.append(_nome_do_arquivo(arquivo))
+        try:
+            conteudo = _ler_upload(arquivo)[1]
+            hashes[i] = _hash_arquivo(conteudo)
+        except Exception as e:
+            prontos[i] = ([], f"{type(e).__name__}: {e}")
+            continue
+        tarefas.setdefault(hashes[i], (nomes[i], conteudo))
+
+    em_cache, novos = _resolver_cache(list(tarefas)) if usar_cache else ({}, [])
+    if novos: _gravar_cache(novos)
+    for i, h in hashes.items():
+        if h in em_cache: prontos[i] = (em_cache[h], None)
+
+    proximo = 0
+    def liberar():
+        # O que terminou fora de ordem espera aqui até os arquivos de antes chegarem
+        nonlocal proximo
+        while proximo in prontos:
+            registros, erro = prontos.pop(proximo)
+            nome = nomes[proximo]
+            for record in _com_arquivo(registros, nome): yield nome, record, None
+            if erro: yield nome, None, erro
+            proximo += 1
+
+    yield from liberar()
+    faltando = [h for h in tarefas if h not in em_cache]
+    if not faltando: return
+    executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        futuros = {executor.submit(extrair_protestos_arquivo, tarefas[h]): h for h in faltando}
+        for futuro in as_completed(futuros):
+            h = futuros[futuro]
+            # Processo que morre no meio (PDF que estoura memória) só perde o próprio arquivo
+            try: texto, registros, erro = futuro.result()
+            except Exception as e: texto, registros, erro = None, [], f"{type(e).__name__}: {e}"
+            if erro is None and usar_cache: _gravar_cache([(h, texto, _sem_arquivo(registros))])
+            for i, h_arquivo in hashes.items():
+                if h_arquivo == h: prontos[i] = (registros, erro)
+            yield from liberar()
+    finally:
+        # Tela que para de consumir no meio não fica esperando os PDFs que nem começaram
+        executor.shutdown(wait=True, cancel_futures=True)
+
+def extrair_protestos_em_fluxo(arquivos, usar_cache=True, paralelo=None, workers=None):
+    """
+    Versão em fluxo do extrair_protestos_pdfs, para a tela ir enchendo a tabela: gera
+    (nome do arquivo, registro, None) assim que cada protesto é lido e (nome do arquivo,
+    None, erro) para o PDF que não deu para ler, sempre na ordem do upload.
+    Com pool (paralelo como no extrair_protestos_pdfs), cada PDF é lido inteiro num processo
+    e os registros dele saem assim que ele e os anteriores terminam. Sem pool, um arquivo por
+    vez, página a página, direto do stream (caminho, arquivo aberto ou UploadedFile) e com só
+    uma página aberta no pdfplumber; se o arquivo quebrar no meio, os registros das páginas
+    já lidas continuam valendo e o arquivo não entra no cache.
+    """
+    arquivos = list(arquivos)
+    if _usar_pool(len(arquivos), paralelo):
+        yield from _extrair_em_fluxo_pool(arquivos, usar_cache, workers)
+        return
+    for arquivo in arquivos:
+        nome_arquivo = _nome_do_arquivo(arquivo)
+        try:
+            if isinstance(arquivo, str):
+                with open(arquivo, 'rb') as f:
+                    for record in _extrair_arquivo_em_fluxo(f, nome_arquivo, usar_cache):
+                        yield nome_arquivo, record, None
+            else:
+                arquivo.seek(0)
+                for record in _extrair_arquivo_em_fluxo(arquivo, nome_arquivo, usar_cache):
+                    yield nome_arquivo, record, None
+        except Exception as e:
+            yield nome_arquivo, None, f"{type(e).__name__}: {e}"
+
+def extrair_dados_protesto_pdf(uploaded_files, paralelo=None, workers=None):
+    """
+    Processa os arquivos PDF de certidões de protesto (suporta múltiplos layouts).
+    Mantida para quem só quer a tabela: os arquivos com erro são avisados no log, um a um.
+    """
+    df, erros = extrair_protestos_pdfs(uploaded_files, paralelo, workers)
+    for nome, erro in zip(erros[COLUNA_ARQUIVO], erros['erro']):
+        print(f"Erro ao ler PDF {nome}: {erro}", file=sys.stderr)
+    return df
@@ -0,0 +1,198 @@
+import os
+import time
+import shutil
+import tempfile
+from datetime import datetime
+
+import pandas as pd
+import streamlit as st
+
+from database import conectar_sheets
+from modules.utils import formatar_real
+from modules.cnab_engine import gerar_remessas_por_conta, compactar_remessas, confirmar_remessas, centavos_colunar, extrair_protestos_em_fluxo, LIMITE_REGISTROS_LOTE
+from modules.pagamentos_emitidos import remessas_emitidas, liberar_remessa
+from modules.conciliacao_protestos import IndiceHistorico, conciliar_protestos
+from modules.exportacao import exportar_arquivo, mime_exportacao
+from modules.validacao import validar_pagamentos, avisos_pagamentos
+
+# =============================================================================
+# BLOCOS DE TELA DO COCKPIT (app.py e pages/cockpit.py)
+# =============================================================================
+# As duas páginas mostram o mesmo cockpit: a geração/confirmação da remessa e a auditoria
+# dos protestos moram aqui, uma vez só, e cada página chama dentro da sua aba.
+
+# Índice da aba Historico para conciliar os protestos: montado uma vez e reaproveitado entre os lotes de PDF
+@st.cache_resource(ttl=300)
+def carregar_indice_historico():
+    return IndiceHistorico(conectar_sheets().read(worksheet="Historico", ttl=300))
+
+def painel_remessa(df_real, linhas_selecionadas):
+    """
+    Limites, prévia e geração da remessa dos títulos marcados, e a remessa pendente
+    (download + confirmação do envio) guardada na sessão.
+    """
+    # Remessa grande (fechamento do trimestre) ou banco com teto de tamanho: divide em vários lotes/arquivos
+    with st.expander("⚙️ Limites da remessa"):
+        max_registros_lote = st.number_input("Máximo de registros por lote", min_value=4, max_value=LIMITE_REGISTROS_LOTE, value=LIMITE_REGISTROS_LOTE, step=1000)
+        max_mb_arquivo = st.number_input("Tamanho máximo por arquivo (MB, 0 = sem limite)", min_value=0.0, value=0.0, step=1.0)
+
+    # Prévia: confere o lote quantas vezes precisar, sem gastar NSA nem marcar título;
+    # os segmentos ficam no cache e a remessa final só renderiza o que mudou
+    col_previa, col_gerar = st.columns(2)
+    clicou_previa = col_previa.button("🔍 Prévia da Remessa")
+    clicou_gerar = col_gerar.button("🚀 Gerar Arquivo de Remessa (CNAB 240)", type="primary")
+
+    if clicou_previa or clicou_gerar:
+        if clicou_gerar:
+            # Remessa anterior não confirmada é descartada (os arquivos moram numa pasta temporária)
+            anterior = st.session_state.pop('remessa_pendente', None)
+            if anterior: shutil.rmtree(anterior['pasta'], ignore_errors=True)
+        if len(linhas_selecionadas) > 0:
+            # Resgatamos as linhas da BASE ORIGINAL, garantindo que colunas invisíveis como AGENCIA_FAVORECIDA venham junto
+            df_pagar_completo = df_real.loc[linhas_selecionadas].copy()
+            _gerar_ou_previa(df_pagar_completo, clicou_previa, int(max_registros_lote), int(max_mb_arquivo * 2 ** 20) or None)
+        else:
+            st.warning("Nenhum título selecionado para pagamento.")
+
+    if st.session_state.get('remessa_pendente'):
+        _remessa_pendente(st.session_state['remessa_pendente'])
+
+def _gerar_ou_previa(df_pagar_completo, previa, max_registros_lote, max_bytes_arquivo):
+    # Pré-validação do lote inteiro: barra o arquivo antes que o banco recuse
+    erros_lote = validar_pagamentos(df_pagar_completo)
+    avisos_lote = avisos_pagamentos(df_pagar_completo)
+    if not avisos_lote.empty:
+        # Não barra: boleto vencido ainda pode ser pago (com juros) se o banco aceitar
+        st.warning(f"⚠️ {avisos_lote['linha'].nunique()} título(s) com vencimento já passado. Confira antes de enviar:")
+        st.dataframe(avisos_lote, use_container_width=True, hide_index=True)
+
+    if not erros_lote.empty:
+        st.error(f"❌ {erros_lote['linha'].nunique()} título(s) com problema. Corrija antes de gerar a remessa:")
+        st.dataframe(erros_lote, use_container_width=True, hide_index=True)
+    elif previa:
+        try:
+            remessas = gerar_remessas_por_conta(
+                df_pagar_completo, None, previa=True, max_registros_lote=max_registros_lote, max_bytes_arquivo=max_bytes_arquivo,
+            )
+            st.dataframe(pd.DataFrame([{
+                'Conta': r['conta'], 'Arquivo': i, 'Lotes': r['qtd_lotes'], 'Pagamentos': r['qtd_pagamentos'],
+                'Valor': formatar_real(centavos_colunar(df_pagar_completo.loc[r['indice']]).sum() / 100),
+                'Tamanho (KB)': round(r['bytes'] / 1024, 1),
+            } for i, r in enumerate(remessas, start=1)]), use_container_width=True, hide_index=True)
+            st.caption("Prévia: nenhum NSA reservado e nenhum título marcado como enviado.")
+        except (ValueError, RuntimeError) as e:
+            st.error(f"❌ {e}")
+    else:
+        # Uma remessa por conta de origem (Banco_Origem), cada arquivo com seu NSA, gravada em disco.
+        # Fica na sessão até o envio ser confirmado: gerar/baixar não marca título nenhum
+        pasta = tempfile.mkdtemp(prefix="remessas_")
+        try:
+            remessas = gerar_remessas_por_conta(
+                df_pagar_completo, pasta, max_registros_lote=max_registros_lote, max_bytes_arquivo=max_bytes_arquivo,
+            )
+            if len(remessas) == 1:
+                download = (remessas[0]['caminho'], remessas[0]['arquivo'], "text/plain")
+            else:
+                nome_zip = f"REMESSAS_{datetime.now().strftime('%d%m')}.zip"
+                download = (compactar_remessas(remessas, os.path.join(pasta, nome_zip)), nome_zip, "application/zip")
+            st.session_state['remessa_pendente'] = {'df': df_pagar_completo, 'remessas': remessas, 'pasta': pasta, 'download': download}
+        except (ValueError, RuntimeError, OSError) as e:
+            shutil.rmtree(pasta, ignore_errors=True)
+            st.error(f"❌ {e}")
+
+def _remessa_pendente(pendente):
+    remessas = pendente['remessas']
+    caminho_download, nome_download, mime_download = pendente['download']
+    nsas = ", ".join(f"{r['conta']} NSA {r['nsa']}" for r in remessas)
+    area_pendente = st.empty()
+    with area_pendente.container():
+        with open(caminho_download, "rb") as arquivo_download:
+            st.download_button(
+                label="📥 Baixar CNAB" if len(remessas) == 1 else f"📥 Baixar CNABs ({len(remessas)} arquivos)",
+                data=arquivo_download,
+                file_name=nome_download,
+                mime=mime_download
+            )
+        st.caption(f"Remessa gerada ({nsas}). Depois de enviar o arquivo ao banco, confirme o envio para esses títulos não entrarem de novo.")
+        confirmar = st.button("✅ Confirmar envio ao banco")
+    if confirmar:
+        qtd = confirmar_remessas(pendente['df'], remessas)
+        del st.session_state['remessa_pendente']
+        shutil.rmtree(pendente['pasta'], ignore_errors=True)
+        area_pendente.empty()
+        st.success(f"{qtd} título(s) marcados como enviados ({nsas}).")
+
+def painel_liberar_remessa():
+    # Remessa recusada pelo banco (ou confirmada por engano): os títulos voltam a poder ser enviados
+    with st.expander("↩️ Liberar remessa confirmada"):
+        emitidas = remessas_emitidas()
+        if emitidas.empty:
+            st.caption("Nenhuma remessa confirmada ainda.")
+        else:
+            escolhida = st.selectbox(
+                "Remessa",
+                emitidas.to_dict('records'),
+                format_func=lambda r: f"NSA {r['nsa']} ({r['conta']}) - {r['qtd_titulos']} título(s), confirmada em {pd.Timestamp(r['emitido_em']):%d/%m/%Y %H:%M}",
+            )
+            if st.button("Liberar títulos desta remessa"):
+                qtd = liberar_remessa(escolhida['nsa'], escolhida['conta'])
+                st.success(f"{qtd} título(s) da remessa NSA {escolhida['nsa']} liberados para reenvio.")
+
+def painel_protestos():
+    """Upload das certidões, tabela enchendo durante a leitura, conciliação com o Historico e a planilha."""
+    st.subheader("Conversor Inteligente de Certidões de Protesto")
+    st.markdown("Arraste um ou múltiplos arquivos em PDF enviados pelos cartórios para consolidar em uma única tabela.")
+
+    # Componente drag-and-drop de arquivos do Streamlit
+    arquivos_pdf = st.file_uploader("Selecione os PDFs de Protesto", type=["pdf"], accept_multiple_files=True, key="uploader_protestos")
+
+    if arquivos_pdf:
+        if st.button("📊 Processar PDFs e Estruturar Planilha", type="primary"):
+            with st.spinner("Escovando os bits dos PDFs de Protesto... Aguarde."):
+                # A tabela vai enchendo enquanto os PDFs são lidos: lote grande vai para o pool de
+                # processos (na ordem do upload), poucos arquivos saem página a página
+                tabela_parcial = st.empty()
+                registros_pdf, ultima_atualizacao = [], 0.0
+                for nome_pdf, registro, erro in extrair_protestos_em_fluxo(arquivos_pdf):
+                    # PDF ilegível não derruba o lote: avisa arquivo a arquivo e segue com os demais
+                    if erro:
+                        st.error(f"❌ {nome_pdf}: {erro}")
+                        continue
+                    registros_pdf.append(registro)
+                    if time.monotonic() - ultima_atualizacao > 0.5:
+                        tabela_parcial.dataframe(pd.DataFrame(registros_pdf), use_container_width=True, hide_index=True)
+                        ultima_atualizacao = time.monotonic()
+                tabela_parcial.empty()
+                df_protestos = pd.DataFrame(registros_pdf)
+
+                if not df_protestos.empty:
+                    st.success(f"Sucesso! {len(df_protestos)} registros de protesto identificados.")
+
+                    # Mostra os dados estruturados na tela para conferência rápida (altura menor para caber na aba)
+                    st.data_editor(df_protestos, use_container_width=True, hide_index=True, height=450)
+
+                    # Cada protesto ligado aos títulos candidatos do Historico (CNPJ, nº do título e valor)
+                    try:
+                        df_conciliacao = conciliar_protestos(df_protestos, carregar_indice_historico())
+                        sem_candidato = (df_conciliacao['Situação'] == 'sem candidato').sum()
+                        st.markdown(f"**Conciliação com o Histórico** — {len(df_protestos) - sem_candidato} de {len(df_protestos)} protestos com título candidato")
+                        st.dataframe(df_conciliacao, use_container_width=True, hide_index=True)
+                    except Exception as e:
+                        df_conciliacao = None
+                        st.warning(f"Conciliação com o Histórico indisponível: {e}")
+
+                    # Planilha gravada em streaming (modules/exportacao.py), sem montar a pasta inteira na memória
+                    planilhas = {'Protestos': df_protestos}
+                    if df_conciliacao is not None:
+                        planilhas['Conciliação'] = df_conciliacao
+
+                    st.write("")
+                    with exportar_arquivo(planilhas, 'xlsx') as processado_excel:
+                        st.download_button(
+                            label="📥 Baixar Planilha Consolidada para o Tasy (.xlsx)",
+                            data=processado_excel,
+                            file_name=f"Protestos_Processados_{datetime.now().strftime('%d%m')}.xlsx",
+                            mime=mime_exportacao('xlsx', planilhas)
+                        )
+                else:
+                    st.warning("Nenhum padrão de certidão de protesto reconhecível foi encontrado nesses arquivos.")
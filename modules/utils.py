@@ -1,3 +1,6 @@
+import re
+import codecs
+import numpy as np
 import pandas as pd
 import unicodedata
 
@@ -5,13 +8,92 @@ def formatar_real(valor):
     try: return f"R$ {valor:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
     except: return "R$ 0,00"
 
+# --- NORMALIZAÇÃO DE TEXTO PARA O CNAB (ASCII) ---
+# O banco só aceita ASCII nos campos alfanuméricos. Em vez de decompor caractere a caractere
+# com unicodedata, uma tabela do str.translate (montada uma vez na importação) leva todo o
+# Latin-1 e os extras do Windows-1252 (aspas curvas, travessão, €, Œ...) para o equivalente
+# ASCII num passe só. O que sobrar fora da tabela (raro: outro alfabeto, emoji) cai no
+# caminho lento e, se nem assim tiver equivalente, vira espaço.
+
+_ESPECIAIS_ASCII = {
+    'Æ': 'AE', 'æ': 'ae', 'Œ': 'OE', 'œ': 'oe', 'ß': 'ss', 'Ø': 'O', 'ø': 'o',
+    'Ð': 'D', 'ð': 'd', 'Þ': 'TH', 'þ': 'th', 'Ł': 'L', 'ł': 'l', 'ı': 'i',
+    '‘': "'", '’': "'", '‚': "'", '´': "'", '`': "'", '“': '"', '”': '"', '„': '"', '«': '"', '»': '"',
+    '–': '-', '—': '-', '‐': '-', '•': '-', '·': '.', '…': '...', '€': 'EUR', '×': 'x', '÷': '/',
+    '⁄': '/', '°': 'o', 'º': 'o', 'ª': 'a', '§': 'S', '¦': '|', '¨': '', '¯': '', '¸': '',
+    '\t': ' ', '\r': ' ', '\n': ' ', '\xa0': ' ',
+}
+
+def _ascii_equivalente(caractere):
+    if caractere in _ESPECIAIS_ASCII: return _ESPECIAIS_ASCII[caractere]
+    decomposto = ''.join(_ESPECIAIS_ASCII.get(c, c) for c in unicodedata.normalize('NFKD', caractere) if not unicodedata.combining(c))
+    if decomposto.isascii() and decomposto.isprintable(): return decomposto
+    return ' ' if caractere.isprintable() else ''
+
+def _montar_tabela_ascii():
+    caracteres = {chr(i) for i in range(0x20)} | {chr(i) for i in range(0x7F, 0x100)}
+    caracteres |= set(bytes(range(0x80, 0xA0)).decode('cp1252', errors='ignore'))
+    caracteres |= set(_ESPECIAIS_ASCII)
+    return str.maketrans({c: _ascii_equivalente(c) for c in caracteres})
+
+TABELA_ASCII = _montar_tabela_ascii()
+
+# Caminho da coluna inteira: os textos distintos são emendados num só e passam por um
+# bytes.translate (Latin-1 -> ASCII, 1 byte por 1 byte). Os poucos Latin-1 que viram mais de
+# uma letra (Æ, ß, ½...) são trocados antes; o que não cabe em Latin-1 é resolvido pelo
+# tratador de erro do encode, caractere a caractere.
+_SEPARADOR_LOTE = '\x1f'
+_LATIN1_MULTIPLOS = {chr(i): TABELA_ASCII[i] for i in range(0x100) if len(TABELA_ASCII.get(i, chr(i))) > 1}
+
+def _montar_tabela_bytes():
+    tabela, apagar = bytearray(range(0x100)), bytearray()
+    for i in range(0x100):
+        equivalente = TABELA_ASCII.get(i, chr(i))
+        if chr(i) == _SEPARADOR_LOTE: continue
+        if equivalente == '': apagar.append(i)
+        elif len(equivalente) == 1: tabela[i] = ord(equivalente)
+    return bytes(tabela), bytes(apagar)
+
+_TABELA_BYTES, _APAGAR_BYTES = _montar_tabela_bytes()
+
+def _erro_para_ascii(erro):
+    return ''.join(_ascii_equivalente(c) for c in erro.object[erro.start:erro.end]), erro.end
+
+codecs.register_error('cnab_ascii', _erro_para_ascii)
+
+def normalizar_texto(texto):
+    """Texto pronto para campo alfanumérico do CNAB: sem acento, sem quebra de linha, só ASCII."""
+    if not isinstance(texto, str): return ""
+    texto = texto.translate(TABELA_ASCII)
+    if texto.isascii(): return texto
+    return ''.join(c if c.isascii() else _ascii_equivalente(c) for c in texto)
+
+def normalizar_texto_serie(valores):
+    """
+    normalizar_texto para a coluna inteira (nomes, endereços...) de uma vez.
+    Vazios/NaN viram "". Devolve pd.Series de str (mesmo índice, quando vier uma Series).
+    """
+    textos = pd.Series(valores, dtype=object).fillna('').astype(str)
+    codigos, unicos = pd.factorize(textos, use_na_sentinel=False)
+    unicos = unicos.tolist()
+    emendado = _SEPARADOR_LOTE.join(unicos)
+    if emendado.count(_SEPARADOR_LOTE) != len(unicos) - 1:
+        traduzidos = [normalizar_texto(t) for t in unicos]  # separador dentro de algum texto
+    else:
+        for caractere, equivalente in _LATIN1_MULTIPLOS.items():
+            if caractere in emendado: emendado = emendado.replace(caractere, equivalente)
+        dados = emendado.encode('latin-1', errors='cnab_ascii').translate(_TABELA_BYTES, _APAGAR_BYTES)
+        traduzidos = dados.decode('ascii').split(_SEPARADOR_LOTE)
+    traduzidos = np.array(traduzidos, dtype=object)
+    return pd.Series(traduzidos[codigos] if len(codigos) else [], index=textos.index, dtype=object)
+
 def limpar_ids(valor):
     if pd.isna(valor) or str(valor).strip() == "": return ""
-    return "".join(filter(str.isalnum, str(valor).split('.')[0]))
+    return "".join(filter(str.isalnum, normalizar_texto(str(valor).split('.')[0])))
 
 def remover_acentos(texto):
     if not isinstance(texto, str): return ""
-    return "".join(c for c in unicodedata.normalize('NFD', texto) if unicodedata.category(c) != 'Mn').upper()
+    return normalizar_texto(texto).upper()
 
 def formatar_campo(texto, tamanho, preenchimento=' ', alinhar='l'):
     texto_str = remover_acentos(str(texto))
@@ -23,10 +105,91 @@ def formatar_campo(texto, tamanho, preenchimento=' ', alinhar='l'):
         res = texto_str[:tamanho].ljust(tamanho, preenchimento)
     return res[:tamanho]
 
-def identificar_tipo_pagamento(linha):
-    dado = str(linha.get('CHAVE_PIX_OU_COD_BARRAS', ''))
-    dado_limpo = "".join(filter(str.isdigit, dado))
-    if len(dado_limpo) >= 44:
-        return 'BOLETO'
-    else:
-        return 'PIX'
+# --- DINHEIRO EM CENTAVOS (INT64) ---
+# Valores trafegam como inteiros de centavos desde a carga da planilha: soma de lote e
+# trailer são somas inteiras exatas e o campo do CNAB é só o inteiro com zeros à esquerda.
+
+# Campo de valor do CNAB: 15 dígitos. Acima disso (ou inf/nan) a célula é ilegível e vira 0,
+# que a pré-validação barra como valor ausente
+MAXIMO_CENTAVOS = 10 ** 15 - 1
+_RE_MILHAR = re.compile(r'\.(?=.*,)')
+
+def para_centavos(valores):
+    """
+    Converte uma coluna de valores (número, '1234.56', '1234,56' ou '1.234,56') para int64 em
+    centavos, com arredondamento comercial (meio centavo para cima). Vazio/ilegível/fora do
+    campo do CNAB vira 0.
+    """
+    texto = pd.Series(valores, dtype=object).fillna('').astype(str).str.strip()
+    # Com vírgula decimal, os pontos são de milhar
+    texto = texto.str.replace(_RE_MILHAR, '', regex=True).str.replace(',', '.', regex=False)
+    reais = pd.to_numeric(texto, errors='coerce').to_numpy(dtype=float, na_value=0.0)
+    # round(..., 6) tira o ruído binário antes do meio centavo (1.005 * 100 = 100.49999...)
+    brutos = np.floor(np.round(reais * 100, 6) + 0.5)
+    validos = np.isfinite(brutos) & (np.abs(brutos) <= MAXIMO_CENTAVOS)
+    return np.where(validos, brutos, 0).astype(np.int64)
+
+def centavos(valor):
+    """Versão escalar do para_centavos (caminho por linha, sem montar Series)."""
+    texto = _RE_MILHAR.sub('', str(valor).strip()).replace(',', '.')
+    # float() aceita '1_000', o pd.to_numeric não
+    try: reais = float(texto) if '_' not in texto else np.nan
+    except ValueError: return 0
+    if not np.isfinite(reais): return 0
+    resultado = int(np.floor(np.round(reais * 100, 6) + 0.5))
+    return resultado if abs(resultado) <= MAXIMO_CENTAVOS else 0
+
+def formatar_centavos(valores_centavos, tamanho):
+    """Centavos -> campo numérico do CNAB (zeros à esquerda), para a coluna inteira."""
+    return pd.Series(np.asarray(valores_centavos, dtype=np.int64)).astype(str).str.zfill(tamanho).astype(object)
+
+def centavos_para_reais(valores_centavos):
+    return np.asarray(valores_centavos, dtype=np.int64) / 100
+
+# --- CLASSIFICAÇÃO EM LOTE (COLUNA INTEIRA) ---
+
+RE_PREFIXO_TELEFONE = re.compile(r'^[(+]')
+
+def _so_digitos(valor):
+    s_val = str(valor).strip()
+    if s_val.endswith('.0'): s_val = s_val[:-2]
+    return ''.join(filter(str.isdigit, s_val))
+
+def limpar_numero_serie(valores):
+    """Versão colunar do limpar_numero: remove o '.0' final e tudo que não é dígito, de uma vez."""
+    serie = pd.Series(valores, dtype=object).fillna('').astype(str).str.strip()
+    limpos = serie.str.replace(r'\.0$', '', regex=True).str.replace(r'[^0-9]', '', regex=True)
+    # str.isdigit aceita dígitos fora do ASCII (ex.: '²'); esses casos raros seguem pelo caminho original
+    fora_ascii = ~serie.str.isascii()
+    if fora_ascii.any():
+        limpos[fora_ascii] = [_so_digitos(v) for v in serie[fora_ascii]]
+    return limpos.tolist()
+
+def classificar_chaves_pagamento(valores):
+    """
+    Classifica a coluna CHAVE_PIX_OU_COD_BARRAS inteira de uma vez.
+    Retorna um DataFrame (mesmo índice) com:
+      - tipo_pagamento: 'BOLETO' (44+ dígitos) ou 'PIX'
+      - tipo_chave_pix: código do segmento B (001 telefone, 002 e-mail, 003 CPF/CNPJ,
+        004 aleatória, 005 dados bancários), mesma regra do detectar_tipo_chave_pix_interno
+    """
+    indice = valores.index if isinstance(valores, pd.Series) else None
+    # Vazio/NaN cai em dados bancários (005), como o 'nan' do str() no caminho por linha
+    chaves = pd.Series(valores, dtype=object).fillna('').astype(str).str.strip().reset_index(drop=True)
+    tamanhos = np.fromiter(map(len, limpar_numero_serie(chaves)), dtype=np.int64, count=len(chaves))
+
+    vazia = (chaves == '') | chaves.str.lower().isin(['nan', 'none'])
+    email = chaves.str.contains('@', regex=False)
+    aleatoria = (chaves.str.len() > 30) & chaves.str.contains('-', regex=False)
+    telefone_formatado = chaves.str.contains(RE_PREFIXO_TELEFONE)
+
+    tipo_chave = np.select(
+        [vazia.to_numpy(), email.to_numpy(), aleatoria.to_numpy(),
+         (tamanhos == 11) & telefone_formatado.to_numpy(), tamanhos == 11, tamanhos == 14],
+        ['005', '002', '004', '001', '003', '003'],
+        default='001',
+    )
+    return pd.DataFrame({
+        'tipo_pagamento': np.where(tamanhos >= 44, 'BOLETO', 'PIX'),
+        'tipo_chave_pix': tipo_chave,
+    }, index=indice)
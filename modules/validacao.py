@@ -0,0 +1,195 @@
+import re
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from modules.cnab_engine import (
+    resolver_coluna, classificar_lote_colunar, _mapear_unicos, centavos_colunar, _chave_pix_limpa,
+    converter_codigos_barras_lote, chaves_pagamento_colunar,
+)
+from modules.pagamentos_emitidos import consultar_pagamentos
+from modules.utils import limpar_numero_serie, classificar_chaves_pagamento
+from modules.codigo_barras import matriz_digitos
+
+# =============================================================================
+# PRÉ-VALIDAÇÃO DO LOTE DE PAGAMENTOS (ANTES DE GERAR O CNAB)
+# =============================================================================
+# O motor de remessa não recusa nada: código de barras torto vira zeros à esquerda,
+# documento em branco vira "00000000000"... e o problema só aparece no retorno do banco.
+# Aqui o DataFrame inteiro é conferido de uma vez (matrizes de dígitos em numpy),
+# devolvendo uma tabela com um erro por linha/campo.
+
+COLUNAS_ERRO = ['linha', 'tipo', 'campo', 'erro']
+DIAS_MAXIMO_AGENDAMENTO = 365
+
+RE_EMAIL = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+RE_CHAVE_ALEATORIA = re.compile(r'^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$')
+
+# --- CPF / CNPJ EM LOTE ---
+
+def _cpfs_validos(matriz):
+    d = matriz.astype(np.int64)
+    dv1 = (d[:, :9] * np.arange(10, 1, -1)).sum(axis=1) * 10 % 11 % 10
+    dv2 = (np.concatenate([d[:, :9], dv1[:, None]], axis=1) * np.arange(11, 1, -1)).sum(axis=1) * 10 % 11 % 10
+    repetidos = (d == d[:, :1]).all(axis=1)
+    return (dv1 == d[:, 9]) & (dv2 == d[:, 10]) & ~repetidos
+
+def _cnpjs_validos(matriz):
+    d = matriz.astype(np.int64)
+    pesos = np.array([6, 5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2])
+    r1 = (d[:, :12] * pesos[1:]).sum(axis=1) % 11
+    dv1 = np.where(r1 < 2, 0, 11 - r1)
+    r2 = (np.concatenate([d[:, :12], dv1[:, None]], axis=1) * pesos).sum(axis=1) % 11
+    dv2 = np.where(r2 < 2, 0, 11 - r2)
+    repetidos = (d == d[:, :1]).all(axis=1)
+    return (dv1 == d[:, 12]) & (dv2 == d[:, 13]) & ~repetidos
+
+def validar_documentos(digitos):
+    """
+    Máscara de CPF/CNPJ válidos. Segue a regra do motor (até 11 dígitos = CPF, senão CNPJ),
+    completando com zeros à esquerda como o campo do CNAB faz (CPF que o Excel comeu o zero).
+    """
+    digitos = pd.Series(digitos, dtype=object).astype(str)
+    tamanhos = digitos.str.len().to_numpy()
+    ok = np.zeros(len(digitos), dtype=bool)
+    cpf = (tamanhos > 0) & (tamanhos <= 11)
+    cnpj = (tamanhos > 11) & (tamanhos <= 14)
+    if cpf.any(): ok[cpf] = _cpfs_validos(matriz_digitos(digitos[cpf].str.zfill(11).tolist(), 11))
+    if cnpj.any(): ok[cnpj] = _cnpjs_validos(matriz_digitos(digitos[cnpj].str.zfill(14).tolist(), 14))
+    return ok
+
+# --- VALIDAÇÃO DO LOTE ---
+
+def _datas_pagamento(df_pagamentos):
+    brutas = pd.Series(resolver_coluna(df_pagamentos, ['DATA_PAGAMENTO', 'DATA']), dtype=object).astype(str).str.strip()
+    return brutas, pd.to_datetime(brutas, format='%d/%m/%Y', errors='coerce')
+
+def _erros(mascara, indice, tipos, campo, mensagem):
+    posicoes = np.flatnonzero(mascara)
+    return pd.DataFrame({
+        '_pos': posicoes, 'linha': indice[posicoes], 'tipo': tipos[posicoes], 'campo': campo, 'erro': mensagem,
+    })
+
+def _mascara_chave_pix(chaves, tipos_chave, docs_chave, bancos, agencias, contas):
+    """Devolve {mensagem: máscara de erro} conferindo o formato da chave conforme o tipo detectado."""
+    tamanhos = docs_chave.str.len().to_numpy()
+    email = tipos_chave == '002'
+    aleatoria = tipos_chave == '004'
+    documento = tipos_chave == '003'
+    telefone = tipos_chave == '001'
+    bancaria = tipos_chave == '005'
+    return {
+        "Chave PIX de e-mail mal formada": email & ~chaves.str.fullmatch(RE_EMAIL).to_numpy(dtype=bool),
+        "Chave PIX aleatória fora do padrão (UUID)": aleatoria & ~chaves.str.fullmatch(RE_CHAVE_ALEATORIA).to_numpy(dtype=bool),
+        "Chave PIX CPF/CNPJ com dígito verificador inválido": documento & ~validar_documentos(docs_chave),
+        "Chave PIX de telefone com quantidade de dígitos inválida": telefone & ((tamanhos < 10) | (tamanhos > 13)),
+        "PIX sem chave e sem dados bancários completos (banco/agência/conta)": bancaria & (
+            (bancos.str.strip('0') == '').to_numpy() | (agencias.str.strip('0') == '').to_numpy() | (contas.str.strip('0') == '').to_numpy()
+        ),
+    }
+
+def _erros_duplicidade(chaves, indice, tipos):
+    # Mesmo título repetido no lote ou já levado por uma remessa anterior (índice de emitidos)
+    chaves = chaves.reset_index(drop=True)
+    erros = [_erros(chaves.duplicated().to_numpy(), indice, tipos, 'CHAVE_PIX_OU_COD_BARRAS', "Título repetido neste lote")]
+
+    emitidos = consultar_pagamentos(chaves)
+    if not emitidos.empty:
+        por_chave = emitidos.set_index('chave')
+        achados = chaves.isin(por_chave.index).to_numpy()
+        detalhes = por_chave.loc[chaves[achados]]
+        mensagens = [
+            f"Já enviado na remessa NSA {nsa} ({conta}) em {pd.Timestamp(quando):%d/%m/%Y}"
+            for nsa, conta, quando in zip(detalhes['nsa'], detalhes['conta'], detalhes['emitido_em'])
+        ]
+        erros.append(_erros(achados, indice, tipos, 'CHAVE_PIX_OU_COD_BARRAS', mensagens))
+    return erros
+
+def validar_pagamentos(df_pagamentos, hoje=None, checar_emitidos=True):
+    """
+    Pré-validação do lote inteiro antes do gerar_cnab_remessa.
+    Retorna um DataFrame (linha, tipo, campo, erro) com um registro por problema encontrado;
+    vazio quando o lote está pronto para o banco. 'linha' é o índice da linha no DataFrame.
+    checar_emitidos=True também barra títulos repetidos ou já enviados em remessa anterior.
+    """
+    if df_pagamentos.empty: return pd.DataFrame(columns=COLUNAS_ERRO)
+    hoje = pd.Timestamp((hoje or datetime.now()).date())
+    indice = df_pagamentos.index.to_numpy()
+
+    # Limpeza, conversão e DVs dos códigos num passe só (mesma rotina que o motor usa para classificar)
+    codigos, barras, codigos_validos = converter_codigos_barras_lote(
+        resolver_coluna(df_pagamentos, ['CHAVE_PIX_OU_COD_BARRAS', 'COD_BARRAS', 'CHAVE_PIX'])
+    )
+    boleto = classificar_lote_colunar(df_pagamentos, codigos)
+    tipos = np.where(boleto, 'BOLETO', 'PIX')
+    erros = []
+
+    # Valor (centavos): o motor troca valor ilegível por 0 sem avisar
+    valores = centavos_colunar(df_pagamentos)
+    erros.append(_erros(~(valores > 0), indice, tipos, 'VALOR_PAGAMENTO', "Valor ausente, zerado ou negativo"))
+
+    # Data: fora do dd/mm/aaaa o motor usa a data do arquivo. Data no passado não barra: a coluna
+    # é o vencimento original e título vencido também é pago (vira aviso, no avisos_pagamentos)
+    datas_brutas, datas = _datas_pagamento(df_pagamentos)
+    preenchida = (datas_brutas != '').to_numpy()
+    sem_data = datas.isna().to_numpy()
+    erros.append(_erros(preenchida & sem_data, indice, tipos, 'DATA_PAGAMENTO', "Data ilegível (esperado dd/mm/aaaa); seria trocada pela data do arquivo"))
+    limite = hoje + timedelta(days=DIAS_MAXIMO_AGENDAMENTO)
+    erros.append(_erros(~sem_data & (datas > limite).to_numpy(), indice, tipos, 'DATA_PAGAMENTO', f"Data de pagamento a mais de {DIAS_MAXIMO_AGENDAMENTO} dias"))
+
+    # Documento do favorecido (J52 / segmento B): em branco viraria "00000000000"
+    docs = pd.Series(limpar_numero_serie(resolver_coluna(df_pagamentos, ['cnpj_beneficiario', 'CNPJ'])), dtype=object)
+    tam_docs = docs.str.len().to_numpy()
+    erros.append(_erros(tam_docs == 0, indice, tipos, 'cnpj_beneficiario', "CPF/CNPJ do favorecido ausente"))
+    erros.append(_erros(tam_docs > 14, indice, tipos, 'cnpj_beneficiario', "CPF/CNPJ do favorecido com mais de 14 dígitos"))
+    erros.append(_erros((tam_docs > 0) & (tam_docs <= 14) & ~validar_documentos(docs), indice, tipos, 'cnpj_beneficiario', "CPF/CNPJ do favorecido com dígito verificador inválido"))
+
+    # Boletos: tamanho e DVs (o motor cortaria/preencheria para 44 sem conferir)
+    tam_cod = pd.Series(codigos, dtype=object).str.len().to_numpy()
+    tamanho_ok = np.isin(tam_cod, (44, 47, 48))
+    erros.append(_erros(boleto & ~tamanho_ok, indice, tipos, 'CHAVE_PIX_OU_COD_BARRAS', "Código de barras/linha digitável com quantidade de dígitos inválida (esperado 44, 47 ou 48)"))
+    erros.append(_erros(boleto & tamanho_ok & ~codigos_validos, indice, tipos, 'CHAVE_PIX_OU_COD_BARRAS', "Código de barras/linha digitável com dígito verificador inválido"))
+
+    # PIX: formato da chave conforme o tipo que o motor vai declarar no segmento B, só nas
+    # linhas PIX (a chave limpa também entra na chave de duplicidade do título)
+    pix = ~boleto
+    chaves = np.full(len(df_pagamentos), '', dtype=object)
+    if pix.any():
+        df_pix = df_pagamentos[pix]
+        chaves_pix = pd.Series(_mapear_unicos(resolver_coluna(df_pix, ['CHAVE_PIX_OU_COD_BARRAS', 'CHAVE_PIX', 'CHAVE']), _chave_pix_limpa), dtype=object)
+        chaves[pix] = chaves_pix.to_numpy()
+        tipos_chave = classificar_chaves_pagamento(chaves_pix)['tipo_chave_pix'].to_numpy()
+        mascaras = _mascara_chave_pix(
+            chaves_pix, tipos_chave, pd.Series(limpar_numero_serie(chaves_pix), dtype=object),
+            pd.Series(limpar_numero_serie(resolver_coluna(df_pix, ['BANCO_FAVORECIDO', 'BANCO'])), dtype=object),
+            pd.Series(limpar_numero_serie(resolver_coluna(df_pix, ['AGENCIA_FAVORECIDA', 'AGENCIA'])), dtype=object),
+            pd.Series(limpar_numero_serie(resolver_coluna(df_pix, ['CONTA_FAVORECIDA', 'CONTA'])), dtype=object),
+        )
+        for mensagem, mascara in mascaras.items():
+            linhas = np.zeros(len(df_pagamentos), dtype=bool)
+            linhas[pix] = mascara
+            erros.append(_erros(linhas, indice, tipos, 'CHAVE_PIX_OU_COD_BARRAS', mensagem))
+
+    if checar_emitidos:
+        # Conversões já feitas acima: a chave de cada título sai sem refazer códigos e valores
+        chaves_titulos = chaves_pagamento_colunar(df_pagamentos, barras=barras, boleto=boleto, valores=valores, chaves_pix=chaves)
+        erros.extend(_erros_duplicidade(chaves_titulos, indice, tipos))
+
+    # Ordem das linhas no lote, mantendo a ordem das checagens dentro de cada linha
+    resultado = pd.concat(erros, ignore_index=True).sort_values('_pos', kind='stable')
+    return resultado[COLUNAS_ERRO].reset_index(drop=True)
+
+def avisos_pagamentos(df_pagamentos, hoje=None):
+    """
+    O que não barra a remessa mas merece um olho antes de enviar, no mesmo formato do
+    validar_pagamentos: hoje, título com a data (vencimento original) já passada, que sai
+    no arquivo com essa data.
+    """
+    if df_pagamentos.empty: return pd.DataFrame(columns=COLUNAS_ERRO)
+    hoje = pd.Timestamp((hoje or datetime.now()).date())
+    indice = df_pagamentos.index.to_numpy()
+    _, datas = _datas_pagamento(df_pagamentos)
+    tipos = np.where(classificar_lote_colunar(df_pagamentos), 'BOLETO', 'PIX')
+    vencidos = _erros((datas < hoje).to_numpy(), indice, tipos, 'DATA_PAGAMENTO', "Vencimento já passou: confira se o banco aceita o pagamento com essa data")
+    return vencidos[COLUNAS_ERRO].reset_index(drop=True)
@@ -2,15 +2,13 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import plotly.graph_objects as go
-import io  # <--- Adicionado para manipulação de bytes na memória para download
 from datetime import datetime, timedelta
 from database import conectar_sheets
 
 # --- IMPORTAÇÃO SEGURA ---
 try:
-    from modules.utils import formatar_real, identificar_tipo_pagamento
-    # 🔴 EVOLUÇÃO: Importando a função do motor do cnab_engine atualizado
-    from modules.cnab_engine import gerar_cnab_pix, extrair_dados_protesto_pdf 
+    from modules.utils import formatar_real, classificar_chaves_pagamento, para_centavos
+    from modules.ui_cockpit import painel_remessa, painel_liberar_remessa, painel_protestos
 except ImportError as e:
     st.error(f"Erro crítico nos módulos: {e}")
     st.stop()
@@ -70,7 +68,9 @@ def carregar_dados_reais():
         df['Pagar?'] = df['Pagar?'].astype(bool)
         
         if 'VALOR_PAGAMENTO' in df.columns:
-            df['VALOR_PAGAMENTO'] = pd.to_numeric(df['VALOR_PAGAMENTO'].astype(str).str.replace(',', '.'), errors='coerce').fillna(0.0)
+            # Dinheiro em centavos inteiros desde a carga; VALOR_PAGAMENTO em reais fica só para exibição
+            df['VALOR_CENTAVOS'] = para_centavos(df['VALOR_PAGAMENTO'])
+            df['VALOR_PAGAMENTO'] = df['VALOR_CENTAVOS'] / 100
         
         # Mockups de colunas faltantes para bater com a imagem
         if 'Categoria' not in df.columns: df['Categoria'] = 'Estoque Medicamentos'
@@ -79,6 +79,10 @@ def carregar_dados_reais():
         if 'Observação' not in df.columns: df['Observação'] = '-x-'
         if 'Banco_Origem' not in df.columns: df['Banco_Origem'] = 'Unicred - C.C'
         
+        # Roteamento BOLETO/PIX da planilha inteira de uma vez (mesma regra do motor CNAB)
+        if 'CHAVE_PIX_OU_COD_BARRAS' in df.columns:
+            df['Tipo'] = classificar_chaves_pagamento(df['CHAVE_PIX_OU_COD_BARRAS'])['tipo_pagamento']
+        
         return df
     except Exception as e:
         st.error(f"Erro ao carregar Sheets: {e}")
@@ -89,7 +93,7 @@ df_real = carregar_dados_reais()
 # ==============================================================================
 # 3. MÓDULO DE KPIs SUPERIORES
 # ==============================================================================
-total_saidas = df_real['VALOR_PAGAMENTO'].sum() if not df_real.empty else 457590.90
+total_saidas = df_real['VALOR_CENTAVOS'].sum() / 100 if not df_real.empty and 'VALOR_CENTAVOS' in df_real.columns else 457590.90
 saldo_disponivel = 957590.90
 saldo_resgate = 20457590.90
 saldo_final = saldo_disponivel - total_saidas
@@ -130,7 +134,7 @@ with col_left:
     
     with tab1:
         if not df_real.empty:
-            colunas_visuais = ['Pagar?', 'NOME_FAVORECIDO', 'Categoria', 'OC', 'NF', 'Observação', 'DATA_PAGAMENTO', 'VALOR_PAGAMENTO', 'Banco_Origem', 'CHAVE_PIX_OU_COD_BARRAS', 'cnpj_beneficiario']
+            colunas_visuais = ['Pagar?', 'NOME_FAVORECIDO', 'Categoria', 'OC', 'NF', 'Observação', 'DATA_PAGAMENTO', 'VALOR_PAGAMENTO', 'Tipo', 'Banco_Origem', 'CHAVE_PIX_OU_COD_BARRAS', 'cnpj_beneficiario']
             for col in colunas_visuais:
                 if col not in df_real.columns: df_real[col] = ""
                 
@@ -147,6 +151,7 @@ with col_left:
                     "NOME_FAVORECIDO": "Pagamento",
                     "DATA_PAGAMENTO": "Venc. original",
                     "VALOR_PAGAMENTO": st.column_config.NumberColumn("Valor", format="R$ %.2f"),
+                    "Tipo": "Tipo",
                     "Banco_Origem": "Banco",
                     "CHAVE_PIX_OU_COD_BARRAS": None, 
                     "cnpj_beneficiario": None
@@ -158,66 +163,18 @@ with col_left:
             # --- CORREÇÃO DEFINITIVA DO MATCH DE ÍNDICE ---
             linhas_selecionadas = edited_df[edited_df['Pagar?'] == True].index
             
-            if st.button("🚀 Gerar Arquivo de Remessa (CNAB 240)", type="primary"):
-                if len(linhas_selecionadas) > 0:
-                    df_pagar_completo = df_real.loc[linhas_selecionadas].copy()
-                    
-                    # BALA DE PRATA: Força o arredondamento comercial NA HORA DO CLIQUE, ignorando o cache
-                    df_pagar_completo['VALOR_PAGAMENTO'] = np.floor(df_pagar_completo['VALOR_PAGAMENTO'] * 100 + 0.5) / 100
-                    
-                    arquivo_cnab = gerar_cnab_pix(df_pagar_completo)
-                    
-                    if arquivo_cnab:
-                        st.download_button(
-                            label="📥 Baixar CNAB", 
-                            data=arquivo_cnab, 
-                            file_name=f"REM_{datetime.now().strftime('%d%m')}.txt",
-                            mime="text/plain"
-                        )
-                else:
-                    st.warning("Nenhum título selecionado para pagamento.")
+            painel_remessa(df_real, linhas_selecionadas)
         else:
             st.info("Nenhum dado encontrado na planilha.")
 
+        painel_liberar_remessa()
+
     with tab2:
         st.info("Aqui entrará a query direta do banco de dados do Tasy listando os títulos vencidos.")
 
     # 🔴 INTERFACE DA NOVA FUNCIONALIDADE: Conversor de PDFs de Protesto
     with tab3:
-        st.subheader("Conversor Inteligente de Certidões de Protesto")
-        st.markdown("Arraste e solte uma ou múltiplas certidões em PDF recebidas dos cartórios para estruturar em uma planilha limpa para a Controladoria.")
-        
-        # Uploader múltiplo de arquivos em memória
-        arquivos_pdf = st.file_uploader("Selecione os PDFs de Protesto", type=["pdf"], accept_multiple_files=True, key="uploader_protestos")
-        
-        if arquivos_pdf:
-            st.write("")
-            if st.button("📊 Processar PDFs e Estruturar Planilha", type="primary"):
-                with st.spinner("Escovando os bits dos arquivos PDF... Aguarde."):
-                    # Executa a inteligência de regexes que adicionamos ao cnab_engine
-                    df_protestos = extrair_dados_protesto_pdf(arquivos_pdf)
-                    
-                    if not df_protestos.empty:
-                        st.success(f"Sucesso! {len(df_protestos)} registros de protesto identificados de forma estruturada.")
-                        
-                        # Mostra a prévia da tabela na tela respeitando o design do painel (altura menor para caber na aba)
-                        st.data_editor(df_protestos, use_container_width=True, hide_index=True, height=450)
-                        
-                        # Processamento do arquivo Excel direto no buffer binário da memória
-                        output = io.BytesIO()
-                        with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-                            df_protestos.to_excel(writer, index=False, sheet_name='Protestos')
-                        processado_excel = output.getvalue()
-                        
-                        st.write("")
-                        st.download_button(
-                            label="📥 Baixar Planilha Pronta para Auditoria (.xlsx)",
-                            data=processado_excel,
-                            file_name=f"Protestos_Processados_{datetime.now().strftime('%d%m')}.xlsx",
-                            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                        )
-                    else:
-                        st.warning("Nenhuma estrutura padrão de bloco de protesto foi reconhecida nos PDFs enviados.")
+        painel_protestos()
 
 # --- DIREITA: GRÁFICOS ALINHADOS À REALIDADE DO HOSPITAL ---
 with col_right:
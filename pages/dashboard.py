@@ -4,6 +4,7 @@ import plotly.express as px
 import plotly.graph_objects as go
 from database import conectar_sheets
 from modules.utils import formatar_real
+from modules.exportacao import FORMATOS_EXPORTACAO, exportar_bytes, nome_exportacao, mime_exportacao
 
 # --- PALETA CORPORATE FINTECH ---
 COR_AZUL_BASE = "#2c3e50" 
@@ -52,6 +53,27 @@ def mostrar_grafico_completo(df_futuro):
     fig.update_layout(xaxis=dict(tickformat="%d/%m", dtick="D1"), yaxis=dict(range=[0, max_val * 1.2]), showlegend=False, margin=dict(r=20, t=20))
     st.plotly_chart(fig, use_container_width=True)
 
+# --- RELATÓRIOS (TELA E EXPORTAÇÃO) ---
+def ranking_fornecedores(df_vencidos):
+    return df_vencidos.groupby('Beneficiario').agg(
+        Total_Divida=('Saldo_Limpo', 'sum'),
+        Dias_Medio_Atraso=('Dias_Atraso', 'mean'),
+        Qtd_Titulos=('Saldo_Limpo', 'count')
+    ).reset_index().sort_values('Total_Divida', ascending=False)
+
+def resumo_ageing(df_full):
+    df_ag = df_full.groupby('Faixa_Ageing').agg(Saldo_Limpo=('Saldo_Limpo', 'sum'), Qtd_Titulos=('Saldo_Limpo', 'count'))
+    return df_ag.reindex([f for f in MAPA_CORES_AGEING if f in df_ag.index]).reset_index()
+
+def relatorio_divida(df_full):
+    """Abas do relatório exportado: ranking dos vencidos, ageing e a base de títulos da última carga."""
+    colunas_titulos = ['Beneficiario', 'Nr. Titulo', 'Carteira', 'Vencimento_DT', 'Saldo_Limpo', 'Dias_Atraso', 'Faixa_Ageing', 'Status_Tempo']
+    return {
+        'Ranking Fornecedores': ranking_fornecedores(df_full[df_full['Status_Tempo'] == "🚨 Vencido"]),
+        'Ageing': resumo_ageing(df_full),
+        'Títulos': df_full[[c for c in colunas_titulos if c in df_full.columns]],
+    }
+
 # --- FUNÇÃO TABELA ---
 def exibir_tabela_detalhada(df_filtrado, titulo_contexto):
     if not df_filtrado.empty:
@@ -153,7 +175,7 @@ try:
         with c_r:
             st.subheader("⏳ Ageing List (Por Valor)")
             st.caption("🖱️ Clique na barra para detalhes.")
-            df_ag = df_full.groupby('Faixa_Ageing')['Saldo_Limpo'].sum().reset_index().sort_values('Saldo_Limpo')
+            df_ag = resumo_ageing(df_full).sort_values('Saldo_Limpo')
             fig_ag = px.bar(df_ag, x='Saldo_Limpo', y='Faixa_Ageing', orientation='h', text_auto='.2s', color='Faixa_Ageing', color_discrete_map=MAPA_CORES_AGEING)
             fig_ag.update_traces(selected=dict(marker=dict(opacity=1)), unselected=dict(marker=dict(opacity=1)), marker_line_width=0)
             fig_ag.update_layout(showlegend=False, xaxis_title=None, yaxis_title=None, plot_bgcolor="rgba(0,0,0,0)", clickmode="event+select", dragmode=False, xaxis=dict(showgrid=True, gridcolor='#ecf0f1'))
@@ -168,14 +190,8 @@ try:
         df_vencidos = df_full[df_full['Status_Tempo'] == "🚨 Vencido"].copy()
         
         if not df_vencidos.empty:
-            df_ofensores = df_vencidos.groupby('Beneficiario').agg(
-                Total_Divida=('Saldo_Limpo', 'sum'),
-                Dias_Medio_Atraso=('Dias_Atraso', 'mean'),
-                Qtd_Titulos=('Saldo_Limpo', 'count')
-            ).reset_index()
-            
             # Ordena do Maior para Menor
-            df_ranking_final = df_ofensores.sort_values('Total_Divida', ascending=False)
+            df_ranking_final = ranking_fornecedores(df_vencidos)
             
             # CRIA COLUNA DE TEXTO JÁ FORMATADA (Truque para exibir R$ 320.000,00)
             df_ranking_final['Valor_Visual'] = df_ranking_final['Total_Divida'].apply(formatar_real)
@@ -208,6 +224,26 @@ try:
         else:
             st.success("✅ Parabéns! Não há títulos vencidos na base.")
 
+        st.divider()
+
+        # --- EXPORTAÇÃO DO RELATÓRIO ---
+        # O arquivo só é gerado no clique (data como função) e em streaming: base de centenas de
+        # milhares de títulos não pesa a cada rerun da página nem infla a memória do processo
+        st.subheader("📤 Exportar Relatório")
+        relatorio = relatorio_divida(df_full)
+        c_fmt, c_btn = st.columns([0.3, 0.7])
+        with c_fmt:
+            formato = st.selectbox("Formato", list(FORMATOS_EXPORTACAO), format_func=lambda f: {'xlsx': 'Excel (.xlsx)', 'csv': 'CSV (mais rápido)', 'parquet': 'Parquet (mais rápido)'}[f])
+        with c_btn:
+            st.write("")
+            st.download_button(
+                label=f"📥 Baixar Ranking, Ageing e {len(df_full)} títulos",
+                data=lambda: exportar_bytes(relatorio, formato),
+                file_name=nome_exportacao(f"Divida_Fornecedores_{hoje.strftime('%d%m')}", formato, relatorio),
+                mime=mime_exportacao(formato, relatorio),
+                on_click="ignore"
+            )
+
     else:
         st.info("📭 A base de histórico está vazia.")
 
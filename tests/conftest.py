@@ -0,0 +1,18 @@
+import os
+import sys
+
+import pytest
+
+# Os testes importam como o app, a partir da raiz do projeto
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules import nsa, pagamentos_emitidos, cnab_engine  # noqa: E402
+
+@pytest.fixture(autouse=True)
+def bancos_temporarios(tmp_path, monkeypatch):
+    """Controle de NSA e índice de emitidos num SQLite descartável por teste, com o cache de segmentos zerado."""
+    monkeypatch.setattr(nsa, 'CAMINHO_BANCO_NSA', str(tmp_path / 'nsa.sqlite3'))
+    monkeypatch.setattr(pagamentos_emitidos, 'CAMINHO_BANCO_EMITIDOS', str(tmp_path / 'emitidos.sqlite3'))
+    # O nsa_counter.txt legado é lido da pasta atual
+    monkeypatch.chdir(tmp_path)
+    cnab_engine.limpar_cache_segmentos()
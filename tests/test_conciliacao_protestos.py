@@ -0,0 +1,41 @@
+import pandas as pd
+
+from modules.conciliacao_protestos import conciliar_protestos
+
+
+def _protesto(cnpj, valor, titulo):
+    return pd.DataFrame([{
+        'Protocolo': '123456', 'Cartório/Arquivo': 'certidao.pdf', 'Credor/Sacador': 'FORNECEDOR LTDA',
+        'CNPJ/CPF Credor': cnpj, 'Valor/Saldo': valor, 'Título/Número': titulo,
+    }])
+
+def test_documento_vazio_nao_conta_como_mesmo_credor():
+    historico = pd.DataFrame({
+        'Beneficiario': ['OUTRO FORNECEDOR', 'FORNECEDOR LTDA'],
+        'CNPJ': ['', '11.222.333/0001-81'],
+        'Nr. Titulo': ['NF-555', 'NF-555'],
+        'Saldo Atual': ['9.999,00', '100,00'],
+    })
+    resultado = conciliar_protestos(_protesto('-', 'R$ 100,00', 'NF-555'), historico)
+
+    assert resultado['Linha Histórico'].tolist() == [1]
+    assert resultado['Situação'].tolist() == ['único']
+    assert resultado['Critério'].tolist() == ['título + valor']
+
+def test_mesmo_documento_com_titulo_ou_valor():
+    historico = pd.DataFrame({
+        'CNPJ': ['11222333000181', '11222333000262', '99888777000166'],
+        'Nr. Titulo': ['000555', '777', '555'],
+        'Saldo Atual': [50.0, 100.0, 3000.0],
+    })
+    resultado = conciliar_protestos(_protesto('11.222.333/0001-81', 'R$ 100,00', 'NF-555'), historico)
+
+    # Com o CNPJ exato no Historico a filial (raiz) nem entra; o título solto de outro credor fica de fora
+    assert resultado['Linha Histórico'].tolist() == [0]
+    assert resultado['Critério'].tolist() == ['CNPJ/CPF + título']
+
+def test_protesto_sem_candidato():
+    historico = pd.DataFrame({'CNPJ': ['99888777000166'], 'Nr. Titulo': ['1'], 'Saldo Atual': [10.0]})
+    resultado = conciliar_protestos(_protesto('-', 'R$ 100,00', 'NF-555'), historico)
+    assert resultado['Situação'].tolist() == ['sem candidato']
+    assert resultado['Linha Histórico'].tolist() == [None]
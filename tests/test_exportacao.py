@@ -0,0 +1,51 @@
+import io
+import zipfile
+
+import openpyxl
+import pandas as pd
+import pyarrow.parquet as pq
+
+import modules.exportacao as exportacao
+from modules.exportacao import exportar, exportar_bytes
+
+def _df(n):
+    return pd.DataFrame({'titulo': [f"T{i}" for i in range(n)], 'valor': [i * 1.5 for i in range(n)]})
+
+def test_xlsx_quebra_aba_no_limite_de_linhas(monkeypatch):
+    # Limite do Excel (1.048.575 linhas de dados) encolhido; blocos menores que a aba para cruzar as duas fronteiras
+    monkeypatch.setattr(exportacao, 'LINHAS_POR_ABA_XLSX', 5)
+    monkeypatch.setattr(exportacao, 'LINHAS_POR_BLOCO', 2)
+    df = _df(12)
+    pasta = openpyxl.load_workbook(io.BytesIO(exportar_bytes({'Títulos': df, 'Vazia': df.iloc[:0]}, 'xlsx')), read_only=True)
+
+    assert pasta.sheetnames == ['Títulos', 'Títulos (2)', 'Títulos (3)', 'Vazia']
+    linhas = []
+    for aba in pasta.sheetnames[:3]:
+        cabecalho, *dados = pasta[aba].iter_rows(values_only=True)
+        assert cabecalho == ('titulo', 'valor') and len(dados) <= 5
+        linhas += dados
+    assert linhas == list(df.itertuples(index=False, name=None))
+    assert list(pasta['Vazia'].iter_rows(values_only=True)) == [('titulo', 'valor')]
+
+def test_parquet_coluna_misturada_vira_texto_em_todos_os_blocos(monkeypatch):
+    # Texto misturado com número (Sheets) só aparece depois do 1º bloco: o esquema vem da coluna inteira
+    monkeypatch.setattr(exportacao, 'LINHAS_POR_BLOCO', 3)
+    df = pd.DataFrame({
+        'nf': pd.Series([101, 102, 103, 104, 'S/N', None], dtype=object),
+        'valor': [1.0, 2.0, 3.0, 4.0, 5.0, 6.0],
+    })
+    tabela = pq.read_table(io.BytesIO(exportar_bytes(df, 'parquet')))
+
+    assert str(tabela.schema.field('nf').type) == 'string'
+    assert str(tabela.schema.field('valor').type) == 'double'
+    assert tabela.column('nf').to_pylist() == ['101', '102', '103', '104', 'S/N', None]
+    assert tabela.num_rows == len(df)
+
+def test_varias_abas_em_csv_saem_num_zip():
+    planilhas = {'Ranking': _df(3), 'Ageing/Faixas': _df(4), 'ranking': _df(2)}
+    with zipfile.ZipFile(exportar(planilhas, 'csv')) as zf:
+        assert zf.namelist() == ['Ranking.csv', 'Ageing_Faixas.csv', 'ranking (2).csv']
+        for nome, df in zip(zf.namelist(), planilhas.values()):
+            with zf.open(nome) as arquivo:
+                lido = pd.read_csv(arquivo, sep=';', encoding='utf-8-sig')
+            assert lido.equals(df)
@@ -0,0 +1,21 @@
+from benchmarks.gerador_pagamentos import gerar_pagamentos
+from modules.cnab_engine import gerar_remessas_por_conta, confirmar_remessas
+from modules.pagamentos_emitidos import registrar_pagamentos, consultar_pagamentos, liberar_remessa
+
+def test_registrar_conta_so_as_chaves_novas():
+    assert registrar_pagamentos(['BOLETO:1', 'BOLETO:2', 'BOLETO:1'], nsa=15) == 2
+    # Chave já emitida fica com o NSA da primeira remessa e não entra na conta
+    assert registrar_pagamentos(['BOLETO:2', 'BOLETO:3'], nsa=16) == 1
+    assert registrar_pagamentos(['BOLETO:3'], nsa=17) == 0
+
+    emitidos = consultar_pagamentos(['BOLETO:1', 'BOLETO:2', 'BOLETO:3', 'BOLETO:4'])
+    assert dict(zip(emitidos['chave'], emitidos['nsa'])) == {'BOLETO:1': 15, 'BOLETO:2': 15, 'BOLETO:3': 16}
+
+def test_confirmar_de_novo_nao_marca_nada(tmp_path):
+    df = gerar_pagamentos(40, seed=4)
+    remessas = gerar_remessas_por_conta(df, tmp_path)
+    assert confirmar_remessas(df, remessas) == len(df)
+    assert confirmar_remessas(df, remessas) == 0
+
+    assert liberar_remessa(remessas[0]['nsa']) == len(df)
+    assert confirmar_remessas(df, remessas) == len(df)
@@ -0,0 +1,127 @@
+import io
+import copy
+import sqlite3
+
+import pandas as pd
+import pytest
+
+import modules.protestos as leitor
+from benchmarks.gerador_certidoes import LAYOUTS_CERTIDAO, gerar_certidao, gerar_corpus
+
+
+class _SemRead(io.BytesIO):
+    # Upload que não pode ser copiado inteiro para a memória: só leitura posicionada
+    def read(self, *args):
+        raise AssertionError("o PDF não deveria ser lido inteiro")
+
+def _uploads(corpus):
+    arquivos = []
+    for nome, pdf, _, _ in corpus:
+        arquivo = io.BytesIO(pdf)
+        arquivo.name = nome
+        arquivos.append(arquivo)
+    quebrado = io.BytesIO(b'isto nao e um PDF')
+    quebrado.name = 'quebrado.pdf'
+    arquivos.insert(2, quebrado)
+    return arquivos
+
+def _em_fluxo(arquivos, **opcoes):
+    return list(leitor.extrair_protestos_em_fluxo(arquivos, usar_cache=False, **opcoes))
+
+def test_fluxo_com_pool_sai_na_ordem_do_upload():
+    corpus = gerar_corpus(6, seed=3)
+    serial = _em_fluxo(_uploads(corpus), paralelo=False)
+    com_pool = _em_fluxo(_uploads(corpus), paralelo=True, workers=3)
+
+    assert [nome for nome, _, _ in com_pool] == [nome for nome, _, _ in serial]
+    assert pd.DataFrame([r for _, r, e in com_pool if e is None]).equals(pd.DataFrame([r for _, r, e in serial if e is None]))
+    assert [nome for nome, _, e in com_pool if e] == ['quebrado.pdf']
+
+def test_paginas_lidas_direto_do_arquivo_aberto():
+    _, pdf, _, _ = gerar_corpus(1, seed=7)[0]
+    arquivo = _SemRead(pdf)
+    assert ''.join(leitor._paginas_pdf(arquivo)) == ''.join(leitor._paginas_pdf(pdf))
+
+def _sem_arquivo(registros):
+    return [{k: v for k, v in r.items() if k != leitor.COLUNA_ARQUIVO} for r in registros]
+
+@pytest.mark.parametrize('layout, perfil', [
+    ('salles', leitor.PERFIL_SALLES),
+    ('credor_original', leitor.PERFIL_LETRAS_TITULOS),
+    ('apresentante', leitor.PERFIL_TERCEIRO_OFICIO),
+])
+def test_perfil_do_cartorio_escolhido_e_lido(layout, perfil):
+    pdf, _, gabarito = gerar_certidao(layout, 25, seed=11)
+    texto = leitor._texto_pdf(pdf)
+    assert leitor.perfil_do_documento(texto) is perfil
+    assert _sem_arquivo(leitor.registros_protesto(texto, 'x.pdf')) == gabarito
+
+@pytest.mark.parametrize('layout', ['credor_original', 'apresentante'])
+def test_cartorio_desconhecido_cai_no_perfil_padrao(layout):
+    pdf, _, gabarito = gerar_certidao(layout, 25, seed=12)
+    texto = leitor._texto_pdf(pdf).replace(LAYOUTS_CERTIDAO[layout][0], 'Tabelionato de Protestos de Outra Comarca')
+    assert leitor.perfil_do_documento(texto) is leitor.PERFIL_PADRAO
+    assert _sem_arquivo(leitor.registros_protesto(texto, 'x.pdf')) == gabarito
+
+def _contar_pdfplumber(monkeypatch):
+    lidas = []
+    original = leitor._texto_pdfplumber
+    def contando(pdf, indice):
+        lidas.append(indice)
+        return original(pdf, indice)
+    monkeypatch.setattr(leitor, '_texto_pdfplumber', contando)
+    return lidas
+
+def test_perfil_que_pede_pdfplumber(monkeypatch):
+    # Cartório cujo PDF o pdfium lê mal: o perfil manda tudo para o pdfplumber
+    perfil = copy.copy(leitor.PERFIL_SALLES)
+    perfil.nome, perfil.extrator = 'salles_pdfplumber', 'pdfplumber'
+    monkeypatch.setattr(leitor, 'PERFIS_CARTORIO', [perfil, *leitor.PERFIS_CARTORIO])
+    lidas = _contar_pdfplumber(monkeypatch)
+
+    pdf, paginas, gabarito = gerar_certidao('salles', 60, seed=13)
+    texto = leitor._texto_pdf(pdf)
+    # A 1ª página sai do pdfium (é nela que o perfil é reconhecido) e é relida pelo pdfplumber
+    assert lidas == list(range(paginas))
+    assert _sem_arquivo(leitor.registros_protesto(texto, 'x.pdf')) == gabarito
+
+@pytest.mark.parametrize('texto_pdfium', ['  \n ', '\ufffd' * 400, 'PROTOCOLO ' * 80])
+def test_texto_rapido_ruim_cai_no_pdfplumber(monkeypatch, texto_pdfium):
+    # Em branco, ilegível (fonte sem tabela Unicode) ou sem quebra de linha: a página é relida
+    monkeypatch.setattr(leitor.pdfium.PdfTextPage, 'get_text_range', lambda self, *args, **kwargs: texto_pdfium)
+    lidas = _contar_pdfplumber(monkeypatch)
+
+    pdf, paginas, gabarito = gerar_certidao('credor_original', 60, seed=14)
+    texto = leitor._texto_pdf(pdf)
+    assert lidas == list(range(paginas))
+    assert _sem_arquivo(leitor.registros_protesto(texto, 'x.pdf')) == gabarito
+
+def test_texto_rapido_bom_nao_abre_pdfplumber(monkeypatch):
+    lidas = _contar_pdfplumber(monkeypatch)
+    pdf, _, gabarito = gerar_certidao('apresentante', 60, seed=15)
+    assert _sem_arquivo(leitor.registros_protesto(leitor._texto_pdf(pdf), 'x.pdf')) == gabarito
+    assert lidas == []
+
+def test_caminhos_vao_direto_para_o_leitor(tmp_path):
+    corpus = gerar_corpus(5, seed=4)
+    caminhos = []
+    for nome, pdf, _, _ in corpus:
+        (tmp_path / nome).write_bytes(pdf)
+        caminhos.append(str(tmp_path / nome))
+    de_bytes, _ = leitor.extrair_protestos_pdfs(_uploads(corpus), paralelo=False, usar_cache=False)
+    for paralelo in (False, True):
+        de_caminhos, erros = leitor.extrair_protestos_pdfs(caminhos, paralelo=paralelo, workers=2, usar_cache=False)
+        assert de_caminhos.equals(de_bytes) and erros.empty
+
+def test_cache_indisponivel_avisa_no_stderr(monkeypatch, capsys):
+    def sem_cache(*args, **kwargs):
+        raise sqlite3.OperationalError('unable to open database file')
+    monkeypatch.setattr(leitor, 'buscar_extracoes', sem_cache)
+    monkeypatch.setattr(leitor, 'gravar_extracoes', sem_cache)
+    corpus = gerar_corpus(3, seed=5)
+    df, erros = leitor.extrair_protestos_pdfs(_uploads(corpus), paralelo=False)
+
+    assert erros[leitor.COLUNA_ARQUIVO].tolist() == ['quebrado.pdf'] and len(df) == sum(len(g) for _, _, _, g in corpus)
+    saida = capsys.readouterr()
+    assert saida.out == ''
+    assert saida.err.count('Cache de protestos indisponível') == 2
@@ -0,0 +1,248 @@
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pytest
+
+from benchmarks.gerador_pagamentos import gerar_pagamentos
+import modules.cnab_engine as motor
+from modules.cnab_engine import (
+    gerar_remessas_por_conta, ler_cnab_240, centavos_colunar, confirmar_remessas, escrever_cnab_remessa,
+    estatisticas_cache_segmentos, limpar_cache_segmentos,
+)
+from modules.nsa import historico_nsa, chave_nsa
+from modules.pagamentos_emitidos import liberar_remessa
+from modules.validacao import validar_pagamentos
+from modules.utils import limpar_numero_serie
+
+def _registros(caminho):
+    # Sem o header do arquivo (data/hora de geração e NSA mudam a cada remessa)
+    with open(caminho, 'rb') as f:
+        return f.read().split(b'\r\n')[1:]
+
+def _conferir_arquivo(caminho):
+    # Estrutura do CNAB 240: trailers batendo com o que o arquivo leva e seq_lote 1..n em cada lote.
+    # Devolve o header do arquivo e os lotes (listas de registros, do header ao trailer do lote)
+    with open(caminho, 'rb') as f:
+        linhas = f.read().decode('utf-8').split('\r\n')[:-1]
+    assert all(len(linha) == 240 for linha in linhas)
+    assert linhas[0][7] == '0' and linhas[-1][7] == '9'
+    lotes = []
+    for linha in linhas[1:-1]:
+        if linha[7] == '1': lotes.append([])
+        lotes[-1].append(linha)
+    for numero, lote in enumerate(lotes, start=1):
+        assert lote[0][7] == '1' and lote[-1][7] == '5'
+        assert {int(linha[3:7]) for linha in lote} == {numero}
+        assert [int(linha[8:13]) for linha in lote[1:-1]] == list(range(1, len(lote) - 1))
+        assert int(lote[-1][17:23]) == len(lote)
+    assert int(linhas[-1][17:23]) == len(lotes)
+    assert int(linhas[-1][23:29]) == len(linhas)
+    return linhas[0], lotes
+
+def test_regerar_remessa_aproveita_cache_de_segmentos(tmp_path):
+    df = gerar_pagamentos(300, seed=1)
+    df['OC'] = 0
+
+    previa = gerar_remessas_por_conta(df, None, previa=True)
+    assert [r['qtd_pagamentos'] for r in previa] == [len(df)]
+    assert estatisticas_cache_segmentos()['acertos'] == 0
+    assert estatisticas_cache_segmentos()['renderizadas'] == len(df)
+
+    # Coluna só de exibição mudou (o OC do cockpit é sorteado a cada carga): a linha continua no cache
+    df['OC'] = range(len(df))
+    remessas = gerar_remessas_por_conta(df, tmp_path / 'remessas')
+    assert estatisticas_cache_segmentos()['acertos'] == len(df)
+    assert estatisticas_cache_segmentos()['renderizadas'] == len(df)
+
+    # Desmarcar títulos e gerar de novo: nada é renderizado outra vez
+    marcados = df.iloc[::2]
+    gerar_remessas_por_conta(marcados, tmp_path / 'remessas')
+    assert estatisticas_cache_segmentos()['acertos'] == len(df) + len(marcados)
+    assert estatisticas_cache_segmentos()['renderizadas'] == len(df)
+
+    # O arquivo montado do cache é o mesmo da renderização do zero
+    limpar_cache_segmentos()
+    do_zero = io.BytesIO()
+    escrever_cnab_remessa(df, do_zero, nsa=remessas[0]['nsa'], paralelo=False)
+    assert _registros(remessas[0]['caminho']) == do_zero.getvalue().split(b'\r\n')[1:]
+
+def test_previa_nao_reserva_nsa_nem_grava_arquivo(tmp_path):
+    previa = gerar_remessas_por_conta(gerar_pagamentos(50, seed=3), None, previa=True)
+    assert [r['caminho'] for r in previa] == [None]
+    assert historico_nsa().empty
+    assert list(tmp_path.glob('REM_*')) == []
+
+def test_titulos_so_ficam_barrados_depois_de_confirmar(tmp_path):
+    df = gerar_pagamentos(50, seed=2)
+    remessas = gerar_remessas_por_conta(df, tmp_path)
+    # Gerar (ou baixar) não marca nada: a remessa pode ser regerada
+    assert validar_pagamentos(df).empty
+
+    assert confirmar_remessas(df, remessas) == len(df)
+    erros = validar_pagamentos(df)
+    assert erros['erro'].str.startswith('Já enviado na remessa NSA').sum() == len(df)
+
+    # Remessa recusada pelo banco: os títulos voltam
+    liberar_remessa(remessas[0]['nsa'])
+    assert validar_pagamentos(df).empty
+
+def test_cache_de_segmentos_entre_sessoes_simultaneas(monkeypatch):
+    # Sessões do Streamlit são threads: várias remessas ao mesmo tempo, com o LRU despejando
+    monkeypatch.setattr(motor, 'LIMITE_CACHE_SEGMENTOS', 400)
+    lotes = [gerar_pagamentos(300, seed=s) for s in range(6)]
+    esperados = []
+    for df in lotes:
+        limpar_cache_segmentos()
+        destino = io.BytesIO()
+        escrever_cnab_remessa(df, destino, nsa=1, paralelo=False)
+        esperados.append(destino.getvalue().split(b'\r\n')[1:])
+    limpar_cache_segmentos()
+
+    def gerar(i):
+        destino = io.BytesIO()
+        escrever_cnab_remessa(lotes[i % len(lotes)], destino, nsa=1, paralelo=False)
+        return destino.getvalue().split(b'\r\n')[1:]
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        gerados = list(executor.map(gerar, range(48)))
+    assert all(g == esperados[i % len(lotes)] for i, g in enumerate(gerados))
+    estatisticas = estatisticas_cache_segmentos()
+    assert estatisticas['acertos'] + estatisticas['renderizadas'] == 48 * 300
+    assert estatisticas['tamanho'] <= 400
+
+def test_duas_contas_de_origem_com_nsa_proprio(tmp_path, monkeypatch):
+    aplicacao = {**motor.DADOS_HOSPITAL, 'conta': '7741', 'dv_conta': '2', 'convenio': '985598'}
+    monkeypatch.setitem(motor.CONTAS_ORIGEM, 'Unicred - Aplicação', aplicacao)
+    df = gerar_pagamentos(120, seed=8)
+    df.loc[df.index[1::3], 'Banco_Origem'] = 'Unicred - Aplicação'
+    contas = {'Unicred - C.C': motor.CONTAS_ORIGEM['Unicred - C.C'], 'Unicred - Aplicação': aplicacao}
+
+    for rodada, nsa in enumerate((15, 16)):
+        remessas = gerar_remessas_por_conta(df, tmp_path / str(rodada))
+        # Um arquivo por conta, cada convênio com a sua sequência de NSA
+        assert [(r['conta'], r['nsa']) for r in remessas] == [('Unicred - C.C', nsa), ('Unicred - Aplicação', nsa)]
+        assert sorted(i for r in remessas for i in r['indice']) == list(df.index)
+        for remessa in remessas:
+            conta = contas[remessa['conta']]
+            header, lotes = _conferir_arquivo(remessa['caminho'])
+            assert int(header[157:163]) == nsa
+            assert int(header[32:52]) == int(conta['convenio']) and int(header[58:70]) == int(conta['conta'])
+            assert sum(len(lote) - 2 for lote in lotes) == 2 * len(remessa['indice']) == remessa['qtd_registros'] - 2 - 2 * len(lotes)
+            assert (df.loc[remessa['indice'], 'Banco_Origem'] == remessa['conta']).all()
+
+    for conta in contas.values():
+        assert sorted(historico_nsa(chave_nsa(conta))['nsa']) == [15, 16]
+
+def _detalhes(lotes):
+    # Segmentos sem lote/seq_lote (posições 4-13), que mudam com a divisão
+    return [linha[13:] for lote in lotes for linha in lote[1:-1]]
+
+def _encolher_lote(monkeypatch, pagamentos):
+    # Teto do layout (100.000 registros por lote) encolhido para o teste não gerar 50 mil títulos
+    monkeypatch.setattr(motor, 'LIMITE_REGISTROS_LOTE', 2 * pagamentos + 2)
+    monkeypatch.setattr(motor, 'PAGAMENTOS_POR_LOTE_MAX', pagamentos)
+
+def test_lote_acima_do_maximo_e_dividido_no_mesmo_arquivo(tmp_path, monkeypatch):
+    df = gerar_pagamentos(95, seed=9)
+    inteiro = io.BytesIO()
+    escrever_cnab_remessa(df, inteiro, nsa=15, paralelo=False)
+    (tmp_path / 'inteiro.txt').write_bytes(inteiro.getvalue())
+    _, lotes_inteiro = _conferir_arquivo(tmp_path / 'inteiro.txt')
+
+    _encolher_lote(monkeypatch, 10)
+    with pytest.raises(ValueError, match='escrever_remessas_divididas'):
+        escrever_cnab_remessa(df, io.BytesIO(), nsa=15, paralelo=False)
+
+    [remessa] = gerar_remessas_por_conta(df, tmp_path / 'dividida')
+    header, lotes = _conferir_arquivo(remessa['caminho'])
+    assert int(header[157:163]) == remessa['nsa'] == 15
+    assert all(len(lote) - 2 <= 2 * 10 for lote in lotes)
+    assert len(lotes) == remessa['qtd_lotes'] > len(lotes_inteiro)
+    assert _detalhes(lotes) == _detalhes(lotes_inteiro)
+
+def test_remessa_dividida_em_arquivos_com_nsa_seguidos(tmp_path, monkeypatch):
+    df = gerar_pagamentos(95, seed=10)
+    _encolher_lote(monkeypatch, 10)
+    monkeypatch.setattr(motor, 'LIMITE_LOTES_ARQUIVO', 2)
+    max_bytes = 30 * motor.BYTES_POR_REGISTRO
+
+    por_lotes = gerar_remessas_por_conta(df, tmp_path / 'lotes')
+    por_bytes = gerar_remessas_por_conta(df, tmp_path / 'bytes', max_bytes_arquivo=max_bytes)
+    assert len(por_lotes) > 1 and len(por_bytes) > len(por_lotes)
+    # NSAs seguidos, reservados de uma vez para os arquivos de cada geração
+    nsas = [r['nsa'] for r in por_lotes + por_bytes]
+    assert nsas == list(range(15, 15 + len(nsas)))
+
+    for remessas in (por_lotes, por_bytes):
+        detalhes = []
+        for remessa in remessas:
+            header, lotes = _conferir_arquivo(remessa['caminho'])
+            assert int(header[157:163]) == remessa['nsa']
+            assert len(lotes) == remessa['qtd_lotes'] <= 2
+            assert sum(len(lote) - 2 for lote in lotes) == 2 * remessa['qtd_pagamentos'] == 2 * len(remessa['indice'])
+            assert os.path.getsize(remessa['caminho']) == remessa['bytes']
+            detalhes += _detalhes(lotes)
+        assert sorted(i for r in remessas for i in r['indice']) == list(df.index)
+        assert len(detalhes) == 2 * len(df)
+    assert all(r['bytes'] <= max_bytes for r in por_bytes)
+
+@pytest.mark.parametrize('estilo', ['cockpit', 'tasy'])
+def test_colunar_igual_ao_motor_linha_a_linha(estilo):
+    # Boleto (J + J52), PIX por chave e por dados bancários, nas duas planilhas de origem
+    df = gerar_pagamentos(400, seed=6, estilo=estilo)
+    por_linha = motor._gerar_cnab_por_linha(df, 15, '18102026', '101500').encode('utf-8')
+    registros = por_linha.decode('utf-8').split('\r\n')
+    assert {r[13] for r in registros if r[7:8] == '3'} == {'J', 'A', 'B'}
+    assert any(r[13] == 'J' and r[17:19] == '52' for r in registros)
+
+    for paralelo in (False, True):
+        blocos = motor._blocos_cnab_colunar(df, 15, '18102026', '101500', tamanho_bloco=64, paralelo=paralelo, workers=2)
+        assert ''.join(linha for linhas in blocos for linha in linhas).encode('utf-8') == por_linha
+
+def test_remessa_gerada_volta_pelo_leitor(tmp_path):
+    df = gerar_pagamentos(300, seed=12)
+    [remessa] = gerar_remessas_por_conta(df, tmp_path)
+    barras, lotes = motor._codigos_e_lotes(df)
+    posicoes = {tipo: pos for tipo, _, _, pos in lotes}
+    lido = ler_cnab_240(remessa['caminho'])
+    with open(remessa['caminho'], 'rb') as arquivo:
+        assert lido.equals(ler_cnab_240(arquivo))
+
+    assert lido['nsa'].iloc[0] == remessa['nsa']
+    assert lido['qtd_registros'].iloc[-1] == len(lido) == remessa['qtd_registros']
+    segmento = lido.groupby('segmento')
+    j, j52, a, b = (segmento.get_group(s).reset_index(drop=True) for s in ('J', 'J52', 'A', 'B'))
+    assert len(j) == len(j52) == len(posicoes['BOLETO']) and len(a) == len(b) == len(posicoes['PIX'])
+
+    # Boleto: código de barras, valor e o beneficiário no J-52
+    boletos = df.iloc[posicoes['BOLETO']]
+    assert j['codigo'].tolist() == barras[posicoes['BOLETO']].tolist()
+    assert j['valor_centavos'].tolist() == centavos_colunar(boletos).tolist()
+    assert j['data_pagamento'].tolist() == pd.to_datetime(boletos['DATA_PAGAMENTO'], format='%d/%m/%Y').tolist()
+    assert j52['documento_favorecido'].astype(int).tolist() == pd.Series(limpar_numero_serie(boletos['cnpj_beneficiario'])).astype(int).tolist()
+
+    # PIX: valor no A, chave no B
+    pix = df.iloc[posicoes['PIX']]
+    assert a['valor_centavos'].tolist() == centavos_colunar(pix).tolist()
+    com_chave = b['chave_pix'].notna().to_numpy()
+    assert b.loc[com_chave, 'chave_pix'].tolist() == pix['CHAVE_PIX_OU_COD_BARRAS'].str.strip().to_numpy()[com_chave].tolist()
+
+    # Trailer de cada lote soma o que o lote leva
+    detalhes = lido[lido['segmento'].isin(['J', 'A'])]
+    somas = detalhes.groupby('lote')['valor_centavos'].sum()
+    trailers = lido[lido['tipo_registro'] == 5].set_index('lote')['valor_centavos']
+    assert trailers.equals(somas.rename(trailers.name).astype(trailers.dtype))
+
+@pytest.mark.parametrize('modo, conta, erro', [
+    ('bloco', None, ValueError),
+    ('linha', {**motor.DADOS_HOSPITAL, 'convenio': '985598'}, ValueError),
+    ('colunar', {**motor.DADOS_HOSPITAL, 'banco': '999'}, KeyError),
+])
+def test_argumento_invalido_nao_gasta_nsa(modo, conta, erro):
+    with pytest.raises(erro):
+        motor.gerar_cnab_remessa(gerar_pagamentos(20, seed=1), modo=modo, conta=conta)
+    assert historico_nsa().empty
+    # A próxima remessa continua do primeiro número da sequência
+    assert motor.gerar_cnab_remessa(gerar_pagamentos(20, seed=1))[157:163] == '000015'
@@ -0,0 +1,23 @@
+import numpy as np
+import pytest
+
+from modules.utils import MAXIMO_CENTAVOS, centavos, para_centavos
+
+VALORES = [
+    ('1234.56', 123456), ('1234,56', 123456), ('1.234,56', 123456), ('1.234.567,89', 123456789),
+    (12.5, 1250), ('1.005', 101), ('-3,5', -350), (' 7 ', 700), ('1e3', 100000),
+    ('', 0), (None, 0), (float('nan'), 0), ('abc', 0), ('1_000', 0),
+    # Célula absurda da planilha não pode virar INT64_MIN no campo de valor do CNAB
+    ('inf', 0), ('-inf', 0), ('nan', 0), ('1e20', 0), (float('inf'), 0), (-1e30, 0),
+    ('9999999999999.99', MAXIMO_CENTAVOS), ('10000000000000.00', 0),
+]
+
+@pytest.mark.parametrize('valor, esperado', VALORES)
+def test_centavos_escalar(valor, esperado):
+    assert centavos(valor) == esperado
+
+def test_para_centavos_igual_ao_escalar():
+    valores = [v for v, _ in VALORES]
+    resultado = para_centavos(valores)
+    assert resultado.dtype == np.int64
+    assert resultado.tolist() == [centavos(v) for v in valores] == [e for _, e in VALORES]
@@ -0,0 +1,36 @@
+from datetime import datetime
+
+from benchmarks.gerador_pagamentos import gerar_pagamentos
+import modules.validacao as validacao
+from modules.cnab_engine import chaves_pagamento_colunar
+from modules.pagamentos_emitidos import registrar_pagamentos
+from modules.validacao import validar_pagamentos, avisos_pagamentos
+
+def test_vencimento_passado_e_aviso_nao_erro():
+    # Boleto vencido ("Venc. original" no cockpit) ainda pode ser pago: não barra a remessa
+    df = gerar_pagamentos(50, seed=2)
+    df.loc[[3, 7], 'DATA_PAGAMENTO'] = '01/10/2026'
+    hoje = datetime(2026, 10, 18)
+
+    assert validar_pagamentos(df, hoje=hoje).empty
+    avisos = avisos_pagamentos(df, hoje=hoje)
+    assert avisos['linha'].tolist() == [3, 7]
+    assert set(avisos['campo']) == {'DATA_PAGAMENTO'}
+
+def test_chaves_da_validacao_sao_as_da_remessa(monkeypatch):
+    # A validação monta as chaves com o que já calculou; têm que bater com as que a remessa grava
+    df = gerar_pagamentos(400, seed=5)
+    recebidas = []
+    original = validacao.consultar_pagamentos
+    def espiando(chaves, *args, **kwargs):
+        recebidas.append(list(chaves))
+        return original(chaves, *args, **kwargs)
+    monkeypatch.setattr(validacao, 'consultar_pagamentos', espiando)
+
+    assert validar_pagamentos(df, hoje=datetime(2026, 10, 18)).empty
+    assert recebidas == [chaves_pagamento_colunar(df).tolist()]
+
+    # Título já enviado numa remessa anterior é barrado
+    registrar_pagamentos(chaves_pagamento_colunar(df.iloc[:10]), nsa=15)
+    erros = validar_pagamentos(df, hoje=datetime(2026, 10, 18))
+    assert sorted(erros['linha'].unique()) == list(df.index[:10])